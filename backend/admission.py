@@ -0,0 +1,148 @@
+"""Admission control: bounded concurrency per endpoint group, with load shedding.
+
+Each group of endpoints (reads, writes, image proxy) gets an
+``AdmissionLimiter``: at most *limit* requests run at once, up to
+*queue_size* more wait in FIFO order, and a request that has waited
+*queue_timeout* seconds is rejected. Rejected requests get ``503`` with
+``Retry-After`` straight away, so under overload the requests that are
+admitted keep a bounded latency instead of all timing out together.
+
+``AdmissionMiddleware`` is plain ASGI so the slot is held until the
+response, streamed or not, has been sent.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Raised by ``AdmissionLimiter.acquire`` when a request is shed."""
+
+
+class AdmissionLimiter:
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters = deque()
+        self._admitted = 0
+        self._queued = 0
+        self._shed_queue_full = 0
+        self._shed_timeout = 0
+        self._max_waiting = 0
+        self._wait_seconds = 0.0
+
+    async def acquire(self):
+        """Take a slot, waiting in line if needed; raise ``Overloaded`` if shed."""
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self._admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._shed_queue_full += 1
+            raise Overloaded("queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queued += 1
+        self._max_waiting = max(self._max_waiting, len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away while queued.
+            self._abandon(waiter)
+            raise
+        finally:
+            self._wait_seconds += time.monotonic() - started
+        if not waiter.done():
+            self._abandon(waiter)
+            self._shed_timeout += 1
+            raise Overloaded("queue timeout")
+        self._admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done():
+            # The slot was handed over just before; pass it on.
+            self.release()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def release(self):
+        """Give the slot to the longest-waiting request, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "queue_size": self.queue_size,
+            "max_waiting": self._max_waiting,
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "wait_seconds": round(self._wait_seconds, 3),
+            "shed": {"queue_full": self._shed_queue_full, "timeout": self._shed_timeout},
+        }
+
+
+class AdmissionMiddleware:
+    """Run each HTTP request under the limiter of its group.
+
+    *classify* maps an ASGI scope to a group name, or ``None`` for requests
+    that are never limited (health checks, long-lived event streams).
+    """
+
+    def __init__(
+        self,
+        app,
+        limiters: Dict[str, AdmissionLimiter],
+        classify: Callable[[dict], Optional[str]],
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.classify = classify
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http":
+            limiter = self.limiters.get(self.classify(scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Server is busy, please retry shortly."}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(self.retry_after).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
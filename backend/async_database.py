@@ -0,0 +1,519 @@
+"""Asynchronous data access for the API's request handlers.
+
+Mirrors the read and owner-deal functions of ``database`` on a psycopg 3
+``AsyncConnectionPool``, so an endpoint awaits its queries on the event loop
+instead of holding a threadpool worker for the whole round trip. SQL and
+row mapping come from ``database``; only the I/O differs. Ingestion and
+migrations stay on the synchronous layer.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from psycopg import sql
+from psycopg_pool import AsyncConnectionPool
+
+try:
+    from . import database
+    from .database import (
+        DEAL_SELECT_COLUMNS,
+        DataGeneration,
+        OWNER_DEAL_COLUMNS,
+        _OWNER_DEAL_BATCH_DELETE,
+        _OWNER_DEAL_BATCH_INSERT,
+        _OWNER_DEAL_INSERT,
+        _OWNER_MERCHANT_UPSERT,
+        _PRICE_HISTORY_COLUMNS,
+        _PRICE_HISTORY_QUERY,
+        _batch_results,
+        _batch_update_statements,
+        _cached_count,
+        _check_owner_batch,
+        _deal_batch_items,
+        _deal_dicts,
+        _derived_values,
+        _feed_result,
+        _merchant_resolve_query,
+        _owner_batch_insert_params,
+        _owner_batch_merchant_names,
+        _owner_batch_updates,
+        _owner_deal_changes,
+        _owner_deal_values,
+        _page_result,
+        _plan_deals_export,
+        _plan_deals_page,
+        _plan_feed_page,
+        _plan_owner_deals_page,
+        _plan_rows,
+        _price_history_params,
+        _store_count,
+        _update_statement,
+    )
+    from .metrics import timed_query
+except ImportError:  # pragma: no cover
+    import database
+    from database import (
+        DEAL_SELECT_COLUMNS,
+        DataGeneration,
+        OWNER_DEAL_COLUMNS,
+        _OWNER_DEAL_BATCH_DELETE,
+        _OWNER_DEAL_BATCH_INSERT,
+        _OWNER_DEAL_INSERT,
+        _OWNER_MERCHANT_UPSERT,
+        _PRICE_HISTORY_COLUMNS,
+        _PRICE_HISTORY_QUERY,
+        _batch_results,
+        _batch_update_statements,
+        _cached_count,
+        _check_owner_batch,
+        _deal_batch_items,
+        _deal_dicts,
+        _derived_values,
+        _feed_result,
+        _merchant_resolve_query,
+        _owner_batch_insert_params,
+        _owner_batch_merchant_names,
+        _owner_batch_updates,
+        _owner_deal_changes,
+        _owner_deal_values,
+        _page_result,
+        _plan_deals_export,
+        _plan_deals_page,
+        _plan_feed_page,
+        _plan_owner_deals_page,
+        _plan_rows,
+        _price_history_params,
+        _store_count,
+        _update_statement,
+    )
+    from metrics import timed_query
+
+_pool = None
+_replica_pools = {}
+_pool_lock = asyncio.Lock()
+
+
+def _new_pool(dsn):
+    return AsyncConnectionPool(
+        dsn,
+        min_size=database.DB_POOL_MIN_SIZE,
+        max_size=database.DB_POOL_MAX_SIZE,
+        timeout=database.DB_POOL_TIMEOUT,
+        max_idle=database.DB_POOL_MAX_IDLE,
+        max_lifetime=database.DB_POOL_MAX_LIFETIME,
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+
+
+async def get_pool(dsn: str = None):
+    """Return the process-wide async pool for *dsn*, opening it on first use.
+
+    *dsn* defaults to ``DATABASE_URL`` (the primary); any other value is a
+    read replica. Pools are sized by the same ``DB_POOL_*`` settings as the
+    synchronous ones. Changing ``DATABASE_URL`` replaces the primary pool.
+    """
+    global _pool
+
+    if dsn is not None and dsn != database.DATABASE_URL:
+        pool = _replica_pools.get(dsn)
+        if pool is None:
+            async with _pool_lock:
+                pool = _replica_pools.get(dsn)
+                if pool is None:
+                    pool = _new_pool(dsn)
+                    await pool.open()
+                    _replica_pools[dsn] = pool
+        return pool
+
+    dsn = database.DATABASE_URL
+    if _pool is not None and _pool.conninfo == dsn:
+        return _pool
+    if not dsn:
+        raise RuntimeError("DATABASE_URL environment variable is not set")
+    async with _pool_lock:
+        if _pool is None or _pool.conninfo != dsn:
+            if _pool is not None:
+                await _pool.close()
+            pool = _new_pool(dsn)
+            await pool.open()
+            _pool = pool
+        return _pool
+
+
+async def close_pool():
+    """Close the process-wide async pools, if any were opened."""
+    global _pool
+
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+        for pool in _replica_pools.values():
+            await pool.close()
+        _replica_pools.clear()
+
+
+def get_pool_stats():
+    """Return async pool statistics, or an empty dict before first use."""
+    stats = _pool.get_stats() if _pool is not None else {}
+    if database.DATABASE_READ_URLS:
+        stats["replicas"] = [
+            _replica_pools[dsn].get_stats() if dsn in _replica_pools else {}
+            for dsn in database.DATABASE_READ_URLS
+        ]
+    return stats
+
+
+@asynccontextmanager
+async def _connection(read=None):
+    """Borrow a pooled connection for one transaction.
+
+    Like ``database._get_connection``: read-only callers pass *read* and may
+    be routed to a replica, falling back to the primary if it is down.
+    """
+    router = database.get_read_router()
+    dsn = router.acquire(read) if read is not None else None
+    try:
+        pool = conn = None
+        if dsn is not None:
+            try:
+                pool = await get_pool(dsn)
+                # A short wait, so a replica that is down costs one
+                # REPLICA_CONNECT_TIMEOUT rather than the full pool timeout.
+                conn = await pool.getconn(timeout=database.REPLICA_CONNECT_TIMEOUT)
+            except Exception as e:
+                logging.warning(f"Read replica unavailable, using the primary: {e}")
+                router.record_fallback(dsn)
+        if conn is None:
+            pool = await get_pool()
+            conn = await pool.getconn()
+        try:
+            async with conn.transaction():
+                yield conn
+        finally:
+            await pool.putconn(conn)
+    finally:
+        router.release(dsn)
+
+
+async def _get_generation(cur, name="deals"):
+    await cur.execute("SELECT generation FROM data_generation WHERE name = %s;", (name,))
+    row = await cur.fetchone()
+    return row[0] if row else 0
+
+
+async def _read_snapshot_generation(cur, name, generations):
+    """Record *name*'s ``DataGeneration`` in *generations*, if one is given.
+
+    *name* may also be a tuple of names, for reads spanning several sources.
+    Must be the first statement of the transaction: it switches it to
+    repeatable read, so the rows read afterwards come from the same snapshot
+    as the generation and a cached result is never labelled with a
+    generation its data does not match.
+    """
+    if generations is None:
+        return
+    await cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+    if isinstance(name, str):
+        await cur.execute(
+            "SELECT generation, updated_at FROM data_generation WHERE name = %s;", (name,)
+        )
+        row = await cur.fetchone()
+        generations[name] = DataGeneration(*row) if row else DataGeneration(0, None)
+        return
+    await cur.execute(
+        "SELECT name, generation, updated_at FROM data_generation WHERE name = ANY(%s);",
+        (list(name),),
+    )
+    found = {row[0]: DataGeneration(*row[1:]) for row in await cur.fetchall()}
+    for each in name:
+        generations[each] = found.get(each, DataGeneration(0, None))
+
+
+async def _bump_generation(cur, name="deals"):
+    """See ``database._bump_generation``."""
+    await cur.execute(
+        """
+        INSERT INTO data_generation (name, generation)
+        VALUES (%s, 1)
+        ON CONFLICT (name) DO UPDATE
+        SET generation = data_generation.generation + 1,
+            updated_at = now();
+        """,
+        (name,),
+    )
+
+
+@timed_query
+async def get_generations(names=("deals", "owner_deals")):
+    """Return ``{name: DataGeneration}`` for *names*; unknown names are at 0."""
+    async with _connection(read=tuple(names)) as conn, conn.cursor() as cur:
+        await cur.execute(
+            "SELECT name, generation, updated_at FROM data_generation WHERE name = ANY(%s);",
+            (list(names),),
+        )
+        found = {row[0]: DataGeneration(*row[1:]) for row in await cur.fetchall()}
+    return {name: found.get(name, DataGeneration(0, None)) for name in names}
+
+
+@timed_query
+async def get_deals_from_db(
+    page: int = 1,
+    page_size: int = 50,
+    merchant: str = None,
+    title: str = None,
+    cursor: str = None,
+    total: str = "exact",
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+    generations: dict = None,
+):
+    """Async ``database.get_deals_from_db``; shares its total cache.
+
+    If *generations* is given, the ``deals`` generation the page was read
+    at is stored in it (see ``_read_snapshot_generation``).
+    """
+    plan = _plan_deals_page(
+        page, page_size, merchant, title, cursor, total,
+        min_price, max_price, min_discount, sort, order,
+    )
+
+    async with _connection(read="deals") as conn, conn.cursor() as cur:
+        await _read_snapshot_generation(cur, "deals", generations)
+        total_products = None
+        if plan.total == "estimate":
+            await cur.execute("EXPLAIN (FORMAT JSON) " + plan.count_query, plan.count_params)
+            total_products = _plan_rows((await cur.fetchone())[0])
+        elif plan.total == "exact":
+            generation = await _get_generation(cur)
+            total_products = _cached_count(generation, plan.cache_key)
+            if total_products is None:
+                await cur.execute(plan.count_query, plan.count_params)
+                total_products = (await cur.fetchone())[0]
+                _store_count(generation, plan.cache_key, total_products)
+
+        await cur.execute(plan.select_query, plan.select_params)
+        deals = await cur.fetchall()
+
+    return _page_result(plan, deals, DEAL_SELECT_COLUMNS + ["merchant"], total_products)
+
+
+def stream_deals(
+    merchant: str = None,
+    title: str = None,
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+    batch_size: int = None,
+):
+    """Async ``database.stream_deals``: returns an async iterator of batches."""
+    plan = _plan_deals_export(merchant, title, min_price, max_price, min_discount, sort, order)
+    return _stream_deal_batches(plan, batch_size or database.EXPORT_BATCH_SIZE)
+
+
+async def _stream_deal_batches(plan, batch_size):
+    columns = DEAL_SELECT_COLUMNS + ["merchant"]
+    async with _connection(read="deals") as conn:
+        async with conn.cursor(name="deals_export") as cur:
+            cur.itersize = batch_size
+            await cur.execute(plan.select_query, plan.select_params)
+            while True:
+                rows = await cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield _deal_dicts(rows, columns)
+
+
+@timed_query
+async def get_all_merchants(generations: dict = None):
+    async with _connection(read="deals") as conn, conn.cursor() as cur:
+        await _read_snapshot_generation(cur, "deals", generations)
+        await cur.execute("SELECT name FROM merchants ORDER BY name")
+        return [row[0] for row in await cur.fetchall()]
+
+
+@timed_query
+async def update_deal(deal_id: int, deal_data: dict):
+    deal_data = dict(deal_data, **_derived_values(deal_data, fields=deal_data))
+    async with _connection() as conn, conn.cursor() as cur:
+        await cur.execute(*_update_statement("deals", deal_data, deal_id, sql))
+        await _bump_generation(cur)
+    database.get_read_router().mark_written("deals")
+
+
+@timed_query
+async def update_deals_batch(updates):
+    """Async ``database.update_deals_batch``."""
+    items = _deal_batch_items(updates)
+    statuses = {}
+    async with _connection() as conn, conn.cursor() as cur:
+        for query, params, status in _batch_update_statements("deals", items, sql):
+            await cur.execute(query, params)
+            statuses.update((row[0], status) for row in await cur.fetchall())
+        if "updated" in statuses.values():
+            await _bump_generation(cur)
+    database.get_read_router().mark_written("deals")
+    return _batch_results([item["id"] for item in items], statuses)
+
+
+@timed_query
+async def get_deal_price_history(deal_id: int, points: int = 200, since=None, until=None):
+    """Async ``database.get_deal_price_history``."""
+    _price_history_params(None, points, since, until)
+
+    async with _connection(read="deals") as conn, conn.cursor() as cur:
+        await cur.execute("SELECT product_url FROM deals WHERE id = %s;", (deal_id,))
+        row = await cur.fetchone()
+        if row is None:
+            return None
+        product_url = row[0]
+
+        await cur.execute(
+            _PRICE_HISTORY_QUERY,
+            _price_history_params(product_url, points, since, until),
+        )
+        rows = await cur.fetchall()
+
+    return {
+        "deal_id": deal_id,
+        "product_url": product_url,
+        "points": [dict(zip(_PRICE_HISTORY_COLUMNS, row)) for row in rows],
+    }
+
+
+@timed_query
+async def insert_owner_deal(deal_data):
+    async with _connection() as conn, conn.cursor() as cur:
+        merchant_id = None
+        if deal_data.get("merchant"):
+            await cur.execute(_OWNER_MERCHANT_UPSERT, (deal_data["merchant"],))
+            row = await cur.fetchone()
+            if row:
+                merchant_id = row[0]
+
+        await cur.execute(_OWNER_DEAL_INSERT, _owner_deal_values(deal_data, merchant_id))
+        deal_id = (await cur.fetchone())[0]
+        await _bump_generation(cur, "owner_deals")
+    database.get_read_router().mark_written("owner_deals")
+    return deal_id
+
+
+@timed_query
+async def get_owner_deals(
+    page: int = 1, page_size: int = 50, cursor: str = None, generations: dict = None
+):
+    """Async ``database.get_owner_deals``; *generations* as for ``get_deals_from_db``."""
+    plan = _plan_owner_deals_page(page, page_size, cursor)
+
+    async with _connection(read="owner_deals") as conn, conn.cursor() as cur:
+        await _read_snapshot_generation(cur, "owner_deals", generations)
+        await cur.execute(plan.count_query)
+        total_products = (await cur.fetchone())[0]
+
+        await cur.execute(plan.select_query, plan.select_params)
+        deals = await cur.fetchall()
+
+    return _page_result(plan, deals, OWNER_DEAL_COLUMNS + ["merchant"], total_products)
+
+
+@timed_query
+async def update_owner_deal(deal_id: int, deal_data: dict):
+    deal_data = _owner_deal_changes(deal_data)
+    async with _connection() as conn, conn.cursor() as cur:
+        merchant_name = deal_data.pop("merchant", None)
+        if merchant_name:
+            await cur.execute(_OWNER_MERCHANT_UPSERT, (merchant_name,))
+            deal_data["merchant_id"] = (await cur.fetchone())[0]
+
+        await cur.execute(*_update_statement("owner_deals", deal_data, deal_id, sql))
+        await _bump_generation(cur, "owner_deals")
+    database.get_read_router().mark_written("owner_deals")
+
+
+@timed_query
+async def delete_owner_deal(deal_id: int):
+    logging.info(f"DATABASE: Deleting owner deal with id: {deal_id}")
+    async with _connection() as conn, conn.cursor() as cur:
+        await cur.execute("DELETE FROM owner_deals WHERE id = %s", (deal_id,))
+        await _bump_generation(cur, "owner_deals")
+    database.get_read_router().mark_written("owner_deals")
+    logging.info(f"DATABASE: Successfully deleted owner deal with id: {deal_id}")
+
+
+@timed_query
+async def apply_owner_deal_batch(create=(), update=(), delete=()):
+    """Async ``database.apply_owner_deal_batch``."""
+    create, update, delete = list(create), list(update), list(delete)
+    _check_owner_batch(update, delete)
+    async with _connection() as conn, conn.cursor() as cur:
+        merchant_ids = {}
+        names = _owner_batch_merchant_names(create, update)
+        if names:
+            await cur.execute(_merchant_resolve_query("owner_merchants"), (names,))
+            merchant_ids = {name: merchant_id for merchant_id, name in await cur.fetchall()}
+
+        created = []
+        if create:
+            await cur.execute(
+                _OWNER_DEAL_BATCH_INSERT, _owner_batch_insert_params(create, merchant_ids)
+            )
+            created = [row[0] for row in await cur.fetchall()]
+
+        updated = {}
+        for query, params, status in _batch_update_statements(
+            "owner_deals", _owner_batch_updates(update, merchant_ids), sql
+        ):
+            await cur.execute(query, params)
+            updated.update((row[0], status) for row in await cur.fetchall())
+
+        deleted = {}
+        if delete:
+            await cur.execute(_OWNER_DEAL_BATCH_DELETE, (delete,))
+            deleted = {row[0]: "deleted" for row in await cur.fetchall()}
+        changed = bool(created or deleted) or "updated" in updated.values()
+        if changed:
+            await _bump_generation(cur, "owner_deals")
+    if changed:
+        database.get_read_router().mark_written("owner_deals")
+
+    return {
+        "created": [{"id": deal_id, "status": "created"} for deal_id in created],
+        "updated": _batch_results([item["id"] for item in update], updated),
+        "deleted": _batch_results(delete, deleted),
+    }
+
+
+@timed_query
+async def get_feed(
+    page_size: int = 50,
+    merchant: str = None,
+    title: str = None,
+    cursor: str = None,
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+    source: str = None,
+    generations: dict = None,
+):
+    """Async ``database.get_feed``; *generations* receives both sources'
+    generations, as for ``get_deals_from_db``."""
+    plan = _plan_feed_page(
+        page_size, merchant, title, cursor,
+        min_price, max_price, min_discount, sort, order, source,
+    )
+
+    async with _connection(read=("deals", "owner_deals")) as conn, conn.cursor() as cur:
+        await _read_snapshot_generation(cur, ("deals", "owner_deals"), generations)
+        await cur.execute(plan.select_query, plan.select_params)
+        rows = await cur.fetchall()
+
+    return _feed_result(plan, rows)
@@ -0,0 +1,128 @@
+"""Benchmark the deal endpoints: sync handlers versus the async data layer.
+
+Serves ``/api/deals`` and ``/api/merchants`` two ways against the same
+database: sync ``def`` handlers calling ``database`` (run on Starlette's
+threadpool) and identical ``async def`` handlers calling ``async_database``.
+Both apps are bare, without the response cache and admission limits of
+``main``, so only the data layers are compared. Each is driven in-process
+by *concurrency* clients for *duration* seconds; requests per second and
+p50/p99 latency are reported. Requires ``DATABASE_URL`` and scraped deals;
+run from ``backend/``::
+
+    python benchmarks/async_benchmark.py --concurrency 200 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_database  # noqa: E402
+import database  # noqa: E402
+
+PATHS = [
+    "/api/deals?page_size=50",
+    "/api/deals?page_size=50&sort=price",
+    "/api/deals?page_size=20&title=samsung",
+    "/api/merchants",
+]
+
+
+def sync_app():
+    app = FastAPI()
+
+    @app.get("/api/deals")
+    def deals(page: int = 1, page_size: int = 50, title: str = None, sort: str = None):
+        return database.get_deals_from_db(page, page_size, title=title, sort=sort)
+
+    @app.get("/api/merchants")
+    def merchants():
+        return database.get_all_merchants()
+
+    return app
+
+
+def async_app():
+    app = FastAPI()
+
+    @app.get("/api/deals")
+    async def deals(page: int = 1, page_size: int = 50, title: str = None, sort: str = None):
+        return await async_database.get_deals_from_db(page, page_size, title=title, sort=sort)
+
+    @app.get("/api/merchants")
+    async def merchants():
+        return await async_database.get_all_merchants()
+
+    return app
+
+
+async def client_loop(client, deadline, latencies, errors, offset):
+    index = offset
+    while time.perf_counter() < deadline:
+        path = PATHS[index % len(PATHS)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+        except Exception:
+            errors.append(path)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(app, concurrency, duration):
+    latencies, errors = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(PATHS[0])  # warm pools and caches
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(client_loop(client, deadline, latencies, errors, i) for i in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+async def bench(concurrency, duration):
+    database.migrate()
+    results = {"sync": await run(sync_app(), concurrency, duration)}
+    await async_database.get_pool()
+    results["async"] = await run(async_app(), concurrency, duration)
+    await async_database.close_pool()
+    database.close_pool()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args.concurrency, args.duration))
+    print(f"{'path':<8}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<8}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10.1f}"
+            f"{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
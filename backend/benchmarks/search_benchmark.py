@@ -0,0 +1,122 @@
+"""Benchmark title search: ``LIKE '%x%'`` versus the indexed search vector.
+
+Loads synthetic Thai/English deal titles into a scratch table, builds the
+same GIN index as ``create_tables`` and reports count + first-page latency
+for both predicates. Requires ``DATABASE_URL``; run from ``backend/``::
+
+    python benchmarks/search_benchmark.py --rows 1000000
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import build_search_query, build_search_vector  # noqa: E402
+
+TABLE = "deals_search_bench"
+
+BRANDS = ["Samsung", "Apple", "Xiaomi", "Sony", "Philips", "Tefal", "Dyson", "Oppo"]
+THAI_WORDS = [
+    "โทรศัพท์มือถือ", "ไอโฟน", "หูฟังไร้สาย", "เครื่องดูดฝุ่น", "หม้อทอดไร้น้ำมัน",
+    "พัดลม", "ตู้เย็น", "เครื่องซักผ้า", "ทีวี", "กล้องถ่ายรูป", "นาฬิกา", "รองเท้า",
+    "ครีมกันแดด", "กระเป๋า", "ลดราคา", "ของแท้", "ประกันศูนย์", "สีดำ", "สีขาว",
+]
+QUERIES = ["ไอโฟน", "ดูดฝุ่น", "ไร้สาย", "samsung", "sung", "ทีวี 55", "หม้อทอด", "กันแดด", "zzzz"]
+
+
+def random_title(rng):
+    words = rng.sample(THAI_WORDS, 3) + [rng.choice(BRANDS), str(rng.randint(1, 999))]
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def load(cur, rows, seed):
+    rng = random.Random(seed)
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+    cur.execute(
+        f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, title TEXT, search_vector TSVECTOR);"
+    )
+    batch = 50000
+    for start in range(0, rows, batch):
+        buffer = io.StringIO()
+        for _ in range(min(batch, rows - start)):
+            title = random_title(rng)
+            buffer.write(f"{title}\t{build_search_vector(title)}\n")
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {TABLE} (title, search_vector) FROM STDIN", buffer)
+    cur.execute(f"CREATE INDEX ON {TABLE} USING GIN (search_vector);")
+    cur.execute(f"ANALYZE {TABLE};")
+
+
+def timed(cur, query, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(query, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        load(cur, args.rows, args.seed)
+        print(f"Loaded {args.rows} rows in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'query':<12} {'LIKE p50/max ms':>18} {'indexed p50/max ms':>20} {'hits':>8}")
+        for text in QUERIES:
+            like = f"%{text}%"
+            like_ms = timed(
+                cur,
+                f"SELECT COUNT(*) FROM {TABLE} WHERE LOWER(title) LIKE LOWER(%s);"
+                f" SELECT id, title FROM {TABLE} WHERE LOWER(title) LIKE LOWER(%s)"
+                " ORDER BY id LIMIT %s;",
+                (like, like, args.page_size),
+                args.repeat,
+            )
+            search = build_search_query(text)
+            indexed_ms = timed(
+                cur,
+                f"SELECT COUNT(*) FROM {TABLE} WHERE search_vector @@ %s::tsquery;"
+                f" SELECT id, title, ts_rank(search_vector, %s::tsquery) AS rank"
+                f" FROM {TABLE} WHERE search_vector @@ %s::tsquery"
+                " ORDER BY rank DESC, id LIMIT %s;",
+                (search.match, search.rank, search.match, args.page_size),
+                args.repeat,
+            )
+            cur.execute(
+                f"SELECT COUNT(*) FROM {TABLE} WHERE search_vector @@ %s::tsquery;",
+                (search.match,),
+            )
+            hits = cur.fetchone()[0]
+            print(
+                f"{text:<12} {like_ms[0]:>9.1f}/{like_ms[1]:<8.1f}"
+                f" {indexed_ms[0]:>10.1f}/{indexed_ms[1]:<9.1f} {hits:>8}"
+            )
+
+        if not args.keep:
+            cur.execute(f"DROP TABLE {TABLE};")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Benchmark serializing a 500-row deals page: pydantic + json versus orjson.
+
+Builds one synthetic page of Thai-titled deals and serves it in-process two
+ways: the previous path, where FastAPI validates the dict through
+``ScrapeResponse`` and encodes it with the standard library, and the fast
+path of ``main`` (row projection, ``orjson``, negotiated compression). The
+data layer is stubbed out, so only serialization is measured and no
+database is needed. Reports p50/p99 latency and bytes on the wire; run
+from ``backend/``::
+
+    python benchmarks/serialization_benchmark.py --rows 500 --requests 300
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from database import DataGeneration  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+def make_page(rows):
+    now = datetime.now(timezone.utc)
+    products = [
+        {
+            "id": i,
+            "title": f"หูฟังไร้สาย บลูทูธ 5.3 ตัดเสียงรบกวน รุ่น {i}",
+            "price": f"฿{990 + i:,}",
+            "original_price": f"฿{1290 + i:,}",
+            "discount": "23%",
+            "image_url": f"https://img.priceza.com/img/product/{i}.jpg",
+            "product_url": f"https://www.priceza.com/p/{i}",
+            "merchant_id": i % 20,
+            "merchant_image": f"https://img.priceza.com/merchant/{i % 20}.png",
+            "rating": "4.5",
+            "reviews_count": str(i * 3),
+            "scraped_at": now,
+            "updated_at": None,
+            "merchant": f"ร้านค้า {i % 20}",
+        }
+        for i in range(rows)
+    ]
+    return {"total_products": rows, "products": products, "page": 1, "page_size": rows}
+
+
+def baseline_app(page):
+    app = FastAPI()
+
+    @app.get("/api/deals", response_model=main.ScrapeResponse)
+    async def deals():
+        return page
+
+    return app
+
+
+async def measure(app, path, headers, requests):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    size = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            size = int(response.headers.get("content-length") or len(response.content))
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "bytes": size,
+    }
+
+
+async def run(rows, requests):
+    page = make_page(rows)
+
+    async def fake_get_deals(*args, **kwargs):
+        return page
+
+    async def load_generations():
+        return {"deals": DataGeneration(1, None), "owner_deals": DataGeneration(1, None)}
+
+    main.get_deals_from_db = fake_get_deals
+    path = f"/api/deals?page_size={rows}"
+    results = {
+        "before (pydantic + json)": await measure(
+            baseline_app(page), path, {"Accept-Encoding": "identity"}, requests
+        ),
+    }
+    for label, encoding in (
+        ("orjson, uncached, identity", "identity"),
+        ("orjson, uncached, gzip", "gzip"),
+        ("orjson, uncached, br", "br"),
+    ):
+        # A cache that keeps nothing measures the miss path.
+        main.response_cache = ResponseCache(
+            load_generations, generation_ttl=0, max_entries=0, sizeof=len
+        )
+        results[label] = await measure(main.app, path, {"Accept-Encoding": encoding}, requests)
+    main.response_cache = ResponseCache(load_generations, generation_ttl=60, sizeof=len)
+    results["orjson, cached, gzip"] = await measure(
+        main.app, path, {"Accept-Encoding": "gzip"}, requests
+    )
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args.rows, args.requests))
+    print(f"{'variant':<28} {'p50 ms':>8} {'p99 ms':>8} {'bytes':>9}")
+    for label, result in results.items():
+        print(
+            f"{label:<28} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['bytes']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
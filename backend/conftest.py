@@ -2,3 +2,5 @@ import sys
 from unittest.mock import MagicMock
 
 sys.modules.setdefault("psycopg2", MagicMock())
+sys.modules.setdefault("psycopg", MagicMock())
+sys.modules.setdefault("psycopg_pool", MagicMock())
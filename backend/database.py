@@ -1,10 +1,99 @@
+import base64
+import io
+import json
 import logging
+import math
 import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
 import psycopg2
 from psycopg2 import sql, extensions
 
+try:
+    from .db_pool import ConnectionPool
+    from .db_routing import ReadRouter
+    from .metrics import timed_query
+    from .migrations import apply_migrations
+    from .search import build_search_query, build_search_vector
+    from .utils.parsing import (
+        parse_discount,
+        parse_price,
+        parse_rating,
+        parse_reviews_count,
+    )
+except ImportError:  # pragma: no cover
+    from db_pool import ConnectionPool
+    from db_routing import ReadRouter
+    from metrics import timed_query
+    from migrations import apply_migrations
+    from search import build_search_query, build_search_vector
+    from utils.parsing import (
+        parse_discount,
+        parse_price,
+        parse_rating,
+        parse_reviews_count,
+    )
+
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# Optional comma-separated replica URLs for read-only queries; see ``ReadRouter``.
+DATABASE_READ_URLS = [
+    url.strip() for url in os.environ.get("DATABASE_READ_URLS", "").split(",") if url.strip()
+]
+DB_READ_STRATEGY = os.environ.get("DB_READ_STRATEGY", "round_robin")
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+# Seconds a read waits for a replica connection before using the primary,
+# and how long a replica that failed is then skipped.
+REPLICA_CONNECT_TIMEOUT = float(os.environ.get("REPLICA_CONNECT_TIMEOUT", "2"))
+REPLICA_RETRY_SECONDS = float(os.environ.get("REPLICA_RETRY_SECONDS", "30"))
+
+# Connection pool sizing; see ``ConnectionPool`` for the meaning of each knob.
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", "3600"))
+DB_POOL_CHECK_INTERVAL = float(os.environ.get("DB_POOL_CHECK_INTERVAL", "30"))
+
+# Monthly price history partitions older than this many months are dropped.
+PRICE_HISTORY_RETENTION_MONTHS = int(os.environ.get("PRICE_HISTORY_RETENTION_MONTHS", "12"))
+
+# A scrape replaces the published deals only if it has at least
+# MIN_SNAPSHOT_PRODUCTS deals and MIN_SNAPSHOT_RATIO times as many as are
+# currently published; see ``insert_deals``.
+MIN_SNAPSHOT_PRODUCTS = int(os.environ.get("MIN_SNAPSHOT_PRODUCTS", "1"))
+MIN_SNAPSHOT_RATIO = float(os.environ.get("MIN_SNAPSHOT_RATIO", "0.5"))
+
+# Rows fetched per round trip from the server-side cursor of a deal export.
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+# Maximum number of cached deal totals, one per filter combination.
+COUNT_CACHE_SIZE = int(os.environ.get("COUNT_CACHE_SIZE", "1024"))
+
+_pool = None
+_replica_pools = {}
+_pool_lock = threading.Lock()
+
+_read_router = None
+_read_router_lock = threading.Lock()
+
+_schema_version = None
+_schema_lock = threading.Lock()
+
+_count_cache = OrderedDict()
+_count_cache_generation = None
+_count_cache_lock = threading.Lock()
+
+
+class SnapshotRejected(RuntimeError):
+    """Raised when a scrape is too small to replace the published deals."""
+
 
 def _ensure_database_exists():
     """Ensure that the target database exists.
@@ -46,64 +135,673 @@ def _ensure_database_url():
         raise RuntimeError("DATABASE_URL environment variable is not set")
 
 
-def create_tables(cur=None):
-    """Create database tables if they do not exist.
+def _new_pool(dsn, connect_timeout=None):
+    return ConnectionPool(
+        dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        max_idle=DB_POOL_MAX_IDLE,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        check_interval=DB_POOL_CHECK_INTERVAL,
+        connect_timeout=connect_timeout,
+    )
+
 
-    When *cur* is not provided, this function opens its own connection using
-    a context manager. This allows other modules (e.g., application startup)
-    to simply call ``create_tables()`` without managing connections.
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use.
+
+    Changing ``DATABASE_URL`` replaces the pool.
     """
+    global _pool
 
-    _ensure_database_exists()
     _ensure_database_url()
+    with _pool_lock:
+        if _pool is None or _pool.dsn != DATABASE_URL:
+            if _pool is not None:
+                _pool.close()
+            _pool = _new_pool(DATABASE_URL)
+        return _pool
+
+
+def _get_replica_pool(dsn):
+    with _pool_lock:
+        pool = _replica_pools.get(dsn)
+        if pool is None:
+            pool = _replica_pools[dsn] = _new_pool(dsn, REPLICA_CONNECT_TIMEOUT)
+        return pool
+
+
+def get_read_router():
+    """Return the process-wide ``ReadRouter`` for ``DATABASE_READ_URLS``.
+
+    Shared with ``async_database`` so writes through either layer steer
+    later reads to the primary.
+    """
+    global _read_router
+
+    with _read_router_lock:
+        if (
+            _read_router is None
+            or _read_router.replicas != DATABASE_READ_URLS
+            or _read_router.strategy != DB_READ_STRATEGY
+        ):
+            _read_router = ReadRouter(
+                DATABASE_READ_URLS,
+                strategy=DB_READ_STRATEGY,
+                read_your_writes=READ_YOUR_WRITES_SECONDS,
+                retry_after=REPLICA_RETRY_SECONDS,
+            )
+        return _read_router
+
+
+def close_pool():
+    """Close the process-wide connection pools, if any were created."""
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        for pool in _replica_pools.values():
+            pool.close()
+        _replica_pools.clear()
+
 
-    if cur is None:
-        with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-            create_tables(cur)
+def get_pool_stats():
+    """Return connection pool statistics, or an empty dict before first use.
+
+    With read replicas configured, their pools and the routing counters are
+    listed under ``"replicas"`` and ``"routing"``.
+    """
+    with _pool_lock:
+        stats = _pool.stats() if _pool is not None else {}
+        if DATABASE_READ_URLS:
+            stats["replicas"] = [
+                _replica_pools[dsn].stats() if dsn in _replica_pools else {}
+                for dsn in DATABASE_READ_URLS
+            ]
+    if DATABASE_READ_URLS:
+        stats["routing"] = get_read_router().stats()
+    return stats
+
+
+@contextmanager
+def _get_connection(read=None):
+    """Borrow a pooled connection for the duration of one transaction.
+
+    Read-only callers pass *read*, the data they query (``"deals"``,
+    ``"owner_deals"`` or a tuple of both), and may then be served by a
+    replica; if the replica cannot be reached the primary is used.
+    """
+    if read is None:
+        with get_pool().connection() as conn:
+            with conn:
+                yield conn
         return
 
+    router = get_read_router()
+    with router.route(read) as dsn:
+        pool = get_pool()
+        conn = None
+        if dsn is not None:
+            try:
+                pool = _get_replica_pool(dsn)
+                conn = pool.getconn()
+            except Exception as e:
+                logging.warning(f"Read replica unavailable, using the primary: {e}")
+                router.record_fallback(dsn)
+                pool = get_pool()
+        if conn is None:
+            conn = pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            pool.putconn(conn)
+
+
+@timed_query
+def migrate():
+    """Bring the schema up to date once per process and return its version.
+
+    Verifies (and if needed creates) the target database, then applies any
+    pending migrations from ``migrations.MIGRATIONS``. Call it at API or
+    runner startup; the data functions below assume the schema is ready and
+    run no DDL of their own.
+    """
+    global _schema_version
+
+    _ensure_database_url()
+    with _schema_lock:
+        if _schema_version is None:
+            _ensure_database_exists()
+            with _get_connection() as conn, conn.cursor() as cur:
+                _schema_version = apply_migrations(cur)
+            logging.info(f"Database schema is at version {_schema_version}")
+        return _schema_version
+
+
+def create_tables(cur=None):
+    """Create database tables if they do not exist.
+
+    Kept for callers that predate ``migrate()``, which it now delegates to;
+    *cur* is ignored because migrations run in their own transaction.
+    """
+    migrate()
+
+
+_PARTITION_RE = re.compile(r"deal_price_history_p(\d{4})_(\d{2})")
+
+
+def _month_start(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _ensure_price_history_partition(cur, moment):
+    """Create the monthly partition covering *moment* if it is missing."""
+    start = _month_start(moment.year, moment.month)
+    end = _month_start(moment.year, moment.month + 1)
+    # IF NOT EXISTS returns before locking the parent when the partition exists.
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS deal_price_history_p{start:%Y_%m}
+        PARTITION OF deal_price_history
+        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');
+        """
+    )
+
+
+def _drop_expired_price_history(cur, now):
+    """Drop whole monthly partitions past ``PRICE_HISTORY_RETENTION_MONTHS``."""
+    cutoff = _month_start(now.year, now.month - PRICE_HISTORY_RETENTION_MONTHS)
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'deal_price_history'::regclass;
+        """
+    )
+    dropped = []
+    for row in cur.fetchall():
+        name = row[0]
+        match = _PARTITION_RE.fullmatch(str(name))
+        if not match:
+            continue
+        year, month = int(match.group(1)), int(match.group(2))
+        if _month_start(year, month + 1) <= cutoff:
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(sql.Identifier(name)))
+            dropped.append(name)
+    if dropped:
+        logging.info(f"Dropped expired price history partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def _record_price_history(cur):
+    """Append the current price of every deal to ``deal_price_history``."""
+    now = datetime.now(timezone.utc)
+    _ensure_price_history_partition(cur, now)
+    cur.execute(
+        """
+        INSERT INTO deal_price_history (
+            product_url, price_value, original_price_value, discount_value, recorded_at
+        )
+        SELECT product_url, price_value, original_price_value, discount_value, %s
+        FROM deals
+        WHERE product_url IS NOT NULL AND price_value IS NOT NULL;
+        """,
+        (now,),
+    )
+    _drop_expired_price_history(cur, now)
+
+
+def _bump_generation(cur, name="deals"):
+    """Advance the data generation of *name* within the current transaction.
+
+    Readers in any process compare generations to invalidate cached results,
+    so this must run in the same transaction as the data change.
+    """
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS merchants (
-            id SERIAL PRIMARY KEY,
-            name TEXT NOT NULL
-        );
+        INSERT INTO data_generation (name, generation)
+        VALUES (%s, 1)
+        ON CONFLICT (name) DO UPDATE
+        SET generation = data_generation.generation + 1,
+            updated_at = now();
+        """,
+        (name,),
+    )
+
+
+class DataGeneration(NamedTuple):
+    """A row of ``data_generation``: the counter and when it last moved."""
+
+    generation: int
+    updated_at: Optional[datetime]
+
+
+def _get_generation(cur, name="deals"):
+    cur.execute("SELECT generation FROM data_generation WHERE name = %s;", (name,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+# Columns written for every scraped deal, in insert order.
+DEAL_COLUMNS = [
+    "title",
+    "price",
+    "original_price",
+    "discount",
+    "image_url",
+    "product_url",
+    "merchant_id",
+    "merchant_image",
+    "rating",
+    "reviews_count",
+]
+
+# Columns derived at ingest from a scraped field: column -> (field, parser).
+DERIVED_COLUMNS = {
+    "search_vector": ("title", build_search_vector),
+    "price_value": ("price", parse_price),
+    "original_price_value": ("original_price", parse_price),
+    "discount_value": ("discount", parse_discount),
+    "rating_value": ("rating", parse_rating),
+    "reviews_value": ("reviews_count", parse_reviews_count),
+}
+
+# Columns written at ingest: the scraped fields plus derived ones.
+INGEST_COLUMNS = DEAL_COLUMNS + list(DERIVED_COLUMNS)
+
+# Sort keys accepted by ``get_deals_from_db``: the indexed column behind each
+# and its SQL type, used to cast cursor values so the index stays usable.
+SORT_COLUMNS = {
+    "price": ("price_value", "numeric"),
+    "discount": ("discount_value", "numeric"),
+    "rating": ("rating_value", "numeric"),
+    "reviews": ("reviews_value", "integer"),
+}
+
+# Direction used for a sort key when the caller does not choose one.
+DEFAULT_SORT_ORDER = {"price": "asc", "discount": "desc", "rating": "desc", "reviews": "desc"}
+
+# Columns returned for a deal by the read queries, in order.
+DEAL_SELECT_COLUMNS = ["id"] + DEAL_COLUMNS + ["scraped_at", "updated_at"]
+
+# SQL types of the writable deal columns, used to cast batch parameter arrays.
+DEAL_COLUMN_TYPES = dict(
+    {column: "text" for column in DEAL_COLUMNS},
+    merchant_id="integer",
+    search_vector="tsvector",
+    price_value="numeric",
+    original_price_value="numeric",
+    discount_value="numeric",
+    rating_value="numeric",
+    reviews_value="integer",
+)
+
+
+def _copy_value(value):
+    """Encode *value* for ``COPY ... FROM STDIN`` text format."""
+    if value is None:
+        return r"\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _unique_merchant_names(merchant_names):
+    unique_names = {}
+    for name in merchant_names:
+        if name:
+            unique_names.setdefault(name.lower(), name)
+    return list(unique_names.values())
+
+
+def _merchant_resolve_query(table="merchants"):
+    """Return the statement behind ``_resolve_merchant_ids`` for *table*."""
+    return f"""
+        WITH input AS (
+            SELECT unnest(%s::text[]) AS name
+        ),
+        inserted AS (
+            INSERT INTO {table} (name)
+            SELECT name FROM input
+            ON CONFLICT (LOWER(name)) DO NOTHING
+            RETURNING id, name
+        )
+        SELECT id, LOWER(name) FROM inserted
+        UNION ALL
+        SELECT m.id, LOWER(m.name)
+        FROM {table} m
+        JOIN input i ON LOWER(m.name) = LOWER(i.name);
+    """
+
+
+def _resolve_merchant_ids(cur, merchant_names, table="merchants"):
+    """Upsert *merchant_names* and return a ``{lower(name): id}`` mapping.
+
+    All names are resolved with a single statement: new merchants come back
+    from the ``INSERT ... RETURNING`` and existing ones from the join.
+    *table* is ``merchants`` or ``owner_merchants``.
+    """
+    unique_names = _unique_merchant_names(merchant_names)
+    if not unique_names:
+        return {}
+    cur.execute(_merchant_resolve_query(table), (unique_names,))
+    return {name: merchant_id for merchant_id, name in cur.fetchall()}
+
+
+def _deal_row(deal, merchant_ids):
+    merchant_name = deal.get("merchant")
+    merchant_id = merchant_ids.get(merchant_name.lower()) if merchant_name else None
+    return [
+        merchant_id if column == "merchant_id" else deal.get(column)
+        for column in DEAL_COLUMNS
+    ]
+
+
+def _derived_values(deal, fields=None):
+    """Compute ``DERIVED_COLUMNS`` for *deal*, limited to source *fields*."""
+    return {
+        column: parser(deal.get(field))
+        for column, (field, parser) in DERIVED_COLUMNS.items()
+        if fields is None or field in fields
+    }
+
+
+def _ingest_row(deal, merchant_ids):
+    return _deal_row(deal, merchant_ids) + list(_derived_values(deal).values())
+
+
+def _copy_deals(cur, rows, table="deals"):
+    """Load *rows* (ordered as ``INGEST_COLUMNS``) into *table* with COPY."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(INGEST_COLUMNS)}) FROM STDIN", buffer)
+
+
+def _verify_deal_sample(cur, products, merchant_ids, sample_size):
+    """Read back a random sample of loaded deals and log any field mismatches.
+
+    Deals are matched on ``product_url``; rows without one are not sampled.
+    Returns the number of mismatching deals.
+    """
+    candidates = [deal for deal in products if deal.get("product_url")]
+    if not candidates or sample_size <= 0:
+        return 0
+    sample = random.sample(candidates, min(sample_size, len(candidates)))
+    cur.execute(
+        f"SELECT {', '.join(DEAL_COLUMNS)} FROM deals WHERE product_url = ANY(%s);",
+        ([deal["product_url"] for deal in sample],),
+    )
+    stored = {}
+    for row in cur.fetchall():
+        db_deal = dict(zip(DEAL_COLUMNS, row))
+        stored.setdefault(db_deal["product_url"], []).append(db_deal)
+
+    mismatched = 0
+    for deal in sample:
+        expected = dict(zip(DEAL_COLUMNS, _deal_row(deal, merchant_ids)))
+        rows = stored.get(deal["product_url"], [])
+        if expected in rows:
+            continue
+        mismatched += 1
+        db_deal = rows[0] if rows else {}
+        mismatches = {
+            field: {"db": db_deal.get(field), "scraped": expected[field]}
+            for field in DEAL_COLUMNS
+            if db_deal.get(field) != expected[field]
+        }
+        logging.warning(f"Mismatch for deal {deal.get('title')}: {mismatches}")
+    return mismatched
+
+
+def _check_snapshot_size(cur, incoming, force=False):
+    """Raise ``SnapshotRejected`` if *incoming* deals should not replace the current ones.
+
+    A scrape that comes back empty or far smaller than what is published is
+    far more likely a broken scrape than a real change, so the last good
+    snapshot is kept unless *force* is set. Returns the current deal count.
+    """
+    cur.execute("SELECT COUNT(*) FROM deals;")
+    current = cur.fetchone()[0]
+    minimum = max(MIN_SNAPSHOT_PRODUCTS, math.ceil(current * MIN_SNAPSHOT_RATIO))
+    if incoming < minimum and not force:
+        raise SnapshotRejected(
+            f"Refusing to replace {current} published deals with {incoming} scraped "
+            f"deals (minimum {minimum}); pass force=True to override"
+        )
+    return current
+
+
+def _ingest_counts(inserted=0, updated=0, deleted=0, unchanged=0, unkeyed=0):
+    """The result of ``insert_deals``, whatever the mode."""
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": unchanged,
+        "unkeyed": unkeyed,
+    }
+
+
+def _create_staging_table(cur):
+    """Create ``deals_staged``, where a full reload is built before publishing.
+
+    ``position`` keeps the scrape order so published IDs follow it.
+    """
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE deals_staged ON COMMIT DROP AS
+        SELECT {", ".join(INGEST_COLUMNS)} FROM deals WITH NO DATA;
         """
     )
+    cur.execute("ALTER TABLE deals_staged ADD COLUMN position BIGSERIAL;")
+
+
+def _publish_staged_deals(cur):
+    """Replace the deals with ``deals_staged`` and drop orphaned merchants.
+
+    Runs last in the loading transaction: the exclusive lock taken by
+    ``TRUNCATE`` is held only for this table-to-table copy, after which
+    readers see the new snapshot, never an empty or partial one. Returns the
+    number of deals published.
+    """
+    columns = ", ".join(INGEST_COLUMNS)
+    cur.execute("TRUNCATE TABLE deals RESTART IDENTITY CASCADE;")
     cur.execute(
-        "CREATE UNIQUE INDEX IF NOT EXISTS merchant_name_unique_idx ON merchants (LOWER(name));"
+        f"INSERT INTO deals ({columns}) SELECT {columns} FROM deals_staged ORDER BY position;"
     )
+    published = cur.rowcount
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS deals (
-            id SERIAL PRIMARY KEY,
-            title TEXT,
-            price TEXT,
-            original_price TEXT,
-            discount TEXT,
-            image_url TEXT,
-            product_url TEXT,
-            merchant_id INTEGER,
-            merchant_image TEXT,
-            rating TEXT,
-            reviews_count TEXT,
-            scraped_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok'),
-            updated_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok')
-        );
+        DELETE FROM merchants m
+        WHERE NOT EXISTS (SELECT 1 FROM deals d WHERE d.merchant_id = m.id);
         """
     )
+    return published
 
 
-def insert_deals(deals_data):
-    _ensure_database_exists()
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-        create_tables(cur)
-        # Clear existing data
-        cur.execute("TRUNCATE TABLE merchants RESTART IDENTITY;")
-        cur.execute("TRUNCATE TABLE deals RESTART IDENTITY CASCADE;")
+def _insert_deals_bulk(deals_data, verify_sample=0, force=False):
+    products = deals_data["products"]
+    with _get_connection() as conn, conn.cursor() as cur:
+        replaced = _check_snapshot_size(cur, len(products), force)
+        merchant_ids = _resolve_merchant_ids(
+            cur, [deal.get("merchant") for deal in products]
+        )
+        _create_staging_table(cur)
+        _copy_deals(
+            cur,
+            (_ingest_row(deal, merchant_ids) for deal in products),
+            table="deals_staged",
+        )
+        published = _publish_staged_deals(cur)
+        mismatched = _verify_deal_sample(cur, products, merchant_ids, verify_sample)
+        _record_price_history(cur)
+        _bump_generation(cur)
+
+    logging.info(
+        f"Bulk loaded {published} deals for {len(merchant_ids)} merchants"
+        + (f" ({mismatched} of {verify_sample} sampled deals mismatched)" if verify_sample else "")
+    )
+    return _ingest_counts(inserted=published, deleted=replaced)
+
+
+def _sync_deals(deals_data, verify_sample=0, force=False):
+    products = deals_data["products"]
+    # The last occurrence of a product URL wins, as it would have on reload.
+    by_url = {}
+    unkeyed = []
+    for deal in products:
+        if deal.get("product_url"):
+            by_url[deal["product_url"]] = deal
+        else:
+            unkeyed.append(deal)
+    incoming = list(by_url.values()) + unkeyed
+
+    columns = ", ".join(INGEST_COLUMNS)
+    changed = " OR ".join(f"d.{c} IS DISTINCT FROM i.{c}" for c in INGEST_COLUMNS)
+    assignments = ", ".join(f"{c} = i.{c}" for c in INGEST_COLUMNS)
 
-        # Insert merchants first to ensure fresh IDs
+    with _get_connection() as conn, conn.cursor() as cur:
+        _check_snapshot_size(cur, len(incoming), force)
+        merchant_ids = _resolve_merchant_ids(
+            cur, [deal.get("merchant") for deal in incoming]
+        )
+
+        cur.execute(
+            f"""
+            CREATE TEMP TABLE deals_incoming ON COMMIT DROP AS
+            SELECT {columns} FROM deals WITH NO DATA;
+            """
+        )
+        _copy_deals(
+            cur,
+            (_ingest_row(deal, merchant_ids) for deal in incoming),
+            table="deals_incoming",
+        )
+
+        cur.execute(
+            """
+            DELETE FROM deals d
+            WHERE d.product_url IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM deals_incoming i WHERE i.product_url = d.product_url
+              );
+            """
+        )
+        deleted = cur.rowcount
+        # Deals without a product URL have no stable identity, so they are
+        # replaced on every sync and counted apart as ``unkeyed``.
+        cur.execute("DELETE FROM deals WHERE product_url IS NULL;")
+        cur.execute(
+            f"""
+            UPDATE deals d
+            SET {assignments},
+                updated_at = now()
+            FROM deals_incoming i
+            WHERE d.product_url = i.product_url AND ({changed});
+            """
+        )
+        updated = cur.rowcount
+        cur.execute(
+            f"""
+            INSERT INTO deals ({columns})
+            SELECT {columns}
+            FROM deals_incoming i
+            WHERE i.product_url IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM deals d WHERE d.product_url = i.product_url
+              );
+            """
+        )
+        inserted = cur.rowcount
+        cur.execute(
+            f"""
+            INSERT INTO deals ({columns})
+            SELECT {columns} FROM deals_incoming i WHERE i.product_url IS NULL;
+            """
+        )
+        unkeyed = cur.rowcount
+        cur.execute(
+            """
+            DELETE FROM merchants m
+            WHERE NOT EXISTS (SELECT 1 FROM deals d WHERE d.merchant_id = m.id);
+            """
+        )
+        mismatched = _verify_deal_sample(cur, incoming, merchant_ids, verify_sample)
+        _record_price_history(cur)
+        _bump_generation(cur)
+
+    counts = _ingest_counts(
+        inserted=inserted,
+        updated=updated,
+        deleted=deleted,
+        unchanged=max(len(by_url) - inserted - updated, 0),
+        unkeyed=unkeyed,
+    )
+    logging.info(
+        f"Synced {len(incoming)} deals: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['deleted']} deleted, "
+        f"{counts['unchanged']} unchanged, {counts['unkeyed']} without a product URL replaced"
+        + (f" ({mismatched} of {verify_sample} sampled deals mismatched)" if verify_sample else "")
+    )
+    return counts
+
+
+@timed_query
+def insert_deals(
+    deals_data,
+    bulk: bool = False,
+    verify_sample: int = 0,
+    sync: bool = False,
+    force: bool = False,
+):
+    """Replace the scraped deals with ``deals_data["products"]``.
+
+    Every mode loads and publishes in a single transaction, so readers keep
+    seeing the previous complete snapshot until it commits. A full reload is
+    built in a staging table first and swapped in at the end. Unless *force*
+    is set, ``SnapshotRejected`` is raised and nothing changes when the scrape
+    has fewer than ``MIN_SNAPSHOT_PRODUCTS`` deals or fewer than
+    ``MIN_SNAPSHOT_RATIO`` times the deals currently published.
+
+    With ``bulk=True`` all merchant IDs are resolved in one statement and the
+    deals are streamed in with a single ``COPY`` inside one transaction. Only
+    ``verify_sample`` randomly chosen deals are read back and compared with
+    the scraped values. The default row-by-row path verifies every deal.
+
+    With ``sync=True`` the table is not truncated. Deals are matched on
+    ``product_url``: new ones are inserted, changed ones are updated in place
+    (bumping ``updated_at``) and ones missing from the scrape are deleted, so
+    row IDs of unchanged deals survive. Deals without a product URL cannot
+    be matched and are replaced wholesale.
+
+    Every mode returns the committed changes as a dict of ``inserted``,
+    ``updated``, ``deleted``, ``unchanged`` and ``unkeyed`` (deals without a
+    product URL, replaced) counts. A full reload reports every published
+    deal as inserted and every previous one as deleted.
+    """
+    if sync:
+        return _sync_deals(deals_data, verify_sample, force)
+    if bulk:
+        return _insert_deals_bulk(deals_data, verify_sample, force)
+
+    with _get_connection() as conn, conn.cursor() as cur:
+        replaced = _check_snapshot_size(cur, len(deals_data["products"]), force)
+        _create_staging_table(cur)
+
+        # Insert merchants first so each row can look up its ID
         for deal in deals_data["products"]:
             merchant_name = deal.get("merchant")
             if merchant_name:
@@ -117,6 +815,8 @@ def insert_deals(deals_data):
                 )
 
         for deal in deals_data["products"]:
+            # A failed row rolls back to here instead of discarding the load.
+            cur.execute("SAVEPOINT deal_row;")
             try:
                 merchant_name = deal.get("merchant")
                 if merchant_name:
@@ -132,33 +832,16 @@ def insert_deals(deals_data):
                     merchant_id = None
 
                 cur.execute(
-                    """
-                    INSERT INTO deals (
-                        title,
-                        price,
-                        original_price,
-                        discount,
-                        image_url,
-                        product_url,
-                        merchant_id,
-                        merchant_image,
-                        rating,
-                        reviews_count
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    f"""
+                    INSERT INTO deals_staged ({", ".join(INGEST_COLUMNS)})
+                    VALUES ({", ".join(["%s"] * len(INGEST_COLUMNS))})
                     RETURNING title, price, original_price, discount, image_url, product_url, merchant_id, merchant_image, rating, reviews_count;
                     """,
-                    (
-                        deal.get("title"),
-                        deal.get("price"),
-                        deal.get("original_price"),
-                        deal.get("discount"),
-                        deal.get("image_url"),
-                        deal.get("product_url"),
-                        merchant_id,
-                        deal.get("merchant_image"),
-                        deal.get("rating"),
-                        deal.get("reviews_count"),
+                    tuple(
+                        _ingest_row(
+                            deal,
+                            {merchant_name.lower(): merchant_id} if merchant_name else {},
+                        )
                     ),
                 )
                 returned_row = cur.fetchone()
@@ -195,281 +878,1000 @@ def insert_deals(deals_data):
                 )
             except Exception as e:
                 logging.error(f"Error inserting deal: {e}")
-                conn.rollback()
+                cur.execute("ROLLBACK TO SAVEPOINT deal_row;")
+            else:
+                cur.execute("RELEASE SAVEPOINT deal_row;")
+        published = _publish_staged_deals(cur)
+        _record_price_history(cur)
+        _bump_generation(cur)
+    return _ingest_counts(inserted=published, deleted=replaced)
 
 
+@timed_query
 def get_all_merchants():
-    _ensure_database_exists()
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+    with _get_connection(read="deals") as conn, conn.cursor() as cur:
         cur.execute("SELECT name FROM merchants ORDER BY name")
         merchants = [row[0] for row in cur.fetchall()]
     return merchants
 
 
+@timed_query
 def get_merchants_last_value():
     """Return the current value of the merchants ID sequence."""
-    _ensure_database_exists()
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+    with _get_connection() as conn, conn.cursor() as cur:
         cur.execute("SELECT last_value FROM merchants_id_seq;")
         return cur.fetchone()[0]
 
 
-def get_deals_from_db(
-    page: int = 1, page_size: int = 50, merchant: str = None, title: str = None
-):
-    _ensure_database_exists()
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-        offset = (page - 1) * page_size
+def _encode_cursor(values: dict) -> str:
+    """Encode keyset position *values* as an opaque URL-safe cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
-        count_query = (
-            "SELECT COUNT(*) FROM deals d LEFT JOIN merchants m ON d.merchant_id = m.id"
-        )
-        params = []
-        if merchant:
-            count_query += " WHERE LOWER(m.name) = LOWER(%s)"
-            params.append(merchant)
-        if title:
-            if "WHERE" in count_query:
-                count_query += " AND LOWER(d.title) LIKE LOWER(%s)"
-            else:
-                count_query += " WHERE LOWER(d.title) LIKE LOWER(%s)"
-            params.append(f"%{title}%")
 
-        cur.execute(count_query, tuple(params))
-        total_products = cur.fetchone()[0]
+def _decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by ``_encode_cursor``.
 
-        select_query = """
-            SELECT d.*, COALESCE(m.name, '') AS merchant
-            FROM deals d
-            LEFT JOIN merchants m ON d.merchant_id = m.id
-        """
-        if merchant:
-            select_query += " WHERE LOWER(m.name) = LOWER(%s)"
-        if title:
-            if "WHERE" in select_query:
-                select_query += " AND LOWER(d.title) LIKE LOWER(%s)"
-            else:
-                select_query += " WHERE LOWER(d.title) LIKE LOWER(%s)"
+    Raises ``ValueError`` if *cursor* is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, dict) or not isinstance(values.get("id"), int):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
 
-        select_query += " ORDER BY d.id ASC LIMIT %s OFFSET %s"
-        params.extend([page_size, offset])
 
-        cur.execute(select_query, tuple(params))
-        deals = cur.fetchall()
+def _cached_count(generation, key):
+    global _count_cache_generation
 
-    columns = [
-        "id",
-        "title",
-        "price",
-        "original_price",
-        "discount",
-        "image_url",
-        "product_url",
-        "merchant_id",
-        "merchant_image",
-        "rating",
-        "reviews_count",
-        "scraped_at",
-        "updated_at",
-        "merchant",
-    ]
+    with _count_cache_lock:
+        if _count_cache_generation != generation:
+            _count_cache.clear()
+            _count_cache_generation = generation
+            return None
+        total = _count_cache.get(key)
+        if total is not None:
+            _count_cache.move_to_end(key)
+        return total
+
+
+def _store_count(generation, key, total):
+    with _count_cache_lock:
+        if _count_cache_generation != generation:
+            return
+        _count_cache[key] = total
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+
+def _plan_rows(plan):
+    """Return the row estimate from ``EXPLAIN (FORMAT JSON)`` output."""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _estimate_count(cur, query, params):
+    """Return the planner's row estimate for *query* without executing it."""
+    cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    return _plan_rows(cur.fetchone()[0])
+
+
+class _PageQuery(NamedTuple):
+    """SQL for one page of deals, shared by the sync and async data layers."""
+
+    count_query: str
+    count_params: tuple
+    select_query: str
+    select_params: tuple
+    total: str
+    cache_key: Optional[tuple]
+    position: Optional[str]  # cursor field besides ``id``: "key", "rank" or None
+    page: int
+    page_size: int
+    # Extra cursor fields that pin the cursor to the ordering it was issued for.
+    ordering: Optional[dict] = None
+
+
+def _plan_deals_page(
+    page: int = 1,
+    page_size: int = 50,
+    merchant: str = None,
+    title: str = None,
+    cursor: str = None,
+    total: str = "exact",
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+) -> _PageQuery:
+    """Validate the arguments of ``get_deals_from_db`` and build its queries.
+
+    With *page_size* ``None`` the select query covers the whole result set.
+    """
+    if total not in ("exact", "estimate", "none"):
+        raise ValueError(f"Invalid total mode: {total!r}")
+    if sort is not None and sort not in SORT_COLUMNS:
+        raise ValueError(f"Invalid sort key: {sort!r}")
+    if order not in (None, "asc", "desc"):
+        raise ValueError(f"Invalid sort order: {order!r}")
+    after = _decode_cursor(cursor) if cursor else None
+    search = build_search_query(title) if title else None
+    if sort:
+        sort_column, sort_type = SORT_COLUMNS[sort]
+        order = order or DEFAULT_SORT_ORDER[sort]
+        if after and not isinstance(after.get("key"), str):
+            raise ValueError(f"Invalid cursor for sort {sort!r}: {cursor!r}")
+    elif after and search and not isinstance(after.get("rank"), (int, float)):
+        raise ValueError(f"Invalid cursor for a title search: {cursor!r}")
+
+    offset = (page - 1) * page_size if page_size is not None else 0
+
+    conditions = []
+    params = []
+    if merchant:
+        conditions.append("LOWER(m.name) = LOWER(%s)")
+        params.append(merchant)
+    if search:
+        conditions.append("d.search_vector @@ %s::tsquery")
+        params.append(search.match)
+    elif title:
+        conditions.append("LOWER(d.title) LIKE LOWER(%s)")
+        params.append(f"%{title}%")
+    if min_price is not None:
+        conditions.append("d.price_value >= %s::numeric")
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append("d.price_value <= %s::numeric")
+        params.append(max_price)
+    if min_discount is not None:
+        conditions.append("d.discount_value >= %s::numeric")
+        params.append(min_discount)
+    if sort:
+        conditions.append(f"d.{sort_column} IS NOT NULL")
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+    count_query = (
+        "SELECT COUNT(*) FROM deals d LEFT JOIN merchants m ON d.merchant_id = m.id"
+        + where
+    )
+    count_params = tuple(params)
+    cache_key = (
+        merchant.lower() if merchant else None,
+        title or None,
+        min_price,
+        max_price,
+        min_discount,
+        sort_column if sort else None,
+    )
+
+    rank = "ts_rank(d.search_vector, %s::tsquery)"
+    if after and sort:
+        operator = ">" if order == "asc" else "<"
+        conditions.append(f"(d.{sort_column}, d.id) {operator} (%s::{sort_type}, %s)")
+        params.extend([after["key"], after["id"]])
+        offset = 0
+    elif after and search:
+        conditions.append(f"({rank} < %s::real OR ({rank} = %s::real AND d.id > %s))")
+        params.extend([search.rank, after["rank"], search.rank, after["rank"], after["id"]])
+        offset = 0
+    elif after:
+        conditions.append("d.id > %s")
+        params.append(after["id"])
+        offset = 0
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+    select_columns = ", ".join(f"d.{column}" for column in DEAL_SELECT_COLUMNS)
+    select_query = f"""
+        SELECT {select_columns}, COALESCE(m.name, '') AS merchant
+    """
+    select_params = []
+    if sort:
+        select_query += f", d.{sort_column}"
+    elif search:
+        select_query += f", {rank} AS rank"
+        select_params.append(search.rank)
+    select_query += """
+        FROM deals d
+        LEFT JOIN merchants m ON d.merchant_id = m.id
+    """
+    select_query += where
+    if sort:
+        select_query += f" ORDER BY d.{sort_column} {order.upper()}, d.id {order.upper()}"
+    elif search:
+        select_query += " ORDER BY rank DESC, d.id ASC"
+    else:
+        select_query += " ORDER BY d.id ASC"
+    if page_size is not None:
+        # Fetch one extra row to learn whether another page follows.
+        select_query += " LIMIT %s OFFSET %s"
+        params.extend([page_size + 1, offset])
+
+    return _PageQuery(
+        count_query=count_query,
+        count_params=count_params,
+        select_query=select_query,
+        select_params=tuple(select_params + params),
+        total=total,
+        cache_key=cache_key,
+        position="key" if sort else "rank" if search else None,
+        page=page,
+        page_size=page_size,
+    )
 
-    deals_list = [dict(zip(columns, deal)) for deal in deals]
+
+def _deal_dicts(rows, columns):
+    """Map fetched rows to deal dicts; extra trailing sort columns are dropped."""
+    deals_list = [dict(zip(columns, row)) for row in rows]
     for deal in deals_list:
         deal["merchant"] = str(deal.get("merchant") or "")
+    return deals_list
+
+
+def _page_result(plan: _PageQuery, rows, columns, total_products):
+    """Map the rows fetched for *plan* to the paged response dict."""
+    has_more = len(rows) > plan.page_size
+    rows = rows[:plan.page_size]
+    deals_list = _deal_dicts(rows, columns)
+
+    next_cursor = None
+    if has_more:
+        position = {"id": deals_list[-1]["id"]}
+        if plan.position == "key":
+            position["key"] = str(rows[-1][len(columns)])
+        elif plan.position == "rank":
+            position["rank"] = rows[-1][len(columns)]
+        next_cursor = _encode_cursor(position)
 
     return {
         "total_products": total_products,
         "products": deals_list,
-        "page": page,
-        "page_size": page_size,
+        "page": plan.page,
+        "page_size": plan.page_size,
+        "next_cursor": next_cursor,
     }
 
-def update_deal(deal_id: int, deal_data: dict):
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-        fields = []
-        values = []
-        for key, value in deal_data.items():
-            fields.append(sql.Identifier(key))
-            values.append(value)
-        
-        values.append(deal_id)
 
-        query = sql.SQL("UPDATE deals SET ({}) = ({}) WHERE id = %s").format(
-            sql.SQL(', ').join(fields),
-            sql.SQL(', ').join(sql.Placeholder() * len(fields))
+@timed_query
+def get_deals_from_db(
+    page: int = 1,
+    page_size: int = 50,
+    merchant: str = None,
+    title: str = None,
+    cursor: str = None,
+    total: str = "exact",
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+):
+    """Return one page of scraped deals.
+
+    Deals are ordered by ``d.id``, or by relevance when *title* is given:
+    the title is matched against the indexed ``search_vector`` (see
+    ``search.build_search_query``) and ranked with ``ts_rank``. *sort* (one
+    of ``SORT_COLUMNS``) orders by a parsed numeric column instead, in
+    *order* (``"asc"``/``"desc"``, default from ``DEFAULT_SORT_ORDER``);
+    deals without a value for that column are left out. *min_price*,
+    *max_price* and *min_discount* filter on the same indexed columns.
+
+    Pages are addressed either by ``page`` (``OFFSET``) or, when *cursor* is
+    given, by seeking past the sort key of the last row of the previous page,
+    which costs the same at any depth. ``next_cursor`` is ``None`` on the
+    last page.
+
+    *total* selects how ``total_products`` is computed: ``"exact"`` runs a
+    ``COUNT(*)`` once per filter combination and data generation and serves
+    it from cache afterwards, ``"estimate"`` uses the planner's row estimate
+    and ``"none"`` skips it (``total_products`` is ``None``).
+    """
+    plan = _plan_deals_page(
+        page, page_size, merchant, title, cursor, total,
+        min_price, max_price, min_discount, sort, order,
+    )
+
+    with _get_connection(read="deals") as conn, conn.cursor() as cur:
+        total_products = None
+        if plan.total == "estimate":
+            total_products = _estimate_count(cur, plan.count_query, plan.count_params)
+        elif plan.total == "exact":
+            generation = _get_generation(cur)
+            total_products = _cached_count(generation, plan.cache_key)
+            if total_products is None:
+                cur.execute(plan.count_query, plan.count_params)
+                total_products = cur.fetchone()[0]
+                _store_count(generation, plan.cache_key, total_products)
+
+        cur.execute(plan.select_query, plan.select_params)
+        deals = cur.fetchall()
+
+    return _page_result(plan, deals, DEAL_SELECT_COLUMNS + ["merchant"], total_products)
+
+def _update_statement(table: str, deal_data: dict, deal_id: int, sql_module=sql):
+    """Build ``UPDATE <table> SET (...) = (...) WHERE id = %s`` for *deal_data*.
+
+    *sql_module* is ``psycopg2.sql`` or, for the async layer, ``psycopg.sql``.
+    """
+    fields = []
+    values = []
+    for key, value in deal_data.items():
+        fields.append(sql_module.Identifier(key))
+        values.append(value)
+
+    values.append(deal_id)
+
+    # ROW() is required when only one column is set.
+    query = sql_module.SQL("UPDATE {} SET ({}) = ROW({}) WHERE id = %s").format(
+        sql_module.Identifier(table),
+        sql_module.SQL(', ').join(fields),
+        sql_module.SQL(', ').join(sql_module.Placeholder() * len(fields))
+    )
+    return query, tuple(values)
+
+
+def _plan_deals_export(merchant, title, min_price, max_price, min_discount, sort, order):
+    return _plan_deals_page(
+        page_size=None,
+        merchant=merchant,
+        title=title,
+        total="none",
+        min_price=min_price,
+        max_price=max_price,
+        min_discount=min_discount,
+        sort=sort,
+        order=order,
+    )
+
+
+def stream_deals(
+    merchant: str = None,
+    title: str = None,
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+    batch_size: int = None,
+):
+    """Return an iterator over every deal matching the filters, in batches.
+
+    Filters and ordering are those of ``get_deals_from_db``; invalid ones
+    raise ``ValueError`` here, before anything is fetched. Rows come from a
+    server-side cursor *batch_size* (default ``EXPORT_BATCH_SIZE``) at a
+    time, so memory stays flat however many deals match. The connection is
+    held until the iterator is exhausted or closed.
+    """
+    plan = _plan_deals_export(merchant, title, min_price, max_price, min_discount, sort, order)
+    return _stream_deal_batches(plan, batch_size or EXPORT_BATCH_SIZE)
+
+
+def _stream_deal_batches(plan, batch_size):
+    columns = DEAL_SELECT_COLUMNS + ["merchant"]
+    with _get_connection(read="deals") as conn:
+        with conn.cursor(name="deals_export") as cur:
+            cur.itersize = batch_size
+            cur.execute(plan.select_query, plan.select_params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield _deal_dicts(rows, columns)
+
+
+def _check_batch_ids(ids, what):
+    seen = set()
+    for deal_id in ids:
+        if deal_id in seen:
+            raise ValueError(f"Deal {deal_id} appears more than once in {what}")
+        seen.add(deal_id)
+
+
+def _batch_update_statements(table, items, sql_module=sql):
+    """Yield ``(query, params, status)`` applying *items* to *table*.
+
+    Each item is a dict of ``id`` plus the columns to set. Items setting the
+    same columns share one ``UPDATE ... FROM unnest(...)`` statement. Every
+    query returns the IDs it matched, which get *status* (``"updated"``, or
+    ``"unchanged"`` for items without columns).
+    """
+    groups = {}
+    for item in items:
+        fields = tuple(key for key in item if key != "id")
+        groups.setdefault(fields, []).append(item)
+
+    for fields, group in groups.items():
+        ids = [item["id"] for item in group]
+        if not fields:
+            query = sql_module.SQL("SELECT id FROM {} WHERE id = ANY(%s)").format(
+                sql_module.Identifier(table)
+            )
+            yield query, (ids,), "unchanged"
+            continue
+        query = sql_module.SQL(
+            "UPDATE {} AS d SET {} FROM unnest(%s::integer[], {}) AS v(id, {}) "
+            "WHERE d.id = v.id RETURNING d.id"
+        ).format(
+            sql_module.Identifier(table),
+            sql_module.SQL(", ").join(
+                sql_module.SQL("{} = {}").format(
+                    sql_module.Identifier(field), sql_module.Identifier("v", field)
+                )
+                for field in fields
+            ),
+            sql_module.SQL(", ").join(
+                sql_module.SQL(f"%s::{DEAL_COLUMN_TYPES[field]}[]") for field in fields
+            ),
+            sql_module.SQL(", ").join(sql_module.Identifier(field) for field in fields),
         )
-        
-        cur.execute(query, tuple(values))
+        params = [ids] + [[item[field] for item in group] for field in fields]
+        yield query, tuple(params), "updated"
 
-def create_owner_tables(cur=None):
-    """Create owner-specific database tables if they do not exist."""
-    _ensure_database_exists()
-    _ensure_database_url()
 
-    if cur is None:
-        with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-            create_owner_tables(cur)
-        return
+def _batch_results(ids, statuses):
+    return [{"id": deal_id, "status": statuses.get(deal_id, "not_found")} for deal_id in ids]
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS owner_merchants (
-            id SERIAL PRIMARY KEY,
-            name TEXT NOT NULL
-        );
-        """
+
+def _deal_batch_items(updates):
+    _check_batch_ids([item["id"] for item in updates], "the update list")
+    return [dict(item, **_derived_values(item, fields=item)) for item in updates]
+
+
+@timed_query
+def update_deals_batch(updates):
+    """Apply several scraped-deal edits in one transaction.
+
+    *updates* are dicts of ``id`` plus the fields to change, as for
+    ``update_deal``. Returns one ``{"id", "status"}`` per item, in order,
+    with status ``"updated"``, ``"unchanged"`` or ``"not_found"``.
+    """
+    items = _deal_batch_items(updates)
+    statuses = {}
+    with _get_connection() as conn, conn.cursor() as cur:
+        for query, params, status in _batch_update_statements("deals", items):
+            cur.execute(query, params)
+            statuses.update((row[0], status) for row in cur.fetchall())
+        if "updated" in statuses.values():
+            _bump_generation(cur)
+    get_read_router().mark_written("deals")
+    return _batch_results([item["id"] for item in items], statuses)
+
+
+@timed_query
+def update_deal(deal_id: int, deal_data: dict):
+    deal_data = dict(deal_data, **_derived_values(deal_data, fields=deal_data))
+    with _get_connection() as conn, conn.cursor() as cur:
+        cur.execute(*_update_statement("deals", deal_data, deal_id))
+        _bump_generation(cur)
+    get_read_router().mark_written("deals")
+
+
+_PRICE_HISTORY_QUERY = """
+    WITH series AS (
+        SELECT recorded_at, price_value, original_price_value, discount_value
+        FROM deal_price_history
+        WHERE product_url = %s
+          AND (%s::timestamptz IS NULL OR recorded_at >= %s::timestamptz)
+          AND (%s::timestamptz IS NULL OR recorded_at <= %s::timestamptz)
+    ),
+    bounds AS (
+        SELECT
+            MIN(recorded_at) AS lo,
+            GREATEST(EXTRACT(EPOCH FROM MAX(recorded_at) - MIN(recorded_at)), 1) AS span
+        FROM series
     )
-    cur.execute(
-        "CREATE UNIQUE INDEX IF NOT EXISTS owner_merchant_name_unique_idx ON owner_merchants (LOWER(name));"
+    SELECT
+        to_timestamp(AVG(EXTRACT(EPOCH FROM s.recorded_at))) AS recorded_at,
+        ROUND(AVG(s.price_value), 2) AS price,
+        MIN(s.price_value) AS min_price,
+        MAX(s.price_value) AS max_price,
+        ROUND(AVG(s.original_price_value), 2) AS original_price,
+        ROUND(AVG(s.discount_value), 2) AS discount,
+        COUNT(*) AS samples
+    FROM series s, bounds b
+    GROUP BY LEAST(
+        FLOOR(EXTRACT(EPOCH FROM s.recorded_at - b.lo) / b.span * %s),
+        %s - 1
     )
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS owner_deals (
-            id SERIAL PRIMARY KEY,
-            title TEXT,
-            price TEXT,
-            original_price TEXT,
-            discount TEXT,
-            image_url TEXT,
-            product_url TEXT,
-            merchant_id INTEGER,
-            merchant_image TEXT,
-            rating TEXT,
-            reviews_count TEXT,
-            created_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok'),
-            updated_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok')
-        );
-        """
+    ORDER BY 1;
+"""
+
+_PRICE_HISTORY_COLUMNS = [
+    "recorded_at", "price", "min_price", "max_price",
+    "original_price", "discount", "samples",
+]
+
+
+def _price_history_params(product_url, points, since, until):
+    if points < 1:
+        raise ValueError("points must be at least 1")
+    return (product_url, since, since, until, until, points, points)
+
+
+@timed_query
+def get_deal_price_history(deal_id: int, points: int = 200, since=None, until=None):
+    """Return the price history of a scraped deal, downsampled to *points*.
+
+    History is keyed on the deal's ``product_url``, so it survives the deal
+    being re-created. The ``[since, until]`` range (default: everything) is
+    split into *points* equal time buckets; each bucket reports its average
+    price together with the minimum and maximum so short spikes stay
+    visible. Returns ``None`` if the deal does not exist.
+    """
+    _price_history_params(None, points, since, until)
+
+    with _get_connection(read="deals") as conn, conn.cursor() as cur:
+        cur.execute("SELECT product_url FROM deals WHERE id = %s;", (deal_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        product_url = row[0]
+
+        cur.execute(
+            _PRICE_HISTORY_QUERY,
+            _price_history_params(product_url, points, since, until),
+        )
+        rows = cur.fetchall()
+
+    return {
+        "deal_id": deal_id,
+        "product_url": product_url,
+        "points": [dict(zip(_PRICE_HISTORY_COLUMNS, row)) for row in rows],
+    }
+
+def create_owner_tables(cur=None):
+    """Create owner-specific database tables if they do not exist.
+
+    Like ``create_tables``, this now just runs ``migrate()``.
+    """
+    migrate()
+
+_OWNER_MERCHANT_UPSERT = """
+    INSERT INTO owner_merchants (name)
+    VALUES (%s)
+    ON CONFLICT (LOWER(name)) DO UPDATE SET name = EXCLUDED.name
+    RETURNING id;
+"""
+
+# Owner deals carry the same derived columns as scraped ones.
+_OWNER_DEAL_INSERT = f"""
+    INSERT INTO owner_deals ({", ".join(INGEST_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(INGEST_COLUMNS))})
+    RETURNING id;
+"""
+
+OWNER_DEAL_COLUMNS = [
+    "id", "title", "price", "original_price", "discount", "image_url",
+    "product_url", "merchant_id", "merchant_image", "rating",
+    "reviews_count", "created_at", "updated_at",
+]
+
+
+# IDs are drawn per input row alongside its ordinality, so the returned IDs
+# follow input order regardless of the order the rows are inserted in.
+_OWNER_DEAL_BATCH_INSERT = f"""
+    WITH input AS (
+        SELECT u.*, nextval(pg_get_serial_sequence('owner_deals', 'id')) AS id
+        FROM unnest({", ".join(f"%s::{DEAL_COLUMN_TYPES[c]}[]" for c in INGEST_COLUMNS)})
+            WITH ORDINALITY AS u({", ".join(INGEST_COLUMNS)}, ordinality)
+    ), inserted AS (
+        INSERT INTO owner_deals (id, {", ".join(INGEST_COLUMNS)})
+        SELECT id, {", ".join(INGEST_COLUMNS)} FROM input
+        RETURNING id
     )
+    SELECT input.id FROM input JOIN inserted USING (id) ORDER BY input.ordinality;
+"""
+
+_OWNER_DEAL_BATCH_DELETE = "DELETE FROM owner_deals WHERE id = ANY(%s) RETURNING id;"
 
+
+def _owner_deal_values(deal_data, merchant_id):
+    """Return the ``INGEST_COLUMNS`` values of a new owner deal."""
+    return tuple(
+        merchant_id if column == "merchant_id" else deal_data.get(column)
+        for column in DEAL_COLUMNS
+    ) + tuple(_derived_values(deal_data).values())
+
+
+def _owner_deal_changes(deal_data):
+    """Add the derived columns affected by an owner deal update."""
+    return dict(deal_data, **_derived_values(deal_data, fields=deal_data))
+
+
+@timed_query
 def insert_owner_deal(deal_data):
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-        create_owner_tables(cur)
+    with _get_connection() as conn, conn.cursor() as cur:
         
         merchant_name = deal_data.get("merchant")
         merchant_id = None
         if merchant_name:
             # Insert merchant and get id
-            cur.execute(
-                """
-                INSERT INTO owner_merchants (name)
-                VALUES (%s)
-                ON CONFLICT (LOWER(name)) DO UPDATE SET name = EXCLUDED.name
-                RETURNING id;
-                """,
-                (merchant_name,),
-            )
+            cur.execute(_OWNER_MERCHANT_UPSERT, (merchant_name,))
             merchant_id_result = cur.fetchone()
             if merchant_id_result:
                 merchant_id = merchant_id_result[0]
 
         # Insert deal
-        cur.execute(
-            """
-            INSERT INTO owner_deals (
-                title, price, original_price, discount, image_url,
-                product_url, merchant_id, merchant_image, rating, reviews_count
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id;
-            """,
-            (
-                deal_data.get("title"),
-                deal_data.get("price"),
-                deal_data.get("original_price"),
-                deal_data.get("discount"),
-                deal_data.get("image_url"),
-                deal_data.get("product_url"),
-                merchant_id,
-                deal_data.get("merchant_image"),
-                deal_data.get("rating"),
-                deal_data.get("reviews_count"),
-            ),
-        )
+        cur.execute(_OWNER_DEAL_INSERT, _owner_deal_values(deal_data, merchant_id))
         deal_id = cur.fetchone()[0]
+        _bump_generation(cur, "owner_deals")
         conn.commit()
-        return deal_id
+    get_read_router().mark_written("owner_deals")
+    return deal_id
 
-def get_owner_deals(page: int = 1, page_size: int = 50):
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
-        offset = (page - 1) * page_size
 
-        count_query = "SELECT COUNT(*) FROM owner_deals"
-        cur.execute(count_query)
+def _plan_owner_deals_page(page: int = 1, page_size: int = 50, cursor: str = None) -> _PageQuery:
+    """Build the queries of ``get_owner_deals``."""
+    after = _decode_cursor(cursor) if cursor else None
+    offset = (page - 1) * page_size
+
+    params = []
+    where = ""
+    if after:
+        where = "WHERE d.id < %s"
+        params.append(after["id"])
+        offset = 0
+
+    select_columns = ", ".join(f"d.{column}" for column in OWNER_DEAL_COLUMNS)
+    select_query = f"""
+        SELECT {select_columns}, COALESCE(m.name, '') AS merchant
+        FROM owner_deals d
+        LEFT JOIN owner_merchants m ON d.merchant_id = m.id
+        {where}
+        ORDER BY d.id DESC
+        LIMIT %s OFFSET %s
+    """
+    params.extend([page_size + 1, offset])
+    return _PageQuery(
+        count_query="SELECT COUNT(*) FROM owner_deals",
+        count_params=(),
+        select_query=select_query,
+        select_params=tuple(params),
+        total="exact",
+        cache_key=None,
+        position=None,
+        page=page,
+        page_size=page_size,
+    )
+
+
+@timed_query
+def get_owner_deals(page: int = 1, page_size: int = 50, cursor: str = None):
+    """Return one page of owner deals, newest first.
+
+    As with ``get_deals_from_db``, *cursor* switches from ``OFFSET`` paging
+    to seeking below the last ``d.id`` of the previous page.
+    """
+    plan = _plan_owner_deals_page(page, page_size, cursor)
+
+    with _get_connection(read="owner_deals") as conn, conn.cursor() as cur:
+        cur.execute(plan.count_query)
         total_products = cur.fetchone()[0]
 
-        select_query = """
-            SELECT d.*, COALESCE(m.name, '') AS merchant
-            FROM owner_deals d
-            LEFT JOIN owner_merchants m ON d.merchant_id = m.id
-            ORDER BY d.id DESC
-            LIMIT %s OFFSET %s
-        """
-        cur.execute(select_query, (page_size, offset))
+        cur.execute(plan.select_query, plan.select_params)
         deals = cur.fetchall()
 
-    columns = [
-        "id", "title", "price", "original_price", "discount", "image_url",
-        "product_url", "merchant_id", "merchant_image", "rating",
-        "reviews_count", "created_at", "updated_at", "merchant"
+    return _page_result(plan, deals, OWNER_DEAL_COLUMNS + ["merchant"], total_products)
+
+def _owner_batch_merchant_names(create, update):
+    return _unique_merchant_names(
+        [deal.get("merchant") for deal in create] + [deal.get("merchant") for deal in update]
+    )
+
+
+def _merchant_id(merchant_ids, name):
+    return merchant_ids.get(name.lower()) if name else None
+
+
+def _owner_batch_insert_params(create, merchant_ids):
+    """Transpose *create* into one array per column of ``_OWNER_DEAL_BATCH_INSERT``."""
+    rows = [
+        _owner_deal_values(deal, _merchant_id(merchant_ids, deal.get("merchant")))
+        for deal in create
     ]
+    return tuple(list(column) for column in zip(*rows))
 
-    deals_list = [dict(zip(columns, deal)) for deal in deals]
-    for deal in deals_list:
-        deal["merchant"] = str(deal.get("merchant") or "")
+
+def _owner_batch_updates(update, merchant_ids):
+    """Replace ``merchant`` names in *update* items by ``merchant_id``.
+
+    As in ``update_owner_deal``, an empty merchant name leaves it unchanged.
+    """
+    items = []
+    for deal in update:
+        item = _owner_deal_changes(deal)
+        name = item.pop("merchant", None)
+        if name:
+            item["merchant_id"] = _merchant_id(merchant_ids, name)
+        items.append(item)
+    return items
+
+
+def _check_owner_batch(update, delete):
+    _check_batch_ids([item["id"] for item in update], "the update list")
+    _check_batch_ids(delete, "the delete list")
+
+
+@timed_query
+def apply_owner_deal_batch(create=(), update=(), delete=()):
+    """Create, update and delete owner deals in one transaction.
+
+    Merchants of all items are resolved in one statement, all creates are
+    inserted by one statement, updates are grouped by the fields they set
+    and deletes run as one statement. Returns ``created``, ``updated`` and
+    ``deleted`` lists holding one ``{"id", "status"}`` per item, in order.
+    """
+    create, update, delete = list(create), list(update), list(delete)
+    _check_owner_batch(update, delete)
+    with _get_connection() as conn, conn.cursor() as cur:
+        merchant_ids = _resolve_merchant_ids(
+            cur, _owner_batch_merchant_names(create, update), table="owner_merchants"
+        )
+        created = []
+        if create:
+            cur.execute(_OWNER_DEAL_BATCH_INSERT, _owner_batch_insert_params(create, merchant_ids))
+            created = [row[0] for row in cur.fetchall()]
+
+        updated = {}
+        for query, params, status in _batch_update_statements(
+            "owner_deals", _owner_batch_updates(update, merchant_ids)
+        ):
+            cur.execute(query, params)
+            updated.update((row[0], status) for row in cur.fetchall())
+
+        deleted = {}
+        if delete:
+            cur.execute(_OWNER_DEAL_BATCH_DELETE, (delete,))
+            deleted = {row[0]: "deleted" for row in cur.fetchall()}
+        changed = bool(created or deleted) or "updated" in updated.values()
+        if changed:
+            _bump_generation(cur, "owner_deals")
+    if changed:
+        get_read_router().mark_written("owner_deals")
 
     return {
-        "total_products": total_products,
-        "products": deals_list,
-        "page": page,
-        "page_size": page_size,
+        "created": [{"id": deal_id, "status": "created"} for deal_id in created],
+        "updated": _batch_results([item["id"] for item in update], updated),
+        "deleted": _batch_results(delete, deleted),
     }
 
+
+@timed_query
 def update_owner_deal(deal_id: int, deal_data: dict):
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+    deal_data = _owner_deal_changes(deal_data)
+    with _get_connection() as conn, conn.cursor() as cur:
         # Handle merchant update
         merchant_name = deal_data.pop("merchant", None)
         if merchant_name:
-            cur.execute(
-                """
-                INSERT INTO owner_merchants (name)
-                VALUES (%s)
-                ON CONFLICT (LOWER(name)) DO UPDATE SET name = EXCLUDED.name
-                RETURNING id;
-                """,
-                (merchant_name,),
-            )
+            cur.execute(_OWNER_MERCHANT_UPSERT, (merchant_name,))
             merchant_id = cur.fetchone()[0]
             deal_data["merchant_id"] = merchant_id
 
-        fields = []
-        values = []
-        for key, value in deal_data.items():
-            fields.append(sql.Identifier(key))
-            values.append(value)
-        
-        values.append(deal_id)
-
-        query = sql.SQL("UPDATE owner_deals SET ({}) = ({}) WHERE id = %s").format(
-            sql.SQL(', ').join(fields),
-            sql.SQL(', ').join(sql.Placeholder() * len(fields))
-        )
-        
-        cur.execute(query, tuple(values))
+        cur.execute(*_update_statement("owner_deals", deal_data, deal_id))
+        _bump_generation(cur, "owner_deals")
         conn.commit()
+    get_read_router().mark_written("owner_deals")
 
+@timed_query
 def delete_owner_deal(deal_id: int):
     logging.info(f"DATABASE: Deleting owner deal with id: {deal_id}")
-    _ensure_database_url()
-    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+    with _get_connection() as conn, conn.cursor() as cur:
         cur.execute("DELETE FROM owner_deals WHERE id = %s", (deal_id,))
+        _bump_generation(cur, "owner_deals")
         conn.commit()
+    get_read_router().mark_written("owner_deals")
     logging.info(f"DATABASE: Successfully deleted owner deal with id: {deal_id}")
+
+
+# Sources of the merged feed: source -> (deal table, merchant table, listing time).
+FEED_SOURCES = {
+    "owner": ("owner_deals", "owner_merchants", "created_at"),
+    "scraped": ("deals", "merchants", "scraped_at"),
+}
+
+# Columns returned for a feed entry, in order.
+FEED_COLUMNS = [
+    "source",
+    "id",
+    "title",
+    "price",
+    "original_price",
+    "discount",
+    "image_url",
+    "product_url",
+    "merchant_image",
+    "rating",
+    "reviews_count",
+    "listed_at",
+    "merchant",
+]
+
+
+def _feed_condition_sql(source, sort_column, sort_type, order, after):
+    """Return the keyset condition of one feed branch and its parameters.
+
+    Feed rows are ordered by ``(sort key, source, id)``. Within a branch the
+    source is fixed, so the condition reduces to ``(key, id)`` for the
+    cursor's own source and to the key alone for the other one, both of
+    which the ``(key, id)`` indexes can serve.
+    """
+    operator = ">" if order == "asc" else "<"
+    if source == after["source"]:
+        return (
+            f"(d.{sort_column}, d.id) {operator} (%s::{sort_type}, %s)",
+            [after["key"], after["id"]],
+        )
+    # On an equal key, rows of a later source still follow the cursor.
+    later = source > after["source"] if order == "asc" else source < after["source"]
+    operator += "=" if later else ""
+    return f"d.{sort_column} {operator} %s::{sort_type}", [after["key"]]
+
+
+def _plan_feed_page(
+    page_size: int = 50,
+    merchant: str = None,
+    title: str = None,
+    cursor: str = None,
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+    source: str = None,
+) -> _PageQuery:
+    """Validate the arguments of ``get_feed`` and build its query."""
+    if sort is not None and sort not in SORT_COLUMNS:
+        raise ValueError(f"Invalid sort key: {sort!r}")
+    if order not in (None, "asc", "desc"):
+        raise ValueError(f"Invalid sort order: {order!r}")
+    if source is not None and source not in FEED_SOURCES:
+        raise ValueError(f"Invalid feed source: {source!r}")
+    after = _decode_cursor(cursor) if cursor else None
+    if after and (
+        after.get("source") not in FEED_SOURCES or not isinstance(after.get("key"), str)
+    ):
+        raise ValueError(f"Invalid feed cursor: {cursor!r}")
+    search = build_search_query(title) if title else None
+    if sort:
+        sort_column, sort_type = SORT_COLUMNS[sort]
+        order = order or DEFAULT_SORT_ORDER[sort]
+    else:
+        sort_column, sort_type = None, "timestamptz"
+        order = order or "desc"
+    # A cursor's key is only meaningful under the ordering that produced it.
+    if after and (after.get("sort"), after.get("order")) != (sort, order):
+        raise ValueError(f"Feed cursor does not match sort {sort!r} and order {order!r}")
+
+    select_columns = ", ".join(
+        f"d.{column}" for column in FEED_COLUMNS if column not in ("source", "listed_at", "merchant")
+    )
+    branches = []
+    params = []
+    for name, (table, merchant_table, listed_at) in FEED_SOURCES.items():
+        if source is not None and name != source:
+            continue
+        key = sort_column or listed_at
+        conditions = [f"d.{key} IS NOT NULL"]
+        if merchant:
+            conditions.append("LOWER(m.name) = LOWER(%s)")
+            params.append(merchant)
+        if search:
+            conditions.append("d.search_vector @@ %s::tsquery")
+            params.append(search.match)
+        elif title:
+            conditions.append("LOWER(d.title) LIKE LOWER(%s)")
+            params.append(f"%{title}%")
+        if min_price is not None:
+            conditions.append("d.price_value >= %s::numeric")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("d.price_value <= %s::numeric")
+            params.append(max_price)
+        if min_discount is not None:
+            conditions.append("d.discount_value >= %s::numeric")
+            params.append(min_discount)
+        if after:
+            condition, condition_params = _feed_condition_sql(
+                name, key, sort_type, order, after
+            )
+            conditions.append(condition)
+            params.extend(condition_params)
+
+        # Each branch is cut to one page (plus one row) along its own index
+        # before the branches are merged.
+        branches.append(
+            f"""
+            (SELECT '{name}' AS source, {select_columns}, d.{listed_at} AS listed_at,
+                    COALESCE(m.name, '') AS merchant, d.{key} AS sort_key
+             FROM {table} d
+             LEFT JOIN {merchant_table} m ON d.merchant_id = m.id
+             WHERE {" AND ".join(conditions)}
+             ORDER BY d.{key} {order.upper()}, d.id {order.upper()}
+             LIMIT %s)
+            """
+        )
+        params.append(page_size + 1)
+
+    direction = order.upper()
+    select_query = (
+        "SELECT * FROM ("
+        + " UNION ALL ".join(branches)
+        + f") feed ORDER BY sort_key {direction}, source {direction}, id {direction} LIMIT %s"
+    )
+    params.append(page_size + 1)
+
+    return _PageQuery(
+        count_query=None,
+        count_params=(),
+        select_query=select_query,
+        select_params=tuple(params),
+        total="none",
+        cache_key=None,
+        position="key",
+        page=1,
+        page_size=page_size,
+        ordering={"sort": sort, "order": order},
+    )
+
+
+def _feed_result(plan: _PageQuery, rows):
+    """Map the rows fetched for *plan* to the feed response dict."""
+    has_more = len(rows) > plan.page_size
+    rows = rows[:plan.page_size]
+    entries = _deal_dicts(rows, FEED_COLUMNS)
+
+    next_cursor = None
+    if has_more:
+        last = entries[-1]
+        next_cursor = _encode_cursor({
+            "id": last["id"],
+            "source": last["source"],
+            "key": str(rows[-1][len(FEED_COLUMNS)]),
+            **plan.ordering,
+        })
+
+    return {
+        "total_products": None,
+        "products": entries,
+        "page_size": plan.page_size,
+        "next_cursor": next_cursor,
+    }
+
+
+@timed_query
+def get_feed(
+    page_size: int = 50,
+    merchant: str = None,
+    title: str = None,
+    cursor: str = None,
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort: str = None,
+    order: str = None,
+    source: str = None,
+):
+    """Return one page of the merged feed of scraped and owner deals.
+
+    Entries are ordered by listing time (``scraped_at`` or ``created_at``),
+    newest first, or by *sort* as in ``get_deals_from_db``; ties are broken
+    by source and ``id`` so the order is total. The filters apply to both
+    sources alike and *source* (``"scraped"``/``"owner"``) keeps only one of
+    them. Paging is by *cursor* only, which records the sort key, source and
+    id of the last entry; ``total_products`` is always ``None``.
+    """
+    plan = _plan_feed_page(
+        page_size, merchant, title, cursor,
+        min_price, max_price, min_discount, sort, order, source,
+    )
+
+    with _get_connection(read=("deals", "owner_deals")) as conn, conn.cursor() as cur:
+        cur.execute(plan.select_query, plan.select_params)
+        rows = cur.fetchall()
+
+    return _feed_result(plan, rows)
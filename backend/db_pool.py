@@ -0,0 +1,274 @@
+"""Thread-safe PostgreSQL connection pool shared by the database layer."""
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection becomes available within the wait timeout."""
+
+
+class ConnectionPool:
+    """A bounded pool of ``psycopg2`` connections.
+
+    Connections are opened lazily up to ``max_size``. Idle connections are
+    reused in LIFO order so the warmest ones stay in rotation, and the pool
+    recycles connections that sat idle longer than ``max_idle`` seconds (while
+    keeping ``min_size`` around) or outlived ``max_lifetime`` seconds. A
+    connection that has been idle for more than ``check_interval`` seconds is
+    verified with ``SELECT 1`` before it is handed out. With ``connect_timeout``
+    set, opening a new connection gives up after that many seconds instead of
+    waiting for the operating system's TCP timeout.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        check_interval: float = 30.0,
+        connect_timeout: float = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.connect_timeout = connect_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, last_used) pairs, most recently used last
+        self._created = {}  # id(conn) -> creation time
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._requests = 0
+        self._connections_created = 0
+        self._connections_closed = 0
+        self._health_check_failures = 0
+        self._timeouts = 0
+        self._wait_count = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    # --- Connection lifecycle ---
+    def _open(self):
+        if self.connect_timeout is None:
+            conn = psycopg2.connect(self.dsn)
+        else:
+            # libpq takes whole seconds and treats anything below 2 as 2.
+            conn = psycopg2.connect(
+                self.dsn, connect_timeout=max(2, math.ceil(self.connect_timeout))
+            )
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+            self._connections_created += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created.pop(id(conn), None)
+            self._connections_closed += 1
+        try:
+            conn.close()
+        except Exception as e:
+            logging.warning(f"Error closing pooled connection: {e}")
+
+    def _is_expired(self, conn, last_used, now):
+        created = self._created.get(id(conn), now)
+        if self.max_lifetime and now - created > self.max_lifetime:
+            return True
+        return bool(getattr(conn, "closed", False))
+
+    def _is_healthy(self, conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Pooled connection failed health check: {e}")
+            with self._cond:
+                self._health_check_failures += 1
+            return False
+
+    def _record_wait(self, started):
+        """Account for time spent blocked in ``getconn``; caller holds the lock."""
+        elapsed = time.monotonic() - started
+        self._wait_count += 1
+        self._wait_time_total += elapsed
+        self._wait_time_max = max(self._wait_time_max, elapsed)
+
+    def _recycle_idle(self, now):
+        """Pop idle connections past ``max_idle``; caller must hold the lock."""
+        stale = []
+        if not self.max_idle:
+            return stale
+        keep = []
+        # Oldest entries are at the front; keep at least ``min_size`` idle.
+        for index, (conn, last_used) in enumerate(self._idle):
+            remaining = len(self._idle) - index
+            if now - last_used > self.max_idle and remaining + len(keep) > self.min_size:
+                stale.append(conn)
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+        return stale
+
+    # --- Public API ---
+    def open(self):
+        """Pre-open ``min_size`` connections so the first requests are warm."""
+        while True:
+            with self._cond:
+                if len(self._idle) + self._in_use >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            self.putconn(conn)
+
+    def getconn(self):
+        """Borrow a connection, waiting up to ``timeout`` seconds for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        candidate = None
+        last_used = None
+        waited = False
+        stale = []
+
+        with self._cond:
+            self._requests += 1
+            while True:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                now = time.monotonic()
+                stale.extend(self._recycle_idle(now))
+                while self._idle:
+                    conn, used = self._idle.pop()
+                    if self._is_expired(conn, used, now):
+                        stale.append(conn)
+                        continue
+                    candidate, last_used = conn, used
+                    break
+                if candidate is not None or self._in_use + len(self._idle) < self.max_size:
+                    self._in_use += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._timeouts += 1
+                    if waited:
+                        self._record_wait(started)
+                    raise PoolTimeout(
+                        f"timed out after {self.timeout}s waiting for a database connection"
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if waited:
+                self._record_wait(started)
+
+        for conn in stale:
+            self._discard(conn)
+
+        try:
+            if candidate is not None and (
+                time.monotonic() - last_used > self.check_interval
+                and not self._is_healthy(candidate)
+            ):
+                self._discard(candidate)
+                candidate = None
+            if candidate is None:
+                candidate = self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return candidate
+
+    def putconn(self, conn, discard: bool = False):
+        """Return *conn* to the pool, closing it if it is broken or expired."""
+        now = time.monotonic()
+        if not discard and not getattr(conn, "closed", False):
+            try:
+                status = conn.get_transaction_status()
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception as e:
+                logging.warning(f"Discarding pooled connection after reset failure: {e}")
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if not discard and not self._closed and not self._is_expired(conn, now, now):
+                self._idle.append((conn, now))
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection and always returns it."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._in_use + len(self._idle),
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "requests": self._requests,
+                "connections_created": self._connections_created,
+                "connections_closed": self._connections_closed,
+                "health_check_failures": self._health_check_failures,
+                "timeouts": self._timeouts,
+                "wait_count": self._wait_count,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+            }
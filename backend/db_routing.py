@@ -0,0 +1,136 @@
+"""Routing of read-only queries between the primary and read replicas."""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple, Union
+
+STRATEGIES = ("round_robin", "least_connections")
+
+
+class ReadRouter:
+    """Choose the database that serves each read-only query.
+
+    Reads go to one of *replicas*, picked in turn (``"round_robin"``) or by
+    fewest reads in flight (``"least_connections"``). For
+    *read_your_writes* seconds after ``mark_written(name)``, reads of *name*
+    go to the primary instead, so a client sees its own change even while
+    the replicas lag behind. That window is tracked per process.
+
+    A replica that could not be reached is skipped for *retry_after*
+    seconds (see ``record_fallback``), so later reads go straight to the
+    other replicas or the primary instead of waiting on it again.
+    """
+
+    def __init__(
+        self,
+        replicas: Iterable[str] = (),
+        strategy: str = "round_robin",
+        read_your_writes: float = 5.0,
+        retry_after: float = 30.0,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Invalid read routing strategy: {strategy!r}")
+
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.read_your_writes = read_your_writes
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._in_flight = {dsn: 0 for dsn in self.replicas}
+        self._routed = {dsn: 0 for dsn in self.replicas}
+        self._written = {}
+        self._down_until = {}
+        self._primary_reads = 0
+        self._fallbacks = 0
+
+    def mark_written(self, name: str):
+        """Send reads of *name* to the primary for the read-your-writes window."""
+        with self._lock:
+            self._written[name] = time.monotonic()
+
+    def _pick(self, now):
+        """Return the next healthy replica, or ``None``; caller must hold the lock."""
+        start = self._next % len(self.replicas)
+        self._next += 1
+        rotated = [
+            dsn
+            for dsn in self.replicas[start:] + self.replicas[:start]
+            if self._down_until.get(dsn, 0) <= now
+        ]
+        if not rotated:
+            return None
+        if self.strategy == "least_connections":
+            # ``min`` keeps the first of equals, so ties still rotate.
+            return min(rotated, key=self._in_flight.__getitem__)
+        return rotated[0]
+
+    def acquire(self, name: Union[str, Tuple[str, ...], None] = None) -> Optional[str]:
+        """Return the replica DSN for a read of *name*, or ``None`` for the primary.
+
+        *name* may be a tuple for a read that spans several kinds of data; it
+        goes to the primary if any of them was written recently, and so does
+        any read while every replica is marked down. Every replica returned
+        must be handed back with ``release``.
+        """
+        names = name if isinstance(name, tuple) else (name,)
+        with self._lock:
+            now = time.monotonic()
+            if not self.replicas or any(
+                self._written.get(n) is not None
+                and now - self._written[n] < self.read_your_writes
+                for n in names
+            ):
+                self._primary_reads += 1
+                return None
+            dsn = self._pick(now)
+            if dsn is None:
+                self._primary_reads += 1
+                return None
+            self._in_flight[dsn] += 1
+            self._routed[dsn] += 1
+            return dsn
+
+    def release(self, dsn: Optional[str]):
+        if dsn is None:
+            return
+        with self._lock:
+            self._in_flight[dsn] -= 1
+
+    def record_fallback(self, dsn: str):
+        """Count a read that fell back to the primary because *dsn* failed.
+
+        *dsn* is then skipped for ``retry_after`` seconds.
+        """
+        with self._lock:
+            self._fallbacks += 1
+            self._down_until[dsn] = time.monotonic() + self.retry_after
+
+    @contextmanager
+    def route(self, name: Union[str, Tuple[str, ...], None] = None):
+        """Context manager around ``acquire``/``release``."""
+        dsn = self.acquire(name)
+        try:
+            yield dsn
+        finally:
+            self.release(dsn)
+
+    def stats(self) -> dict:
+        """Return routing counters; replicas are listed by position, not DSN."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "strategy": self.strategy,
+                "primary_reads": self._primary_reads,
+                "fallbacks": self._fallbacks,
+                "replicas": [
+                    {
+                        "in_flight": self._in_flight[dsn],
+                        "reads": self._routed[dsn],
+                        "down": self._down_until.get(dsn, 0) > now,
+                    }
+                    for dsn in self.replicas
+                ],
+            }
@@ -0,0 +1,195 @@
+"""Server-Sent Events for scraper runs and data changes.
+
+The scraper commits from its own process, so events are not raised where
+the work happens. Instead one ``ChangeWatcher`` per API process polls the
+scraper status file (a ``stat``) and the data generations (shared with the
+response cache) and publishes what changed to an ``EventHub``.
+
+Subscribers are cheap: each is an ``asyncio.Queue`` waited on by its
+response. A frame is encoded once per event and shared by every queue, and
+keep-alives are pushed by the watcher rather than timed per connection, so
+an idle subscriber costs no timer wake-ups. A subscriber whose queue fills
+up (a stalled client) is disconnected instead of buffering without bound;
+on reconnect ``Last-Event-ID`` replays what it missed from a short history.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+KEEPALIVE = b": keepalive\n\n"
+_CLOSE = None
+
+
+def _frame(event_id: int, event: str, data: dict) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class EventHub:
+    def __init__(self, queue_size: int = 64, history: int = 256, retry_ms: int = 5000):
+        self.queue_size = queue_size
+        self.retry_ms = retry_ms
+        self._subscribers = set()
+        self._history = deque(maxlen=history)  # (event_id, frame)
+        self._last_id = 0
+        self._published = 0
+        self._dropped = 0
+
+    def publish(self, event: str, data: dict) -> int:
+        """Send *event* to every subscriber and return its id."""
+        self._last_id += 1
+        frame = _frame(self._last_id, event, data)
+        self._history.append((self._last_id, frame))
+        self._published += 1
+        self._broadcast(frame)
+        return self._last_id
+
+    def keepalive(self):
+        """Send a comment line so proxies keep idle connections open."""
+        self._broadcast(KEEPALIVE)
+
+    def _broadcast(self, frame: bytes):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue):
+        self._dropped += 1
+        self._close(queue)
+
+    def _close(self, queue: asyncio.Queue):
+        # Make room for the close marker; the client reconnects and replays.
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSE)
+
+    def close(self):
+        """End every subscriber's stream, e.g. on shutdown."""
+        for queue in list(self._subscribers):
+            self._close(queue)
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Yield SSE frames for one subscriber until it disconnects."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode("ascii")
+            for frame in self._missed(last_event_id):
+                yield frame
+            while True:
+                frame = await queue.get()
+                if frame is _CLOSE:
+                    return
+                yield frame
+        finally:
+            self._subscribers.discard(queue)
+
+    def _missed(self, last_event_id: Optional[str]):
+        try:
+            last_seen = int(last_event_id)
+        except (TypeError, ValueError):
+            return []
+        return [frame for event_id, frame in self._history if event_id > last_seen]
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "dropped": self._dropped,
+            "last_event_id": self._last_id,
+        }
+
+
+class ChangeWatcher:
+    """Turn scraper status and data generation changes into hub events.
+
+    Events:
+
+    * ``scrape_started`` -- the status file has a new ``started_at``.
+    * ``scrape_finished`` -- the status file has a new ``finished_at``; carries
+      the run's ``succeeded`` (deals were committed), ``products_found`` (deals
+      published), ``error`` and the ``deals`` generation.
+    * ``owner_deals_changed`` -- the ``owner_deals`` generation moved on.
+
+    Run times rather than ``is_scraping`` flips are compared, so a scrape
+    shorter than the poll interval is still reported.
+    """
+
+    def __init__(
+        self,
+        hub: EventHub,
+        load_status: Callable[[], dict],
+        load_generations: Callable[[bool], Awaitable[Dict[str, object]]],
+        interval: float = 1.0,
+        keepalive_interval: float = 15.0,
+    ):
+        self.hub = hub
+        self.interval = interval
+        self.keepalive_interval = keepalive_interval
+        self._load_status = load_status
+        self._load_generations = load_generations
+        self._status = None
+        self._generations = None
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Check for changes now, e.g. after a write made by this process."""
+        self._wake.set()
+
+    async def check(self):
+        status = dict(self._load_status() or {})
+        previous = self._status
+        self._status = status
+        finished = previous is not None and self._changed(previous, status, "finished_at")
+        # A finished run's generation must not come from a stale read.
+        generations = await self._load_generations(finished)
+        if previous is not None:
+            if self._changed(previous, status, "started_at"):
+                self.hub.publish("scrape_started", {"started_at": status["started_at"]})
+            if finished:
+                deals = generations.get("deals")
+                self.hub.publish(
+                    "scrape_finished",
+                    {
+                        "started_at": status.get("started_at"),
+                        "finished_at": status["finished_at"],
+                        "succeeded": status.get("succeeded"),
+                        "products_found": status.get("products_found"),
+                        "error": status.get("error"),
+                        "generation": getattr(deals, "generation", None),
+                    },
+                )
+        owner = generations.get("owner_deals")
+        if self._generations is not None and owner != self._generations.get("owner_deals"):
+            self.hub.publish(
+                "owner_deals_changed", {"generation": getattr(owner, "generation", None)}
+            )
+        self._generations = generations
+
+    @staticmethod
+    def _changed(previous: dict, status: dict, key: str) -> bool:
+        return bool(status.get(key)) and status.get(key) != previous.get(key)
+
+    async def run(self):
+        """Poll for changes for the life of the app."""
+        last_keepalive = time.monotonic()
+        while True:
+            self._wake.clear()
+            try:
+                await self.check()
+            except Exception as e:
+                logging.warning(f"Could not check for data changes: {e}")
+            if time.monotonic() - last_keepalive >= self.keepalive_interval:
+                self.hub.keepalive()
+                last_keepalive = time.monotonic()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,161 @@
+"""Encoders for streaming deal exports as NDJSON, CSV or Parquet.
+
+An encoder turns a stream of deal batches into bytes: ``start()`` once,
+``encode(deals)`` per batch and ``finish()`` at the end. Each call returns
+only the bytes for its part, so nothing but the current batch is ever held
+in memory. Parquet needs ``pyarrow``.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+# Field order of ``PricezaScraper.save_to_csv``.
+CSV_COLUMNS = [
+    "title",
+    "price",
+    "original_price",
+    "discount",
+    "merchant",
+    "rating",
+    "reviews_count",
+    "image_url",
+    "product_url",
+    "merchant_image",
+]
+
+# Columns of NDJSON and Parquet exports.
+EXPORT_COLUMNS = ["id"] + CSV_COLUMNS + ["scraped_at", "updated_at"]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def start(self) -> bytes:
+        return b""
+
+    def encode(self, deals) -> bytes:
+        return "".join(
+            json.dumps(
+                {column: deal.get(column) for column in EXPORT_COLUMNS},
+                ensure_ascii=False,
+                default=_json_default,
+            )
+            + "\n"
+            for deal in deals
+        ).encode("utf-8")
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class CsvEncoder:
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(
+            self._buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore"
+        )
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode("utf-8")
+
+    def start(self) -> bytes:
+        # BOM as in ``save_to_csv`` (utf-8-sig), so Excel reads Thai text.
+        self._buffer.write("\ufeff")
+        self._writer.writeheader()
+        return self._drain()
+
+    def encode(self, deals) -> bytes:
+        self._writer.writerows(deals)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file collecting what ``ParquetWriter`` emits between drains."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ParquetEncoder:
+    """Writes one Parquet row group per batch."""
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow")
+        self._schema = pa.schema(
+            [("id", pa.int64())]
+            + [(column, pa.string()) for column in CSV_COLUMNS]
+            + [
+                ("scraped_at", pa.timestamp("us", tz="UTC")),
+                ("updated_at", pa.timestamp("us", tz="UTC")),
+            ]
+        )
+        self._sink = _Sink()
+        self._writer = None
+
+    def start(self) -> bytes:
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="snappy")
+        return self._sink.drain()
+
+    def encode(self, deals) -> bytes:
+        columns = {
+            column: [deal.get(column) for deal in deals] for column in EXPORT_COLUMNS
+        }
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+ENCODERS = {"ndjson": NdjsonEncoder, "csv": CsvEncoder, "parquet": ParquetEncoder}
+
+
+def get_encoder(export_format: str):
+    """Return a new encoder for *export_format* (a key of ``ENCODERS``)."""
+    try:
+        encoder_class = ENCODERS[export_format]
+    except KeyError:
+        raise ValueError(f"Invalid export format: {export_format!r}") from None
+    return encoder_class()
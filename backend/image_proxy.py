@@ -0,0 +1,728 @@
+"""Streaming image proxy with a bounded on-disk cache.
+
+``ImageProxy`` fetches product images and merchant logos through one shared
+keep-alive ``httpx.AsyncClient`` (HTTP/2 when the ``h2`` package is
+installed), with a cap on concurrent requests per upstream host. Bodies are
+streamed to the client as they arrive and written to the cache at the same
+time; a host's slot is held only while the origin is read, not while a slow
+client downloads. A cached image is served from disk without contacting the
+origin.
+
+The cache is an LRU over files in *directory*, bounded by *max_bytes*.
+Upstream ``Cache-Control``/``Expires`` decide how long an image stays fresh
+(``no-store``, ``private`` and ``no-cache`` images are not kept, and those
+directives are passed on to the client). URLs that fail are
+remembered for *negative_ttl* seconds and answered with 502 at once, as are
+images whose body is over *max_body* bytes.
+
+Resized and transcoded variants (WebP, AVIF, JPEG, PNG) are produced by
+Pillow in a process pool and cached like originals, keyed by URL, size and
+format. Resizing needs the ``Pillow`` package.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join("data", "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Freshness of images whose origin sends no caching headers, in seconds.
+IMAGE_CACHE_DEFAULT_TTL = int(os.environ.get("IMAGE_CACHE_DEFAULT_TTL", "86400"))
+# How long a failing URL is answered with 502 without retrying, in seconds.
+IMAGE_NEGATIVE_TTL = float(os.environ.get("IMAGE_NEGATIVE_TTL", "60"))
+IMAGE_PROXY_MAX_CONNECTIONS = int(os.environ.get("IMAGE_PROXY_MAX_CONNECTIONS", "100"))
+IMAGE_PROXY_MAX_PER_HOST = int(os.environ.get("IMAGE_PROXY_MAX_PER_HOST", "8"))
+# Longest wait for one of a host's IMAGE_PROXY_MAX_PER_HOST slots before
+# answering 503, in seconds.
+IMAGE_PROXY_HOST_WAIT = float(os.environ.get("IMAGE_PROXY_HOST_WAIT", "5"))
+IMAGE_PROXY_TIMEOUT = float(os.environ.get("IMAGE_PROXY_TIMEOUT", "10"))
+# Largest image body read from an origin, in bytes; larger ones get 502.
+IMAGE_MAX_BODY_BYTES = int(os.environ.get("IMAGE_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+# Largest width or height a resized variant may ask for, in pixels.
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", "2000"))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", "80"))
+# Processes that resize and transcode, off the event loop.
+IMAGE_TRANSFORM_WORKERS = int(os.environ.get("IMAGE_TRANSFORM_WORKERS", str(os.cpu_count() or 2)))
+
+# Output formats of resized variants: format -> (Pillow format, media type).
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _cache_key(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _avif_supported() -> bool:
+    try:
+        return bool(features.check("avif"))
+    except ValueError:  # Pillow without the feature name
+        return False
+
+
+def _plan_variant(width, height, fmt, accept):
+    """Validate resize parameters; return ``(width, height, format, varies_by_accept)``.
+
+    *fmt* ``"auto"`` picks AVIF or WebP from the request's *accept* header
+    and otherwise keeps the original format (``None``).
+    """
+    if Image is None:
+        raise HTTPException(status_code=501, detail="Image resizing requires Pillow")
+    for value in (width, height):
+        if value is not None and not 0 < value <= IMAGE_MAX_DIMENSION:
+            raise HTTPException(
+                status_code=400, detail=f"Width and height must be 1-{IMAGE_MAX_DIMENSION}"
+            )
+    vary = fmt == "auto"
+    if fmt == "auto":
+        accept = accept or ""
+        if "image/avif" in accept and _avif_supported():
+            fmt = "avif"
+        elif "image/webp" in accept:
+            fmt = "webp"
+        else:
+            fmt = None
+    elif fmt is not None and fmt not in IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid image format: {fmt!r}")
+    elif fmt == "avif" and not _avif_supported():
+        raise HTTPException(status_code=501, detail="AVIF is not supported by this server")
+    return width, height, fmt, vary
+
+
+def _transform(data: bytes, width, height, fmt):
+    """Resize *data* to fit within *width* x *height* and encode it as *fmt*.
+
+    Runs in a worker process; returns ``(bytes, media type)``.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        source_format = (original.format or "PNG").lower()
+        image = ImageOps.exif_transpose(original)
+        if width or height:
+            image.thumbnail((width or IMAGE_MAX_DIMENSION * 10, height or IMAGE_MAX_DIMENSION * 10))
+        fmt = fmt or (source_format if source_format in IMAGE_FORMATS else "png")
+        pil_format, media_type = IMAGE_FORMATS[fmt]
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        image.save(out, format=pil_format, quality=IMAGE_QUALITY)
+        return out.getvalue(), media_type
+
+
+def _finish_temp(cache, key, temp, temp_path, entry):
+    """Close a streamed *temp* file and commit it as *key*, or delete it if *entry* is ``None``."""
+    temp.close()
+    if entry is not None:
+        cache.commit(key, temp_path, entry)
+    else:
+        os.remove(temp_path)
+
+
+class CachedImage(NamedTuple):
+    size: int
+    content_type: str
+    expires_at: float  # wall-clock time
+
+
+# Upstream directives that keep an image out of the cache; they are passed
+# on to the client instead of a max-age.
+_UNCACHED_DIRECTIVES = ("no-store", "private", "no-cache")
+
+
+def _directives(headers) -> dict:
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def _freshness(headers, now: float) -> Optional[float]:
+    """Return when an upstream response stops being fresh, or ``None`` to not store it."""
+    directives = _directives(headers)
+    if any(name in directives for name in _UNCACHED_DIRECTIVES):
+        return None
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return now + int(directives[name])
+            except ValueError:
+                break
+    if "expires" in headers:
+        try:
+            return parsedate_to_datetime(headers["expires"]).timestamp()
+        except (TypeError, ValueError):
+            return now
+    return now + IMAGE_CACHE_DEFAULT_TTL
+
+
+def _cache_control(headers, expires_at: Optional[float], now: float) -> str:
+    """Return the ``Cache-Control`` for the client of an image fresh until *expires_at*.
+
+    Images ``_freshness`` would not store get the upstream *headers*'
+    restricting directives rather than a max-age.
+    """
+    if expires_at is None:
+        directives = _directives(headers)
+        return ", ".join(name for name in _UNCACHED_DIRECTIVES if name in directives)
+    return f"public, max-age={max(0, int(expires_at - now))}"
+
+
+class ImageCache:
+    """LRU of image files on disk, each with a ``.json`` sidecar of metadata.
+
+    Recency survives restarts through file mtimes. Construction scans the
+    directory and most methods touch the disk, so ``ImageProxy`` calls them
+    through ``asyncio.to_thread``; the index is guarded by a lock, and files
+    are written and removed outside it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> CachedImage
+        self._bytes = 0
+        self.evictions = 0
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                if name.endswith(".tmp"):
+                    os.remove(self._path(name))
+                continue
+            key = name[:-5]
+            try:
+                with open(self._path(name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                mtime = os.path.getmtime(self._path(key))
+            except (OSError, ValueError):
+                self._remove_files(key)
+                continue
+            found.append((mtime, key, CachedImage(**meta)))
+        with self._lock:
+            for _, key, entry in sorted(found):
+                self._entries[key] = entry
+                self._bytes += entry.size
+            evicted = self._over_budget()
+        self._remove_all(evicted)
+
+    def _remove_files(self, key: str):
+        for path in (self._path(key), self._path(key) + ".json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _remove_all(self, keys):
+        for key in keys:
+            self._remove_files(key)
+
+    def _forget(self, key: str, entry: CachedImage) -> bool:
+        """Drop *key* from the index if it still maps to *entry*; caller holds the lock."""
+        if self._entries.get(key) is not entry:
+            return False
+        del self._entries[key]
+        self._bytes -= entry.size
+        return True
+
+    def get(self, key: str):
+        """Return ``(path, CachedImage)`` for a fresh entry, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._forget(key, entry)
+                expired = True
+            else:
+                self._entries.move_to_end(key)
+                expired = False
+        if expired:
+            self._remove_files(key)
+            return None
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key, entry)
+            return None
+        return path, entry
+
+    def open_temp(self):
+        """Return ``(path, file)`` of a new temporary file inside the cache directory."""
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        return path, os.fdopen(fd, "wb")
+
+    def commit(self, key: str, temp_path: str, entry: CachedImage):
+        """Move a completely written *temp_path* into the cache as *key*."""
+        if entry.size > self.max_bytes:
+            os.remove(temp_path)
+            return
+        with open(self._path(key) + ".json", "w", encoding="utf-8") as f:
+            json.dump(entry._asdict(), f)
+        os.replace(temp_path, self._path(key))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            evicted = self._over_budget()
+        self._remove_all(evicted)
+
+    def discard(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+        self._remove_files(key)
+
+    def _over_budget(self):
+        """Drop least recently used entries past ``max_bytes`` from the index.
+
+        Caller holds the lock and removes the returned keys' files after
+        releasing it.
+        """
+        evicted = []
+        while self._bytes > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            evicted.append(key)
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class ImageProxy:
+    def __init__(
+        self,
+        cache_dir: str = IMAGE_CACHE_DIR,
+        max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+        negative_ttl: float = IMAGE_NEGATIVE_TTL,
+        max_per_host: int = IMAGE_PROXY_MAX_PER_HOST,
+        host_wait: float = IMAGE_PROXY_HOST_WAIT,
+        transform_workers: int = IMAGE_TRANSFORM_WORKERS,
+        max_body: int = IMAGE_MAX_BODY_BYTES,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.max_per_host = max_per_host
+        self.host_wait = host_wait
+        self.transform_workers = transform_workers
+        self.max_body = max_body
+        self._transport = transport
+        self._pool = None
+        self._variants_in_flight = {}  # variant key -> asyncio.Task
+        self._cache = None
+        self._cache_lock = asyncio.Lock()
+        self._client = None
+        self._hosts = {}  # host -> asyncio.Semaphore
+        self._pumps = set()  # tasks reading upstream bodies of streamed responses
+        self._failures = {}  # url -> time.monotonic() until which it fails fast
+        self._hits = 0
+        self._misses = 0
+        self._negative_hits = 0
+        self._host_wait_timeouts = 0
+        self._transformed = 0
+        self._upstream_errors = 0
+        self._too_large = 0
+        self._bytes_from_origin = 0
+
+    async def cache(self) -> ImageCache:
+        """Return the disk cache, scanning its directory in a thread on first use."""
+        if self._cache is None:
+            async with self._cache_lock:
+                if self._cache is None:
+                    self._cache = await asyncio.to_thread(
+                        ImageCache, self.cache_dir, self.max_bytes
+                    )
+        return self._cache
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            options = dict(
+                limits=httpx.Limits(
+                    max_connections=IMAGE_PROXY_MAX_CONNECTIONS,
+                    max_keepalive_connections=IMAGE_PROXY_MAX_CONNECTIONS,
+                ),
+                timeout=IMAGE_PROXY_TIMEOUT,
+                follow_redirects=True,
+                transport=self._transport,
+            )
+            try:
+                self._client = httpx.AsyncClient(http2=True, **options)
+            except ImportError:
+                logging.warning("h2 is not installed; the image proxy uses HTTP/1.1.")
+                self._client = httpx.AsyncClient(**options)
+        return self._client
+
+    async def close(self):
+        for task in list(self._pumps):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        return slot
+
+    def _failed(self, url: str):
+        self._upstream_errors += 1
+        self._failures[url] = time.monotonic() + self.negative_ttl
+        if len(self._failures) > 10000:
+            now = time.monotonic()
+            self._failures = {u: t for u, t in self._failures.items() if t > now}
+
+    def _too_large_error(self, url: str) -> HTTPException:
+        self._too_large += 1
+        logging.error(f"Image from {url} is larger than {self.max_body} bytes")
+        self._failed(url)
+        return HTTPException(status_code=502, detail="Image is too large")
+
+    def _check_url(self, url: str):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise HTTPException(status_code=400, detail="Only http(s) image URLs can be proxied")
+        return parts.hostname
+
+    def _check_negative(self, url: str):
+        failed_until = self._failures.get(url)
+        if failed_until is not None:
+            if failed_until > time.monotonic():
+                self._negative_hits += 1
+                raise HTTPException(status_code=502, detail="Failed to fetch image")
+            del self._failures[url]
+
+    async def _open_upstream(self, url: str, host: str):
+        """Send the GET for *url* holding a slot of *host*; return ``(response, slot)``.
+
+        Raises ``HTTPException`` 503 if no slot frees up within
+        ``host_wait`` seconds, and 502 if the origin fails or declares a body
+        over ``max_body``. The caller must close the response and release
+        the slot.
+        """
+        self._misses += 1
+        slot = self._host_slot(host)
+        try:
+            await asyncio.wait_for(slot.acquire(), self.host_wait)
+        except asyncio.TimeoutError:
+            self._host_wait_timeouts += 1
+            logging.warning(f"No free connection slot for image host {host}")
+            raise HTTPException(
+                status_code=503, detail="Image host is busy", headers={"Retry-After": "1"}
+            )
+        try:
+            client = self.client()
+            upstream = await client.send(client.build_request("GET", url), stream=True)
+        except httpx.HTTPError as e:
+            slot.release()
+            logging.error(f"Failed to fetch image from {url}: {e}")
+            self._failed(url)
+            raise HTTPException(status_code=502, detail="Failed to fetch image")
+        except BaseException:
+            slot.release()
+            raise
+        if upstream.status_code >= 400:
+            await upstream.aclose()
+            slot.release()
+            logging.error(f"Failed to fetch image from {url}: HTTP {upstream.status_code}")
+            self._failed(url)
+            raise HTTPException(status_code=502, detail="Failed to fetch image")
+        try:
+            declared = int(upstream.headers.get("content-length", "0"))
+        except ValueError:
+            declared = 0
+        if declared > self.max_body:
+            await upstream.aclose()
+            slot.release()
+            raise self._too_large_error(url)
+        return upstream, slot
+
+    async def _cached_response(self, key: str, headers: dict = None):
+        cache = await self.cache()
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is None:
+            return None
+        self._hits += 1
+        path, entry = cached
+        max_age = max(0, int(entry.expires_at - time.time()))
+        return FileResponse(
+            path,
+            media_type=entry.content_type,
+            headers=dict(
+                headers or {}, **{"Cache-Control": f"public, max-age={max_age}", "X-Cache": "HIT"}
+            ),
+        )
+
+    async def _store(self, key: str, content: bytes, entry: CachedImage):
+        cache = await self.cache()
+
+        def store():
+            temp_path, temp = cache.open_temp()
+            with temp:
+                temp.write(content)
+            cache.commit(key, temp_path, entry)
+
+        try:
+            await asyncio.to_thread(store)
+        except OSError as e:
+            logging.warning(f"Could not cache image {key}: {e}")
+
+    async def fetch(
+        self,
+        url: str,
+        width: int = None,
+        height: int = None,
+        fmt: str = None,
+        accept: str = None,
+    ):
+        """Return a response serving the image at *url*.
+
+        With *width*, *height* or *fmt* the image is resized to fit within
+        the given box (never enlarged) and/or transcoded; see
+        ``_plan_variant``. Raises ``HTTPException`` 400 for non-HTTP URLs or
+        bad parameters, 501 when resizing is not available and 502 when the
+        origin fails.
+        """
+        host = self._check_url(url)
+        if width or height or fmt:
+            return await self._fetch_variant(url, host, width, height, fmt, accept)
+        key = _cache_key(url)
+
+        cached = await self._cached_response(key)
+        if cached is not None:
+            return cached
+        self._check_negative(url)
+        upstream, slot = await self._open_upstream(url, host)
+
+        now = time.time()
+        expires_at = _freshness(upstream.headers, now)
+        content_type = upstream.headers.get("content-type", "application/octet-stream")
+        headers = {
+            "Cache-Control": _cache_control(upstream.headers, expires_at, now),
+            "X-Cache": "MISS",
+        }
+        # ``aiter_bytes`` undoes any Content-Encoding, so the upstream length
+        # only holds for unencoded bodies.
+        if "content-length" in upstream.headers and "content-encoding" not in upstream.headers:
+            headers["Content-Length"] = upstream.headers["content-length"]
+
+        cache = await self.cache()
+        # Bodies are capped at ``max_body``, which bounds the queue without
+        # making the origin read wait for the client.
+        chunks = asyncio.Queue(maxsize=self.max_body // _CHUNK_SIZE + 2)
+
+        async def pump():
+            # Reads the origin at its own pace into ``chunks``, so the host
+            # slot is freed once the body has arrived, however slowly the
+            # client reads it.
+            temp_path = temp = None
+            size = 0
+            complete = False
+            try:
+                if expires_at is not None and expires_at > now:
+                    try:
+                        temp_path, temp = await asyncio.to_thread(cache.open_temp)
+                    except OSError as e:
+                        logging.warning(f"Could not cache image from {url}: {e}")
+                async for chunk in upstream.aiter_bytes(_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_body:
+                        self._too_large_error(url)
+                        break
+                    if temp is not None:
+                        await asyncio.to_thread(temp.write, chunk)
+                    await chunks.put(chunk)
+                else:
+                    complete = True
+            except httpx.HTTPError as e:
+                logging.error(f"Image stream from {url} broke off: {e}")
+                self._failed(url)
+            finally:
+                self._bytes_from_origin += size
+                await upstream.aclose()
+                slot.release()
+                await chunks.put(None)
+                if temp is not None:
+                    try:
+                        await asyncio.to_thread(
+                            _finish_temp, cache, key, temp, temp_path,
+                            CachedImage(size, content_type, expires_at) if complete else None,
+                        )
+                    except OSError as e:
+                        logging.warning(f"Could not cache image from {url}: {e}")
+
+        # Started before the response, so the slot is released even if the
+        # client goes away before reading the body.
+        task = asyncio.ensure_future(pump())
+        self._pumps.add(task)
+        task.add_done_callback(self._pumps.discard)
+
+        async def body():
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    return
+                yield chunk
+
+        return StreamingResponse(body(), media_type=content_type, headers=headers)
+
+    async def _original(self, url: str, host: str):
+        """Return ``(bytes, expires_at, cache_control)`` of the original image, cached or fetched.
+
+        *cache_control* holds the origin's restricting directives when
+        *expires_at* is ``None`` (see ``_cache_control``), else ``None``.
+        """
+        cache = await self.cache()
+        cached = await asyncio.to_thread(cache.get, _cache_key(url))
+        if cached is not None:
+            self._hits += 1
+            path, entry = cached
+            return await asyncio.to_thread(_read_file, path), entry.expires_at, None
+
+        self._check_negative(url)
+        upstream, slot = await self._open_upstream(url, host)
+        try:
+            parts = []
+            size = 0
+            async for chunk in upstream.aiter_bytes(_CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_body:
+                    raise self._too_large_error(url)
+                parts.append(chunk)
+            content = b"".join(parts)
+        except httpx.HTTPError as e:
+            logging.error(f"Failed to fetch image from {url}: {e}")
+            self._failed(url)
+            raise HTTPException(status_code=502, detail="Failed to fetch image")
+        finally:
+            await upstream.aclose()
+            slot.release()
+        self._bytes_from_origin += len(content)
+
+        now = time.time()
+        expires_at = _freshness(upstream.headers, now)
+        if expires_at is not None and expires_at > now:
+            content_type = upstream.headers.get("content-type", "application/octet-stream")
+            await self._store(
+                _cache_key(url), content, CachedImage(len(content), content_type, expires_at)
+            )
+        if expires_at is None:
+            return content, None, _cache_control(upstream.headers, None, now)
+        return content, expires_at, None
+
+    def _transform_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.transform_workers)
+        return self._pool
+
+    async def _fetch_variant(self, url, host, width, height, fmt, accept):
+        width, height, fmt, vary = _plan_variant(width, height, fmt, accept)
+        headers = {"Vary": "Accept"} if vary else {}
+        key = _cache_key(f"{url}\n{width}x{height}\n{fmt}")
+
+        cached = await self._cached_response(key, headers)
+        if cached is not None:
+            return cached
+
+        # Concurrent requests for one variant share a single fetch and resize.
+        task = self._variants_in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._make_variant(key, url, host, width, height, fmt))
+            self._variants_in_flight[key] = task
+        content, content_type, expires_at, cache_control = await asyncio.shield(task)
+
+        if expires_at is not None:
+            cache_control = _cache_control(None, expires_at, time.time())
+        headers.update({"Cache-Control": cache_control, "X-Cache": "MISS"})
+        return Response(content, media_type=content_type, headers=headers)
+
+    async def _make_variant(self, key, url, host, width, height, fmt):
+        try:
+            original, expires_at, cache_control = await self._original(url, host)
+            loop = asyncio.get_running_loop()
+            try:
+                content, content_type = await loop.run_in_executor(
+                    self._transform_pool(), _transform, original, width, height, fmt
+                )
+            except Exception as e:
+                logging.error(f"Could not resize image from {url}: {e}")
+                raise HTTPException(status_code=502, detail="Could not process image")
+            self._transformed += 1
+            if expires_at is not None and expires_at > time.time():
+                await self._store(key, content, CachedImage(len(content), content_type, expires_at))
+            return content, content_type, expires_at, cache_control
+        finally:
+            self._variants_in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "negative_hits": self._negative_hits,
+            "host_wait_timeouts": self._host_wait_timeouts,
+            "transformed": self._transformed,
+            "upstream_errors": self._upstream_errors,
+            "too_large": self._too_large,
+            "bytes_from_origin": self._bytes_from_origin,
+            "cache": (
+                self._cache.stats()
+                if self._cache is not None
+                else {"entries": 0, "bytes": 0, "max_bytes": self.max_bytes, "evictions": 0}
+            ),
+        }
@@ -1,7 +1,12 @@
 
+import asyncio
+import hashlib
 import logging
 import os
-from typing import List, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import partial
+from typing import List, Literal, Optional
 from copy import deepcopy
 
 try:
@@ -10,32 +15,78 @@ except ImportError:  # pragma: no cover
     from config import DEFAULT_SCRAPER_CONFIG
 try:
     from .utils.logging import setup_logging
-    from .database import (
+    from .utils.json_file import JsonFileCache
+    from .admission import AdmissionLimiter, AdmissionMiddleware
+    from .events import ChangeWatcher, EventHub
+    from .export import get_encoder
+    from .image_proxy import ImageProxy
+    from .metrics import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        AppStatsCollector,
+        MetricsMiddleware,
+        metrics_body,
+    )
+    from .response_cache import ResponseCache
+    from .serialization import EncodedBody, encode, json_response, loads, strip_encoding
+    from .database import migrate, close_pool, get_pool_stats
+    from .async_database import (
         get_deals_from_db,
+        get_feed,
         get_all_merchants,
-        create_tables,
         update_deal,
-        create_owner_tables,
+        update_deals_batch,
+        apply_owner_deal_batch,
+        stream_deals,
         insert_owner_deal,
         get_owner_deals,
         update_owner_deal,
         delete_owner_deal,
+        get_deal_price_history,
+        get_generations,
+        get_pool as get_async_pool,
+        close_pool as close_async_pool,
+        get_pool_stats as get_async_pool_stats,
     )
 except ImportError:  # pragma: no cover
     from utils.logging import setup_logging
-    from database import (
+    from utils.json_file import JsonFileCache
+    from admission import AdmissionLimiter, AdmissionMiddleware
+    from events import ChangeWatcher, EventHub
+    from export import get_encoder
+    from image_proxy import ImageProxy
+    from metrics import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        AppStatsCollector,
+        MetricsMiddleware,
+        metrics_body,
+    )
+    from response_cache import ResponseCache
+    from serialization import EncodedBody, encode, json_response, loads, strip_encoding
+    from database import migrate, close_pool, get_pool_stats
+    from async_database import (
         get_deals_from_db,
+        get_feed,
         get_all_merchants,
-        create_tables,
         update_deal,
-        create_owner_tables,
+        update_deals_batch,
+        apply_owner_deal_batch,
+        stream_deals,
         insert_owner_deal,
         get_owner_deals,
         update_owner_deal,
         delete_owner_deal,
+        get_deal_price_history,
+        get_generations,
+        get_pool as get_async_pool,
+        close_pool as close_async_pool,
+        get_pool_stats as get_async_pool_stats,
     )
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -45,6 +96,41 @@ DATA_DIR = "data"
 LATEST_DEALS_FILE = os.path.join(DATA_DIR, "latest_deals.json")
 SCRAPER_STATUS_FILE = os.path.join(DATA_DIR, "scraper_status.json")
 SCRAPER_CONFIG_FILE = os.path.join(DATA_DIR, "scraper_config.json")
+# Maximum number of items per list in a batch request.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+# Response cache of /api/deals, /api/merchants and /api/owner_deals.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# How long a read of the data generations is trusted; bounds how late a
+# scrape committed by the scraper process is noticed.
+RESPONSE_CACHE_GENERATION_TTL = float(os.getenv("RESPONSE_CACHE_GENERATION_TTL", "1"))
+# How often to check for a new scrape, and how many merchants' first pages
+# to load into the cache when one lands (0 disables pre-warming).
+RESPONSE_CACHE_WARM_INTERVAL = float(os.getenv("RESPONSE_CACHE_WARM_INTERVAL", "10"))
+RESPONSE_CACHE_WARM_MERCHANTS = int(os.getenv("RESPONSE_CACHE_WARM_MERCHANTS", "50"))
+# List responses smaller than this many bytes are not compressed.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# /api/events: how often to check for scraper and data changes, how often to
+# send keep-alives, and how many undelivered events a subscriber may have
+# before it is disconnected.
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1"))
+EVENTS_KEEPALIVE_INTERVAL = float(os.getenv("EVENTS_KEEPALIVE_INTERVAL", "15"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "64"))
+# Admission control: requests running at once and waiting per endpoint
+# group. A request that waits longer than ADMISSION_QUEUE_TIMEOUT seconds,
+# or finds the queue full, gets 503 with Retry-After.
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "64"))
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "128"))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "8"))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", "32"))
+ADMISSION_IMAGE_LIMIT = int(os.getenv("ADMISSION_IMAGE_LIMIT", "32"))
+ADMISSION_IMAGE_QUEUE = int(os.getenv("ADMISSION_IMAGE_QUEUE", "64"))
+# Each deal export holds a pooled connection until its download ends, so
+# keep ADMISSION_EXPORT_LIMIT well below DB_POOL_MAX_SIZE.
+ADMISSION_EXPORT_LIMIT = int(os.getenv("ADMISSION_EXPORT_LIMIT", "2"))
+ADMISSION_EXPORT_QUEUE = int(os.getenv("ADMISSION_EXPORT_QUEUE", "4"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
 
 # --- Logging Setup ---
 setup_logging(LOG_FILE)
@@ -56,10 +142,239 @@ app = FastAPI(
     version="1.0.0",
 )
 
+response_cache = ResponseCache(
+    lambda: get_generations(),
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    generation_ttl=RESPONSE_CACHE_GENERATION_TTL,
+    sizeof=lambda body: body.size,
+)
+
+image_proxy = ImageProxy()
+
+async def _event_generations(fresh: bool):
+    if fresh:
+        response_cache.expire_generations()
+    return await response_cache.generations()
+
+event_hub = EventHub(queue_size=EVENTS_QUEUE_SIZE)
+event_watcher = ChangeWatcher(
+    event_hub,
+    lambda: get_scraper_status(),
+    _event_generations,
+    interval=EVENTS_POLL_INTERVAL,
+    keepalive_interval=EVENTS_KEEPALIVE_INTERVAL,
+)
+
+async def _encoded_page(read, fields, source="deals"):
+    """Encode the page dict *read* returns, keeping only *fields* per row.
+
+    Rows come from typed columns that already match the response models, so
+    they are projected instead of validated through pydantic per request.
+    Returns ``(generation, body)`` for the response cache, as ``_encoded``.
+    """
+    generations = {}
+    data = await read(generations=generations)
+    products = [
+        {name: deal.get(name, default) for name, default in fields.items()}
+        for deal in data["products"]
+    ]
+    return generations.get(source), encode(dict(data, products=products))
+
+async def _encoded(read, source="deals"):
+    """Return ``(generation, body)``: *read*'s result encoded, with the
+    generation of *source* it was read at (filled in by the read function)."""
+    generations = {}
+    result = await read(generations=generations)
+    return generations.get(source), encode(result)
+
+def _cached_deals(
+    page=1,
+    page_size=50,
+    merchant=None,
+    title=None,
+    cursor=None,
+    total="exact",
+    min_price=None,
+    max_price=None,
+    min_discount=None,
+    sort=None,
+    order=None,
+):
+    """``get_deals_from_db`` through the response cache."""
+    args = (page, page_size, merchant, title, cursor)
+    filters = dict(
+        total=total, min_price=min_price, max_price=max_price,
+        min_discount=min_discount, sort=sort, order=order,
+    )
+    key = ("deals",) + args + tuple(filters.values())
+    return response_cache.get(
+        key, lambda: _encoded_page(partial(get_deals_from_db, *args, **filters), DEAL_FIELDS)
+    )
+
+def _cached_merchants():
+    return response_cache.get(("merchants",), lambda: _encoded(get_all_merchants))
+
+def _cached_owner_deals(page=1, page_size=50, cursor=None):
+    return response_cache.get(
+        ("owner_deals", page, page_size, cursor),
+        lambda: _encoded_page(
+            partial(get_owner_deals, page, page_size, cursor), DEAL_FIELDS, "owner_deals"
+        ),
+        source="owner_deals",
+    )
+
+def _respond(request: Request, body, headers: dict):
+    return json_response(
+        body, request.headers.get("accept-encoding"), COMPRESSION_MIN_SIZE, headers
+    )
+
+def _validators(request: Request, generation) -> dict:
+    """Return ``ETag``/``Last-Modified`` headers for a body read at *generation*.
+
+    *generation* is the one the response cache stored the body under, read in
+    the same snapshot as the body, so the ETag is strong: one data generation
+    and set of query parameters always yields the same body.
+    ``Last-Modified`` is when the generation last moved. No headers are
+    returned without a generation.
+    """
+    if generation is None:
+        return {}
+    params = sorted(request.query_params.multi_items())
+    digest = hashlib.sha256(
+        repr((request.url.path, generation.generation, params)).encode("utf-8")
+    ).hexdigest()[:32]
+    # ``no-cache`` lets browsers and proxies keep the body but revalidate it.
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if generation.updated_at is not None:
+        headers["Last-Modified"] = format_datetime(
+            generation.updated_at.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+def _cached_response(request: Request, generation, body):
+    """Answer with *body* from the response cache, or ``304`` if the client has it."""
+    headers = _validators(request, generation)
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return _respond(request, body, headers)
+
+async def _early_not_modified(request: Request, source="deals"):
+    """Return a ``304`` if the client's validators match *source*'s current
+    generation, without loading the body; ``None`` if the body is needed.
+
+    The ETag depends only on the path, the query and the generation, so a
+    match needs no body. The generation is the response cache's, as fresh as
+    the one a cache hit is checked against.
+    """
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return None
+    headers = _validators(request, (await response_cache.generations()).get(source))
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return None
+
+def _not_modified(request: Request, headers: dict) -> bool:
+    """Whether the client's copy matches *headers* (``If-None-Match`` first)."""
+    etag = headers.get("ETag")
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [
+            strip_encoding(tag.strip().removeprefix("W/")) for tag in if_none_match.split(",")
+        ]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def _warm_response_cache():
+    """Load the merchant list and first deal pages after every new scrape.
+
+    Runs for the life of the app; the scraper commits in another process, so
+    a scrape is noticed by its ``deals`` generation changing.
+    """
+    warmed = None
+    while True:
+        try:
+            generation = (await response_cache.generations()).get("deals")
+            if generation != warmed:
+                _, merchants = await _cached_merchants()
+                merchants = loads(merchants.raw)
+                for merchant in [None] + merchants[:RESPONSE_CACHE_WARM_MERCHANTS]:
+                    await _cached_deals(merchant=merchant)
+                warmed = generation
+                logging.info(
+                    f"Response cache warmed for data generation {generation.generation}."
+                )
+        except Exception as e:
+            logging.warning(f"Could not warm the response cache: {e}")
+        await asyncio.sleep(RESPONSE_CACHE_WARM_INTERVAL)
+
 @app.on_event("startup")
-def startup_event():
-    create_tables()
-    create_owner_tables()
+async def startup_event():
+    # Migrations use the sync layer; request handlers use the async pool.
+    await run_in_threadpool(migrate)
+    await get_async_pool()
+    app.state.cache_warmer = None
+    if RESPONSE_CACHE_WARM_MERCHANTS > 0:
+        app.state.cache_warmer = asyncio.create_task(_warm_response_cache())
+    app.state.event_watcher = asyncio.create_task(event_watcher.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if app.state.cache_warmer is not None:
+        app.state.cache_warmer.cancel()
+    app.state.event_watcher.cancel()
+    event_hub.close()
+    await image_proxy.close()
+    await close_async_pool()
+    close_pool()
+
+# --- Admission Control ---
+admission_limiters = {
+    "reads": AdmissionLimiter(ADMISSION_READ_LIMIT, ADMISSION_READ_QUEUE, ADMISSION_QUEUE_TIMEOUT),
+    "writes": AdmissionLimiter(ADMISSION_WRITE_LIMIT, ADMISSION_WRITE_QUEUE, ADMISSION_QUEUE_TIMEOUT),
+    "images": AdmissionLimiter(ADMISSION_IMAGE_LIMIT, ADMISSION_IMAGE_QUEUE, ADMISSION_QUEUE_TIMEOUT),
+    "exports": AdmissionLimiter(ADMISSION_EXPORT_LIMIT, ADMISSION_EXPORT_QUEUE, ADMISSION_QUEUE_TIMEOUT),
+}
+
+# Never limited: the event stream is long-lived, and the stats endpoints
+# must answer during overload.
+ADMISSION_EXEMPT_PATHS = {
+    "/api/events",
+    "/api/admission_stats",
+    "/api/cache_stats",
+    "/api/db_pool_stats",
+}
+
+def _admission_group(scope) -> Optional[str]:
+    path = scope["path"]
+    if not path.startswith("/api/") or path in ADMISSION_EXEMPT_PATHS:
+        return None
+    if path == "/api/proxy-image":
+        return "images"
+    if path == "/api/deals/export":
+        return "exports"
+    if scope["method"] in ("GET", "HEAD"):
+        return "reads"
+    if scope["method"] == "OPTIONS":
+        return None
+    return "writes"
+
+# Added before CORS so that 503 responses still carry CORS headers.
+app.add_middleware(
+    AdmissionMiddleware,
+    limiters=admission_limiters,
+    classify=_admission_group,
+    retry_after=ADMISSION_RETRY_AFTER,
+)
 
 # --- CORS Middleware ---
 # Allow requests based on the ALLOWED_ORIGINS environment variable.
@@ -88,6 +403,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Metrics ---
+# Outermost, so request latency includes time queued for admission.
+app.add_middleware(MetricsMiddleware, exclude={"/api/events", "/metrics"})
+
+def _pool_stats():
+    pools = {"sync": get_pool_stats(), "async": get_async_pool_stats()}
+    for layer in ("sync", "async"):
+        for i, stats in enumerate(pools[layer].get("replicas", [])):
+            pools[f"{layer}_replica_{i}"] = stats
+    return pools
+
+REGISTRY.register(
+    AppStatsCollector(
+        pools=_pool_stats,
+        responses=lambda: response_cache.stats(),
+        images=lambda: image_proxy.stats(),
+        admission=lambda: {name: limiter.stats() for name, limiter in admission_limiters.items()},
+        events=lambda: event_hub.stats(),
+    )
+)
+
 
 
 
@@ -153,10 +489,55 @@ class Deal(BaseModel):
 
 class ScrapeResponse(BaseModel):
     """Defines the structure of the response for the deals endpoint."""
-    total_products: int
+    total_products: Optional[int] = None
     products: List[Deal]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+
+class FeedDeal(Deal):
+    """A deal of the merged feed, tagged with where it came from."""
+    source: Literal["scraped", "owner"]
+    listed_at: Optional[datetime] = None
+
+class FeedResponse(BaseModel):
+    """One page of the merged feed; page through it with ``next_cursor``."""
+    total_products: Optional[int] = None
+    products: List[FeedDeal]
+    page_size: int
+    next_cursor: Optional[str] = None
+
+class DashboardResponse(BaseModel):
+    """The sections of ``/api/dashboard``; unrequested ones are omitted."""
+    deals: Optional[ScrapeResponse] = None
+    merchants: Optional[List[str]] = None
+    owner_deals: Optional[ScrapeResponse] = None
+    scraper_status: Optional[ScraperStatus] = None
+
+def _field_defaults(model):
+    return {
+        name: None if field.is_required() else field.default
+        for name, field in model.model_fields.items()
+    }
+
+# Fields of a deal in list responses, with their defaults.
+DEAL_FIELDS = _field_defaults(Deal)
+FEED_FIELDS = _field_defaults(FeedDeal)
+
+class PriceHistoryPoint(BaseModel):
+    recorded_at: datetime
+    price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    original_price: Optional[float] = None
+    discount: Optional[float] = None
+    samples: int
+
+class PriceHistoryResponse(BaseModel):
+    """Downsampled price history of a single deal."""
+    deal_id: int
+    product_url: str
+    points: List[PriceHistoryPoint]
 
 class DealUpdate(BaseModel):
     title: Optional[str] = None
@@ -188,8 +569,43 @@ class OwnerDealUpdate(BaseModel):
     rating: Optional[str] = None
     reviews_count: Optional[str] = None
 
+class DealBatchUpdate(DealUpdate):
+    id: int
+
+class DealBatch(BaseModel):
+    update: List[DealBatchUpdate] = Field(..., max_length=MAX_BATCH_SIZE)
+
+class OwnerDealBatchUpdate(OwnerDealUpdate):
+    id: int
+
+class OwnerDealBatch(BaseModel):
+    create: List[OwnerDealCreate] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    update: List[OwnerDealBatchUpdate] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    delete: List[int] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+
+class BatchItemResult(BaseModel):
+    id: int
+    status: Literal["created", "updated", "unchanged", "deleted", "not_found"]
+
+class DealBatchResult(BaseModel):
+    updated: List[BatchItemResult]
+
+class OwnerDealBatchResult(BaseModel):
+    created: List[BatchItemResult]
+    updated: List[BatchItemResult]
+    deleted: List[BatchItemResult]
+
 
 # --- API Endpoints ---
+# Config and status files, parsed once per change (keyed by path).
+_json_files = {}
+
+def _json_file(path, default):
+    cache = _json_files.get(path)
+    if cache is None:
+        cache = _json_files.setdefault(path, JsonFileCache(path, default))
+    return cache
+
 @app.get(
     "/api/scraper_config",
     response_model=ScraperConfig,
@@ -201,26 +617,17 @@ def get_scraper_config():
     Reads the scraper configuration from the JSON file and returns it.
     If the file doesn't exist, it returns a default configuration.
     """
+    config_file = _json_file(SCRAPER_CONFIG_FILE, lambda: deepcopy(DEFAULT_SCRAPER_CONFIG))
     if not os.path.exists(SCRAPER_CONFIG_FILE):
         # Initialize with default config if the file doesn't exist
         try:
-            os.makedirs(DATA_DIR, exist_ok=True)
-            with open(SCRAPER_CONFIG_FILE, "w", encoding="utf-8") as f:
-                import json
-                json.dump(DEFAULT_SCRAPER_CONFIG, f, ensure_ascii=False, indent=2)
+            config_file.write(deepcopy(DEFAULT_SCRAPER_CONFIG), ensure_ascii=False, indent=2)
         except Exception as e:
             logging.error(f"Failed to initialize {SCRAPER_CONFIG_FILE}: {e}")
         return deepcopy(DEFAULT_SCRAPER_CONFIG)
 
-    try:
-        with open(SCRAPER_CONFIG_FILE, "r", encoding="utf-8") as f:
-            import json
-            data = json.load(f)
-        return data
-    except Exception as e:
-        logging.error(f"Could not read or parse {SCRAPER_CONFIG_FILE}: {e}")
-        # Return default config on error as well
-        return deepcopy(DEFAULT_SCRAPER_CONFIG)
+    # Falls back to the default config if the file cannot be parsed.
+    return config_file.get()
 
 @app.post(
     "/api/scraper_config",
@@ -232,9 +639,9 @@ def update_scraper_config(config: ScraperConfig):
     Writes the provided scraper configuration to the JSON file.
     """
     try:
-        with open(SCRAPER_CONFIG_FILE, "w", encoding="utf-8") as f:
-            import json
-            json.dump(config.dict(by_alias=True), f, ensure_ascii=False, indent=2)
+        _json_file(SCRAPER_CONFIG_FILE, lambda: deepcopy(DEFAULT_SCRAPER_CONFIG)).write(
+            config.dict(by_alias=True), ensure_ascii=False, indent=2
+        )
         logging.info("Scraper configuration updated successfully.")
         return {"message": "Scraper configuration updated successfully."}
     except Exception as e:
@@ -252,17 +659,7 @@ def get_scraper_status():
     Reads the scraper status from the JSON file and returns it.
     If the file doesn't exist, it returns a default status of not scraping.
     """
-    if not os.path.exists(SCRAPER_STATUS_FILE):
-        return {"is_scraping": False}
-
-    try:
-        with open(SCRAPER_STATUS_FILE, "r", encoding="utf-8") as f:
-            import json
-            data = json.load(f)
-        return data
-    except Exception as e:
-        logging.error(f"Could not read or parse {SCRAPER_STATUS_FILE}: {e}")
-        return {"is_scraping": False}
+    return _json_file(SCRAPER_STATUS_FILE, lambda: {"is_scraping": False}).get()
 
 @app.get(
     "/api/deals",
@@ -270,29 +667,155 @@ def get_scraper_status():
     summary="Get Latest Scraped Deals",
     description="Retrieves the most recently scraped hot deals from the database with pagination.",
 )
-def get_latest_deals(
+async def get_latest_deals(
+    request: Request,
     page: int = 1,
     page_size: int = 50,
     merchant: Optional[str] = None,
     title: str = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    total: Literal["exact", "estimate"] = "exact",
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_discount: Optional[float] = None,
+    sort: Optional[Literal["price", "discount", "rating", "reviews"]] = None,
+    order: Optional[Literal["asc", "desc"]] = None,
 ):
     """
     Reads the latest deals from the database with pagination.
+    Pass the previous response's ``next_cursor`` as ``cursor`` for keyset paging.
+    ``total=estimate`` reports the planner's row estimate instead of an exact
+    count; ``include_total=false`` omits the total altogether.
+    ``sort`` orders by parsed price, discount, rating or review count (cheapest
+    price and highest of the others first unless ``order`` is given).
+    Responses carry an ``ETag``; a matching ``If-None-Match`` gets ``304``.
     """
     try:
-        deals_data = get_deals_from_db(page, page_size, merchant, title)
-        return deals_data
+        not_modified = await _early_not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        generation, body = await _cached_deals(
+            page,
+            page_size,
+            merchant,
+            title,
+            cursor,
+            total=total if include_total else "none",
+            min_price=min_price,
+            max_price=max_price,
+            min_discount=min_discount,
+            sort=sort,
+            order=order,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Could not fetch deals from database: {e}")
         return {"total_products": 0, "products": [], "page": page, "page_size": page_size}
+    return _cached_response(request, generation, body)
+
+@app.get(
+    "/api/deals/export",
+    summary="Export Deals",
+    description="Streams every deal matching the filters as NDJSON, CSV or Parquet.",
+    response_class=StreamingResponse,
+)
+async def export_deals_api(
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    merchant: Optional[str] = None,
+    title: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_discount: Optional[float] = None,
+    sort: Optional[Literal["price", "discount", "rating", "reviews"]] = None,
+    order: Optional[Literal["asc", "desc"]] = None,
+):
+    """
+    Takes the same filters and ordering as ``/api/deals`` but returns the whole
+    result set in one response, read from a server-side cursor batch by batch.
+    CSV columns follow the scraper's CSV export.
+    """
+    try:
+        encoder = get_encoder(format)
+        batches = stream_deals(
+            merchant,
+            title,
+            min_price=min_price,
+            max_price=max_price,
+            min_discount=min_discount,
+            sort=sort,
+            order=order,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    async def body():
+        yield encoder.start()
+        exported = 0
+        try:
+            async for deals in batches:
+                yield encoder.encode(deals)
+                exported += len(deals)
+        except Exception as e:
+            # The 200 status is already sent; re-raising drops the connection
+            # so the client sees a failed download, not a short file.
+            logging.error(f"Deal export failed after {exported} deals: {e}")
+            raise
+        yield encoder.finish()
+
+    return StreamingResponse(
+        body(),
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="deals.{encoder.extension}"'},
+    )
+
+@app.get(
+    "/api/deals/{deal_id}/history",
+    response_model=PriceHistoryResponse,
+    summary="Get Deal Price History",
+)
+async def get_deal_history_api(
+    deal_id: int,
+    points: int = Query(200, ge=1, le=2000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Returns a deal's price history downsampled server-side to at most ``points`` points.
+    """
+    history = await get_deal_price_history(deal_id, points, since, until)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    return history
+
+@app.put("/api/deals/batch", response_model=DealBatchResult, summary="Update Deals in Bulk")
+async def update_deals_batch_api(batch: DealBatch):
+    """
+    Applies all edits in one transaction and reports a status per item, in order.
+    """
+    try:
+        updated = await update_deals_batch(
+            [deal.dict(exclude_unset=True) for deal in batch.update]
+        )
+        response_cache.expire_generations()
+        return {"updated": updated}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Could not apply deal batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to update deals: {e}")
 
 @app.put("/api/deals/{deal_id}", summary="Update a Deal")
-def update_deal_api(deal_id: int, deal: DealUpdate):
+async def update_deal_api(deal_id: int, deal: DealUpdate):
     """
     Updates a deal in the database.
     """
     try:
-        update_deal(deal_id, deal.dict(exclude_unset=True))
+        await update_deal(deal_id, deal.dict(exclude_unset=True))
+        response_cache.expire_generations()
         return {"message": "Deal updated successfully."}
     except Exception as e:
         logging.error(f"Could not update deal {deal_id}: {e}")
@@ -303,72 +826,273 @@ def update_deal_api(deal_id: int, deal: DealUpdate):
     response_model=ScrapeResponse,
     summary="Get Owner-Created Deals",
 )
-def get_owner_deals_api(page: int = 1, page_size: int = 50):
+async def get_owner_deals_api(
+    request: Request,
+    page: int = 1,
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+):
     try:
-        deals_data = get_owner_deals(page, page_size)
-        return deals_data
+        not_modified = await _early_not_modified(request, "owner_deals")
+        if not_modified is not None:
+            return not_modified
+        generation, body = await _cached_owner_deals(page, page_size, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Could not fetch owner deals from database: {e}")
         return {"total_products": 0, "products": [], "page": page, "page_size": page_size}
+    return _cached_response(request, generation, body)
 
 @app.post("/api/owner_deals", summary="Create an Owner Deal")
-def create_owner_deal_api(deal: OwnerDealCreate):
+async def create_owner_deal_api(deal: OwnerDealCreate):
     try:
-        deal_id = insert_owner_deal(deal.dict())
+        deal_id = await insert_owner_deal(deal.dict())
+        response_cache.expire_generations()
+        event_watcher.wake()
         return {"message": "Deal created successfully.", "deal_id": deal_id}
     except Exception as e:
         logging.error(f"Could not create owner deal: {e}")
         return {"message": f"Failed to create deal: {e}"}, 500
 
+@app.post(
+    "/api/owner_deals/batch",
+    response_model=OwnerDealBatchResult,
+    summary="Create, Update and Delete Owner Deals in Bulk",
+)
+async def owner_deals_batch_api(batch: OwnerDealBatch):
+    """
+    Applies all creates, updates and deletes in one transaction; nothing is
+    changed if any of them fails. Each list in the response holds a status per
+    item, in request order.
+    """
+    try:
+        result = await apply_owner_deal_batch(
+            [deal.dict() for deal in batch.create],
+            [deal.dict(exclude_unset=True) for deal in batch.update],
+            batch.delete,
+        )
+        response_cache.expire_generations()
+        event_watcher.wake()
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Could not apply owner deal batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to apply owner deal batch: {e}")
+
 @app.put("/api/owner_deals/{deal_id}", summary="Update an Owner Deal")
-def update_owner_deal_api(deal_id: int, deal: OwnerDealUpdate):
+async def update_owner_deal_api(deal_id: int, deal: OwnerDealUpdate):
     try:
-        update_owner_deal(deal_id, deal.dict(exclude_unset=True))
+        await update_owner_deal(deal_id, deal.dict(exclude_unset=True))
+        response_cache.expire_generations()
+        event_watcher.wake()
         return {"message": "Owner deal updated successfully."}
     except Exception as e:
         logging.error(f"Could not update owner deal {deal_id}: {e}")
         return {"message": f"Failed to update owner deal: {e}"}, 500
 
 @app.delete("/api/owner_deals/{deal_id}", summary="Delete an Owner Deal")
-def delete_owner_deal_api(deal_id: int):
+async def delete_owner_deal_api(deal_id: int):
     logging.info(f"Attempting to delete owner deal with id: {deal_id}")
     try:
-        delete_owner_deal(deal_id)
+        await delete_owner_deal(deal_id)
+        response_cache.expire_generations()
+        event_watcher.wake()
         logging.info(f"Successfully deleted owner deal with id: {deal_id}")
         return {"message": "Owner deal deleted successfully."}
     except Exception as e:
         logging.error(f"Could not delete owner deal {deal_id}: {e}")
         return {"message": f"Failed to delete owner deal: {e}"}, 500
 
+@app.get(
+    "/api/feed",
+    response_model=FeedResponse,
+    summary="Get the Merged Deal Feed",
+    description="Scraped and owner deals in one ordered, cursor-paginated stream.",
+)
+async def get_feed_api(
+    request: Request,
+    page_size: int = 50,
+    merchant: Optional[str] = None,
+    title: Optional[str] = None,
+    cursor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_discount: Optional[float] = None,
+    sort: Optional[Literal["price", "discount", "rating", "reviews"]] = None,
+    order: Optional[Literal["asc", "desc"]] = None,
+    source: Optional[Literal["scraped", "owner"]] = None,
+):
+    """
+    Newest listings first unless ``sort`` is given (same keys as ``/api/deals``).
+    Pass the previous response's ``next_cursor`` as ``cursor`` for the next page.
+    """
+    try:
+        _, body = await _encoded_page(partial(
+            get_feed,
+            page_size,
+            merchant,
+            title,
+            cursor,
+            min_price=min_price,
+            max_price=max_price,
+            min_discount=min_discount,
+            sort=sort,
+            order=order,
+            source=source,
+        ), FEED_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Could not fetch the deal feed from database: {e}")
+        return {"total_products": None, "products": [], "page_size": page_size}
+    return _respond(request, body, {})
+
 @app.get("/api/merchants", response_model=List[str], summary="Get All Merchants")
-def get_all_merchants_api():
+async def get_all_merchants_api(request: Request):
     """
     Retrieves a list of all unique merchant names from the database.
     """
     try:
-        merchants = get_all_merchants()
-        return merchants
+        not_modified = await _early_not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        generation, body = await _cached_merchants()
     except Exception as e:
         logging.error(f"Could not fetch merchants from database: {e}")
         return []
+    return _cached_response(request, generation, body)
+
+DashboardSection = Literal["deals", "merchants", "owner_deals", "scraper_status"]
 
+async def _cached_body(lookup):
+    _, body = await lookup
+    return body
 
+async def _scraper_status_body():
+    return encode(get_scraper_status())
+
+@app.get(
+    "/api/dashboard",
+    response_model=DashboardResponse,
+    summary="Get Everything the Dashboard Needs in One Request",
+)
+async def get_dashboard_api(
+    request: Request,
+    sections: Optional[List[DashboardSection]] = Query(None),
+    deals_page: int = 1,
+    deals_page_size: int = 50,
+    merchant: Optional[str] = None,
+    title: Optional[str] = None,
+    owner_page: int = 1,
+    owner_page_size: int = 50,
+):
+    """
+    Loads the deals page, merchant list, owner-deals page and scraper status
+    concurrently and returns them in one response, keyed by section.
+    ``sections`` (repeatable) limits the response to some of them. The deals
+    section takes ``deals_page``, ``deals_page_size``, ``merchant`` and
+    ``title``; the owner-deals section takes ``owner_page`` and
+    ``owner_page_size``. A section that cannot be loaded gets the same empty
+    value as its own endpoint.
+    """
+    loaders = {
+        "deals": lambda: _cached_body(_cached_deals(deals_page, deals_page_size, merchant, title)),
+        "merchants": lambda: _cached_body(_cached_merchants()),
+        "owner_deals": lambda: _cached_body(_cached_owner_deals(owner_page, owner_page_size)),
+        "scraper_status": _scraper_status_body,
+    }
+    fallbacks = {
+        "deals": {"total_products": 0, "products": [], "page": deals_page, "page_size": deals_page_size},
+        "merchants": [],
+        "owner_deals": {"total_products": 0, "products": [], "page": owner_page, "page_size": owner_page_size},
+        "scraper_status": {"is_scraping": False},
+    }
+    names = list(dict.fromkeys(sections or loaders))
+    results = await asyncio.gather(*(loaders[name]() for name in names), return_exceptions=True)
+    parts = []
+    for name, result in zip(names, results):
+        if isinstance(result, ValueError):
+            raise HTTPException(status_code=400, detail=str(result))
+        if isinstance(result, Exception):
+            logging.error(f"Could not load the dashboard's {name}: {result}")
+            result = encode(fallbacks[name])
+        elif isinstance(result, BaseException):
+            raise result
+        # Sections are already encoded, most of them by the response cache.
+        parts.append(b'"' + name.encode("ascii") + b'":' + result.raw)
+    body = EncodedBody(b"{" + b",".join(parts) + b"}")
+    return _respond(request, body, {"Cache-Control": "no-cache"})
+
+@app.get("/api/db_pool_stats", summary="Get Database Pool Statistics")
+def get_db_pool_stats_api():
+    """
+    Returns connection pool usage for the sync pool (migrations) and the async
+    pool (request handlers): in-use, idle and waiting counts plus wait times.
+    """
+    return {"sync": get_pool_stats(), "async": get_async_pool_stats()}
+
+@app.get("/api/cache_stats", summary="Get Response Cache Statistics")
+def get_cache_stats_api():
+    """
+    Returns size, hit, miss, coalesced-miss and eviction counts of the
+    response cache with the data generations it last read, and the image
+    proxy's hit, miss, negative-hit and origin byte counts.
+    """
+    return {"responses": response_cache.stats(), "images": image_proxy.stats()}
+
+@app.get("/api/admission_stats", summary="Get Admission Control Statistics")
+def get_admission_stats_api():
+    """
+    Returns, per endpoint group (reads, writes, images), the concurrency limit,
+    running and queued requests, the deepest the queue has been, admitted and
+    queued counts, total time spent queued, and requests shed because the
+    queue was full or the wait ran past the deadline.
+    """
+    return {name: limiter.stats() for name, limiter in admission_limiters.items()}
+
+@app.get("/api/events", summary="Stream Scraper and Data Change Events")
+async def events_api(request: Request):
+    """
+    Server-Sent Events stream of ``scrape_started``, ``scrape_finished`` (with
+    products found and the new data generation) and ``owner_deals_changed``.
+    Reconnecting clients send ``Last-Event-ID`` to receive missed events.
+    """
+    return StreamingResponse(
+        event_hub.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 
-import httpx
-from fastapi.responses import StreamingResponse
 
 @app.get("/api/proxy-image")
-async def proxy_image(url: str):
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            return StreamingResponse(response.iter_bytes(), media_type=response.headers.get("content-type"))
-        except httpx.HTTPStatusError as e:
-            logging.error(f"Failed to fetch image from {url}: {e}")
-            return {"message": "Failed to fetch image"}, 400
+async def proxy_image(
+    request: Request,
+    url: str,
+    w: Optional[int] = Query(None, ge=1),
+    h: Optional[int] = Query(None, ge=1),
+    image_format: Optional[Literal["auto", "webp", "avif", "jpeg", "png"]] = Query(
+        None, alias="format"
+    ),
+):
+    """
+    Streams the image at ``url``, from the on-disk cache when it holds a
+    fresh copy. Failing URLs get 502 and are not retried for a while.
+    ``w``/``h`` shrink the image to fit within that box and ``format``
+    transcodes it; ``format=auto`` picks AVIF or WebP from the ``Accept``
+    header.
+    """
+    return await image_proxy.fetch(
+        url, w, h, image_format, accept=request.headers.get("accept")
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics of the API, followed by the scraper's last run."""
+    return Response(metrics_body(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/", include_in_schema=False)
 def root():
@@ -0,0 +1,327 @@
+"""Prometheus metrics of the API, the database layer and the scraper.
+
+Request latency (``MetricsMiddleware``) and database time per function
+(``timed_query``) are recorded as they happen. The counters components
+already keep -- connection pools, response cache, image proxy, admission
+control -- are read when ``/metrics`` is scraped, by an ``AppStatsCollector``.
+
+The scraper runs in its own process, so it records its runs in
+``SCRAPER_REGISTRY`` and writes that to ``SCRAPER_METRICS_FILE`` (or pushes
+it to a Pushgateway) after each run; ``metrics_body`` appends the file to
+the API's own metrics, so one scrape target covers both.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    push_to_gateway,
+    write_to_textfile,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Where the scraper writes its metrics, and the Pushgateway to push them to
+# instead, if set (host:port).
+SCRAPER_METRICS_FILE = os.environ.get(
+    "SCRAPER_METRICS_FILE", os.path.join("data", "scraper_metrics.prom")
+)
+SCRAPER_METRICS_PUSHGATEWAY = os.environ.get("SCRAPER_METRICS_PUSHGATEWAY")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "priceza_http_request_duration_seconds",
+    "Time to answer an HTTP request, by route template and status.",
+    ["method", "route", "status"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "priceza_db_query_duration_seconds",
+    "Time spent in a database function, including waiting for a connection.",
+    ["function"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERY_ERRORS = Counter(
+    "priceza_db_query_errors_total",
+    "Database function calls that raised.",
+    ["function"],
+)
+
+
+def timed_query(func):
+    """Record the duration of every call to *func*, sync or async."""
+    seconds = DB_QUERY_SECONDS.labels(func.__name__)
+    errors = DB_QUERY_ERRORS.labels(func.__name__)
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+
+        return timed_async
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - start)
+
+    return timed
+
+
+class MetricsMiddleware:
+    """Observe each HTTP request in ``HTTP_REQUEST_SECONDS``.
+
+    Requests are labelled with the matched route's path template, so
+    ``/api/deals/1`` and ``/api/deals/2`` share a series; requests that
+    matched no route (404s, or shed before routing) are ``"unmatched"``.
+    *exclude* lists paths not observed, such as long-lived streams.
+    """
+
+    def __init__(self, app, exclude=()):
+        self.app = app
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+
+
+def _pool_connections(name: str, stats: dict):
+    """Return ``(pool, in_use, idle, waiting, max)`` for either pool's stats."""
+    if "pool_size" in stats:  # psycopg_pool
+        idle = stats.get("pool_available", 0)
+        return name, stats["pool_size"] - idle, idle, stats.get("requests_waiting", 0), stats.get("pool_max", 0)
+    return name, stats["in_use"], stats["idle"], stats.get("waiting", 0), stats.get("max_size", 0)
+
+
+class AppStatsCollector:
+    """Export the ``stats()`` of the app's components at scrape time.
+
+    Each argument returns the corresponding ``stats()`` dict (or, for
+    *pools*, a ``{name: stats}`` mapping).
+    """
+
+    def __init__(
+        self,
+        pools: Callable[[], dict],
+        responses: Callable[[], dict],
+        images: Callable[[], dict],
+        admission: Callable[[], dict],
+        events: Callable[[], dict],
+    ):
+        self._pools = pools
+        self._responses = responses
+        self._images = images
+        self._admission = admission
+        self._events = events
+
+    def collect(self):
+        yield from self._collect_pools()
+        yield from self._collect_responses()
+        yield from self._collect_images()
+        yield from self._collect_admission()
+        events = self._events()
+        yield GaugeMetricFamily(
+            "priceza_event_subscribers", "Open /api/events streams.", value=events["subscribers"]
+        )
+        yield CounterMetricFamily(
+            "priceza_event_subscribers_dropped",
+            "Event subscribers disconnected for falling behind.",
+            value=events["dropped"],
+        )
+
+    def _collect_pools(self):
+        connections = GaugeMetricFamily(
+            "priceza_db_pool_connections",
+            "Database pool connections by state.",
+            labels=["pool", "state"],
+        )
+        max_size = GaugeMetricFamily(
+            "priceza_db_pool_max_connections", "Database pool size limit.", labels=["pool"]
+        )
+        for name, stats in self._pools().items():
+            if not stats or not ("pool_size" in stats or "in_use" in stats):
+                continue  # not opened yet
+            pool, in_use, idle, waiting, limit = _pool_connections(name, stats)
+            connections.add_metric([pool, "in_use"], in_use)
+            connections.add_metric([pool, "idle"], idle)
+            connections.add_metric([pool, "waiting"], waiting)
+            max_size.add_metric([pool], limit)
+        yield connections
+        yield max_size
+
+    def _collect_responses(self):
+        stats = self._responses()
+        lookups = CounterMetricFamily(
+            "priceza_response_cache_lookups",
+            "Response cache lookups by result.",
+            labels=["result"],
+        )
+        lookups.add_metric(["hit"], stats["hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        lookups.add_metric(["coalesced"], stats["coalesced"])
+        yield lookups
+        yield CounterMetricFamily(
+            "priceza_response_cache_evictions", "Response cache evictions.", value=stats["evictions"]
+        )
+        yield GaugeMetricFamily(
+            "priceza_response_cache_bytes", "Bytes held by the response cache.", value=stats["bytes"]
+        )
+        yield GaugeMetricFamily(
+            "priceza_response_cache_entries", "Entries in the response cache.", value=stats["entries"]
+        )
+
+    def _collect_images(self):
+        stats = self._images()
+        requests = CounterMetricFamily(
+            "priceza_image_proxy_requests",
+            "Image proxy requests by cache result.",
+            labels=["result"],
+        )
+        requests.add_metric(["hit"], stats["hits"])
+        requests.add_metric(["miss"], stats["misses"])
+        requests.add_metric(["negative_hit"], stats["negative_hits"])
+        yield requests
+        yield CounterMetricFamily(
+            "priceza_image_proxy_origin_bytes",
+            "Bytes fetched from image origins.",
+            value=stats["bytes_from_origin"],
+        )
+        yield CounterMetricFamily(
+            "priceza_image_proxy_upstream_errors",
+            "Failed image origin fetches.",
+            value=stats["upstream_errors"],
+        )
+        yield CounterMetricFamily(
+            "priceza_image_proxy_transformed", "Image variants produced.", value=stats["transformed"]
+        )
+        yield GaugeMetricFamily(
+            "priceza_image_cache_bytes", "Bytes held by the image disk cache.", value=stats["cache"]["bytes"]
+        )
+
+    def _collect_admission(self):
+        active = GaugeMetricFamily(
+            "priceza_admission_active", "Requests running, per endpoint group.", labels=["group"]
+        )
+        waiting = GaugeMetricFamily(
+            "priceza_admission_waiting", "Requests queued, per endpoint group.", labels=["group"]
+        )
+        admitted = CounterMetricFamily(
+            "priceza_admission_admitted", "Requests admitted, per endpoint group.", labels=["group"]
+        )
+        shed = CounterMetricFamily(
+            "priceza_admission_shed",
+            "Requests rejected with 503, per endpoint group and reason.",
+            labels=["group", "reason"],
+        )
+        wait_seconds = CounterMetricFamily(
+            "priceza_admission_wait_seconds",
+            "Time requests spent queued, per endpoint group.",
+            labels=["group"],
+        )
+        for group, stats in self._admission().items():
+            active.add_metric([group], stats["active"])
+            waiting.add_metric([group], stats["waiting"])
+            admitted.add_metric([group], stats["admitted"])
+            wait_seconds.add_metric([group], stats["wait_seconds"])
+            for reason, count in stats["shed"].items():
+                shed.add_metric([group, reason], count)
+        yield from (active, waiting, admitted, shed, wait_seconds)
+
+
+def metrics_body(scraper_metrics_file: Optional[str] = SCRAPER_METRICS_FILE) -> bytes:
+    """The API's metrics in text format, followed by the scraper's, if written."""
+    body = generate_latest(REGISTRY)
+    if scraper_metrics_file:
+        try:
+            with open(scraper_metrics_file, "rb") as f:
+                body += f.read()
+        except FileNotFoundError:
+            pass
+    return body
+
+
+# --- Scraper process ---
+SCRAPER_REGISTRY = CollectorRegistry()
+SCRAPE_DURATION_SECONDS = Gauge(
+    "priceza_scrape_duration_seconds",
+    "Duration of the last scrape run.",
+    registry=SCRAPER_REGISTRY,
+)
+SCRAPE_PRODUCTS_FOUND = Gauge(
+    "priceza_scrape_products_found",
+    "Deals published by the last scrape run; 0 if it committed nothing.",
+    registry=SCRAPER_REGISTRY,
+)
+SCRAPE_LAST_SUCCESS = Gauge(
+    "priceza_scrape_last_success_timestamp_seconds",
+    "Unix time the last successful scrape run finished.",
+    registry=SCRAPER_REGISTRY,
+)
+SCRAPE_RUNS = Counter(
+    "priceza_scrape_runs_total",
+    "Scrape runs by result: success, rejected (previous deals kept) or failure.",
+    ["result"],
+    registry=SCRAPER_REGISTRY,
+)
+
+
+def record_scrape(duration: float, products_found: int, succeeded: bool, rejected: bool = False):
+    """Record one scrape run and publish the scraper's metrics.
+
+    *succeeded* means the run's deals were committed and *products_found* is
+    how many were published; *rejected* marks a run whose snapshot was
+    refused by ``insert_deals``.
+    """
+    SCRAPE_DURATION_SECONDS.set(duration)
+    SCRAPE_PRODUCTS_FOUND.set(products_found)
+    SCRAPE_RUNS.labels("success" if succeeded else "rejected" if rejected else "failure").inc()
+    if succeeded:
+        SCRAPE_LAST_SUCCESS.set_to_current_time()
+    try:
+        if SCRAPER_METRICS_PUSHGATEWAY:
+            push_to_gateway(SCRAPER_METRICS_PUSHGATEWAY, job="priceza_scraper", registry=SCRAPER_REGISTRY)
+        else:
+            os.makedirs(os.path.dirname(SCRAPER_METRICS_FILE) or ".", exist_ok=True)
+            write_to_textfile(SCRAPER_METRICS_FILE, SCRAPER_REGISTRY)
+    except Exception as e:
+        logging.error(f"Failed to publish scraper metrics: {e}")
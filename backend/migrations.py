@@ -0,0 +1,337 @@
+"""Versioned schema migrations.
+
+Each migration is applied once, in order, and recorded in
+``schema_migrations``. Steps use ``IF NOT EXISTS`` so databases created by
+the old ``create_tables()`` adopt the versioned schema without errors.
+Append new migrations to ``MIGRATIONS``; never edit one that has shipped.
+"""
+
+import logging
+
+try:
+    from .search import build_search_vector
+    from .utils.parsing import (
+        parse_discount,
+        parse_price,
+        parse_rating,
+        parse_reviews_count,
+    )
+except ImportError:  # pragma: no cover
+    from search import build_search_vector
+    from utils.parsing import (
+        parse_discount,
+        parse_price,
+        parse_rating,
+        parse_reviews_count,
+    )
+
+# Key for ``pg_advisory_xact_lock`` so concurrent processes migrate one at a time.
+_MIGRATION_LOCK_ID = 7_240_031
+
+
+def _create_deal_tables(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS merchants (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+        """
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS merchant_name_unique_idx ON merchants (LOWER(name));"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS deals (
+            id SERIAL PRIMARY KEY,
+            title TEXT,
+            price TEXT,
+            original_price TEXT,
+            discount TEXT,
+            image_url TEXT,
+            product_url TEXT,
+            merchant_id INTEGER,
+            merchant_image TEXT,
+            rating TEXT,
+            reviews_count TEXT,
+            scraped_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok'),
+            updated_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok')
+        );
+        """
+    )
+
+
+def _create_owner_tables(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS owner_merchants (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+        """
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS owner_merchant_name_unique_idx ON owner_merchants (LOWER(name));"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS owner_deals (
+            id SERIAL PRIMARY KEY,
+            title TEXT,
+            price TEXT,
+            original_price TEXT,
+            discount TEXT,
+            image_url TEXT,
+            product_url TEXT,
+            merchant_id INTEGER,
+            merchant_image TEXT,
+            rating TEXT,
+            reviews_count TEXT,
+            created_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok'),
+            updated_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok')
+        );
+        """
+    )
+
+
+def _index_deal_product_url(cur):
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS deals_product_url_idx ON deals (product_url);"
+    )
+
+
+def _add_search_vector(cur):
+    # Title search lexemes are built by ``search.build_search_vector``.
+    cur.execute("ALTER TABLE deals ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS deals_search_vector_idx ON deals USING GIN (search_vector);"
+    )
+
+
+def _create_data_generation(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_generation (
+            name TEXT PRIMARY KEY,
+            generation BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Asia/Bangkok')
+        );
+        """
+    )
+
+
+def _add_numeric_deal_columns(cur):
+    # Numeric copies of the scraped text fields, parsed at ingest.
+    cur.execute(
+        """
+        ALTER TABLE deals
+            ADD COLUMN IF NOT EXISTS price_value NUMERIC(12, 2),
+            ADD COLUMN IF NOT EXISTS original_price_value NUMERIC(12, 2),
+            ADD COLUMN IF NOT EXISTS discount_value NUMERIC(5, 2),
+            ADD COLUMN IF NOT EXISTS rating_value NUMERIC(3, 2),
+            ADD COLUMN IF NOT EXISTS reviews_value INTEGER;
+        """
+    )
+    for column in ("price_value", "discount_value", "rating_value", "reviews_value"):
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS deals_{column}_idx ON deals ({column}, id);"
+        )
+
+
+def _create_price_history(cur):
+    # Price observations, one row per deal per scrape, partitioned by month.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS deal_price_history (
+            product_url TEXT NOT NULL,
+            price_value NUMERIC(12, 2),
+            original_price_value NUMERIC(12, 2),
+            discount_value NUMERIC(5, 2),
+            recorded_at TIMESTAMPTZ NOT NULL
+        ) PARTITION BY RANGE (recorded_at);
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS deal_price_history_recorded_at_idx "
+        "ON deal_price_history USING BRIN (recorded_at);"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS deal_price_history_product_idx "
+        "ON deal_price_history (product_url, recorded_at);"
+    )
+
+
+def _add_owner_deal_feed_columns(cur):
+    # Owner deals get the search and numeric columns of ``deals`` so the
+    # merged feed can filter and sort both; listing-time indexes serve its
+    # default newest-first order.
+    cur.execute(
+        """
+        ALTER TABLE owner_deals
+            ADD COLUMN IF NOT EXISTS search_vector TSVECTOR,
+            ADD COLUMN IF NOT EXISTS price_value NUMERIC(12, 2),
+            ADD COLUMN IF NOT EXISTS original_price_value NUMERIC(12, 2),
+            ADD COLUMN IF NOT EXISTS discount_value NUMERIC(5, 2),
+            ADD COLUMN IF NOT EXISTS rating_value NUMERIC(3, 2),
+            ADD COLUMN IF NOT EXISTS reviews_value INTEGER;
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS owner_deals_search_vector_idx "
+        "ON owner_deals USING GIN (search_vector);"
+    )
+    for column in ("price_value", "discount_value", "rating_value", "reviews_value"):
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS owner_deals_{column}_idx ON owner_deals ({column}, id);"
+        )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS owner_deals_created_at_idx ON owner_deals (created_at, id);"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS deals_scraped_at_idx ON deals (scraped_at, id);")
+
+    # Owner deals are few and hand-made, so backfill them row by row.
+    cur.execute(
+        "SELECT id, title, price, original_price, discount, rating, reviews_count "
+        "FROM owner_deals;"
+    )
+    for deal_id, title, price, original_price, discount, rating, reviews in cur.fetchall():
+        cur.execute(
+            """
+            UPDATE owner_deals
+            SET search_vector = %s::tsvector, price_value = %s, original_price_value = %s,
+                discount_value = %s, rating_value = %s, reviews_value = %s
+            WHERE id = %s;
+            """,
+            (
+                build_search_vector(title),
+                parse_price(price),
+                parse_price(original_price),
+                parse_discount(discount),
+                parse_rating(rating),
+                parse_reviews_count(reviews),
+                deal_id,
+            ),
+        )
+
+
+
+# Rows rewritten per statement when a migration backfills an existing table.
+_BACKFILL_BATCH = 1000
+
+
+def _backfill_derived_columns(cur, table):
+    # Recompute the columns ingest derives from the scraped text, walking the
+    # table by id so each UPDATE touches one bounded batch.
+    last_id = 0
+    while True:
+        cur.execute(
+            f"SELECT id, title, price, original_price, discount, rating, reviews_count "
+            f"FROM {table} WHERE id > %s ORDER BY id LIMIT %s;",
+            (last_id, _BACKFILL_BATCH),
+        )
+        rows = list(cur.fetchall())
+        if not rows:
+            return
+        columns = list(
+            zip(
+                *(
+                    (
+                        deal_id,
+                        build_search_vector(title),
+                        parse_price(price),
+                        parse_price(original_price),
+                        parse_discount(discount),
+                        parse_rating(rating),
+                        parse_reviews_count(reviews),
+                    )
+                    for deal_id, title, price, original_price, discount, rating, reviews in rows
+                )
+            )
+        )
+        cur.execute(
+            f"""
+            UPDATE {table} AS d
+            SET search_vector = v.search_vector::tsvector, price_value = v.price_value,
+                original_price_value = v.original_price_value, discount_value = v.discount_value,
+                rating_value = v.rating_value, reviews_value = v.reviews_value
+            FROM unnest(
+                %s::integer[], %s::text[], %s::numeric[], %s::numeric[],
+                %s::numeric[], %s::numeric[], %s::integer[]
+            ) AS v(id, search_vector, price_value, original_price_value,
+                   discount_value, rating_value, reviews_value)
+            WHERE d.id = v.id;
+            """,
+            [list(column) for column in columns],
+        )
+        if len(rows) < _BACKFILL_BATCH:
+            return
+        last_id = rows[-1][0]
+
+
+def _rebuild_search_and_numeric_columns(cur):
+    # Migrations 4 and 6 added these columns to ``deals`` without filling
+    # rows that already existed, and the search lexemes now include Latin
+    # n-grams, so recompute both tables.
+    for table in ("deals", "owner_deals"):
+        _backfill_derived_columns(cur, table)
+
+def _fix_data_generation_timestamps(cur):
+    # Migration 5 defaulted ``updated_at`` to Bangkok wall-clock time read
+    # back in the session time zone, hours off the real instant. Store
+    # ``now()`` and restamp existing rows, whose offset cannot be recovered.
+    cur.execute("ALTER TABLE data_generation ALTER COLUMN updated_at SET DEFAULT now();")
+    cur.execute("UPDATE data_generation SET updated_at = now();")
+
+
+# (version, description, step) in the order they must be applied.
+MIGRATIONS = [
+    (1, "Create merchants and deals tables", _create_deal_tables),
+    (2, "Create owner merchants and owner deals tables", _create_owner_tables),
+    (3, "Index deals by product_url for delta sync", _index_deal_product_url),
+    (4, "Add indexed title search vector to deals", _add_search_vector),
+    (5, "Add data generation counters", _create_data_generation),
+    (6, "Add numeric price, discount, rating and review columns", _add_numeric_deal_columns),
+    (7, "Add monthly partitioned deal price history", _create_price_history),
+    (8, "Add search and numeric columns to owner deals for the merged feed", _add_owner_deal_feed_columns),
+    (9, "Backfill search vectors with Latin n-grams and numeric deal columns", _rebuild_search_and_numeric_columns),
+    (10, "Store data generation timestamps as the current instant", _fix_data_generation_timestamps),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def apply_migrations(cur) -> int:
+    """Apply pending migrations on *cur* and return the resulting version.
+
+    Runs inside the caller's transaction, serialized across processes with
+    an advisory lock, so a failed step leaves the schema version unchanged.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (_MIGRATION_LOCK_ID,))
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+    current = cur.fetchone()[0]
+    if current > SCHEMA_VERSION:
+        logging.warning(
+            f"Database schema version {current} is newer than this code ({SCHEMA_VERSION})"
+        )
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        logging.info(f"Applying schema migration {version}: {description}")
+        step(cur)
+        cur.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+            (version, description),
+        )
+        current = version
+    return current
@@ -0,0 +1,156 @@
+"""In-process cache of read endpoint results, invalidated by data generation.
+
+Every entry belongs to a data source (``"deals"`` or ``"owner_deals"``) and
+is stored under the data generation its loader read in the same transaction
+as the data, so an entry is never labelled newer than what it holds. Once
+the source's current generation moves on (see ``database._bump_generation``)
+the entry is a miss. Current generations are read from the database at most
+once per *generation_ttl* seconds, so a scrape committed by another process
+shows up within that delay; writes made through this process call
+``expire_generations`` to be seen at once.
+
+Concurrent misses for the same key share a single load (single-flight), and
+the cache is bounded both in entries and in approximate bytes (LRU). A
+value's size is measured again on every hit, as it may grow after it is
+stored (compressed variants of an ``EncodedBody`` are made on first use).
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        load_generations: Callable[[], Awaitable[Dict[str, object]]],
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        generation_ttl: float = 1.0,
+        sizeof: Callable[[object], int] = _json_size,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation_ttl = generation_ttl
+        self._load_generations = load_generations
+        self._sizeof = sizeof
+
+        self._entries = OrderedDict()  # key -> (generation, value, size)
+        self._bytes = 0
+        self._in_flight = {}  # (key, generation) -> asyncio.Task
+        self._generations = None
+        self._generations_at = 0.0
+        self._generations_task = None
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    async def generations(self) -> Dict[str, object]:
+        """Return the data generations, re-read once they are *generation_ttl* old."""
+        if (
+            self._generations is not None
+            and time.monotonic() - self._generations_at < self.generation_ttl
+        ):
+            return self._generations
+        # Single-flight the generation read as well.
+        if self._generations_task is None:
+            self._generations_task = asyncio.ensure_future(self._refresh_generations())
+        return await asyncio.shield(self._generations_task)
+
+    async def _refresh_generations(self):
+        try:
+            generations = await self._load_generations()
+            self._generations = generations
+            self._generations_at = time.monotonic()
+            return generations
+        finally:
+            self._generations_task = None
+
+    def expire_generations(self):
+        """Re-read the generations on the next lookup, e.g. after a local write."""
+        self._generations = None
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[tuple]], source: str = "deals"):
+        """Return ``(generation, value)`` for *key*, calling *load* on a miss.
+
+        *load* returns ``(generation, value)``, with *source*'s data
+        generation read in the same snapshot as *value*; the entry is stored
+        under that generation. Generation values are only compared for
+        equality. Exceptions from *load* propagate to every waiter and are
+        not cached.
+        """
+        generation = (await self.generations()).get(source)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generation:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            self._resize(key, entry)
+            return entry[0], entry[1]
+
+        flight = (key, generation)
+        task = self._in_flight.get(flight)
+        if task is None:
+            self._misses += 1
+            task = asyncio.ensure_future(self._load(key, generation, load))
+            self._in_flight[flight] = task
+        else:
+            self._coalesced += 1
+        # Shielded so a client that disconnects does not cancel the load
+        # other requests are waiting on.
+        return await asyncio.shield(task)
+
+    async def _load(self, key, generation, load):
+        try:
+            loaded = await load()
+            self._store(key, *loaded)
+            return loaded
+        finally:
+            self._in_flight.pop((key, generation), None)
+
+    def _store(self, key, generation, value):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[2]
+        self._entries[key] = (generation, value, size)
+        self._bytes += size
+        self._evict()
+
+    def _resize(self, key, entry):
+        size = self._sizeof(entry[1])
+        if size != entry[2]:
+            self._entries[key] = (entry[0], entry[1], size)
+            self._bytes += size - entry[2]
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "evictions": self._evictions,
+            "generations": dict(self._generations or {}),
+        }
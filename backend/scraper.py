@@ -227,35 +227,34 @@ class PriceZAScraper:
         return self.hot_deals
 
     def save_to_json(self, filename=None):
-        """ส่วนนี้เหมือนเดิม"""
+        """บันทึกผลลงไฟล์ JSON แล้วเพิ่มข้อมูลลงในฐานข้อมูล
+
+        คืนค่าจำนวนแถวจาก ``insert_deals`` เมื่อบันทึกลงฐานข้อมูลสำเร็จ หรือ ``None``
+        ถ้าเขียนไฟล์ไม่สำเร็จ ข้อผิดพลาดจากฐานข้อมูล (รวมถึง ``SnapshotRejected``)
+        ส่งต่อให้ผู้เรียก เพื่อให้รู้ว่ารอบนี้ไม่ได้เผยแพร่ข้อมูลใหม่
+        """
         if not filename:
             timestamp = datetime.now(ZoneInfo("Asia/Bangkok")).strftime("%Y%m%d_%H%M%S")
             filename = f"priceza_hot_deals_{timestamp}.json"
-        
+
+        deals_data = {
+            'timestamp': datetime.now(ZoneInfo("Asia/Bangkok")).isoformat(),
+            'total_products': len(self.hot_deals),
+            'products': self.hot_deals
+        }
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'timestamp': datetime.now(ZoneInfo("Asia/Bangkok")).isoformat(),
-                    'total_products': len(self.hot_deals),
-                    'products': self.hot_deals
-                }, f, ensure_ascii=False, indent=2)
+                json.dump(deals_data, f, ensure_ascii=False, indent=2)
             logging.info(f"บันทึกข้อมูล JSON สำเร็จ: {filename}")
-            try:
-                logging.info("กำลังเพิ่มข้อมูลลงในฐานข้อมูล...")
-                deals_data = {
-                    'timestamp': datetime.now(ZoneInfo("Asia/Bangkok")).isoformat(),
-                    'total_products': len(self.hot_deals),
-                    'products': self.hot_deals
-                }
-                insert_deals(deals_data)
-                logging.info("เพิ่มข้อมูลลงในฐานข้อมูลสำเร็จ")
-            except Exception as e:
-                logging.error(f"ไม่สามารถเพิ่มข้อมูลลงในฐานข้อมูล: {e}")
-            return filename
         except Exception as e:
             logging.error(f"ไม่สามารถบันทึกไฟล์ JSON: {e}")
             return None
 
+        logging.info("กำลังเพิ่มข้อมูลลงในฐานข้อมูล...")
+        counts = insert_deals(deals_data, sync=True)
+        logging.info(f"เพิ่มข้อมูลลงในฐานข้อมูลสำเร็จ: {counts}")
+        return counts
+
     def save_to_csv(self, filename=None):
         """ส่วนนี้เหมือนเดิม"""
         if not filename:
@@ -1,13 +1,17 @@
 import logging
 import os
 import json
+import time
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from typing import List, Optional
 from copy import deepcopy
 
 from config import DEFAULT_SCRAPER_CONFIG
+from database import SnapshotRejected, migrate
 from utils.logging import setup_logging
+from utils.json_file import write_json_atomic
+from metrics import record_scrape
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -35,8 +39,7 @@ def load_scraper_config():
             f"Scraper config file not found: {SCRAPER_CONFIG_FILE}. Using default values."
         )
         try:
-            with open(SCRAPER_CONFIG_FILE, "w", encoding="utf-8") as f:
-                json.dump(DEFAULT_SCRAPER_CONFIG, f, ensure_ascii=False, indent=2)
+            write_json_atomic(SCRAPER_CONFIG_FILE, DEFAULT_SCRAPER_CONFIG, ensure_ascii=False, indent=2)
         except Exception as e:
             logging.error(f"Failed to initialize {SCRAPER_CONFIG_FILE}: {e}")
         return deepcopy(DEFAULT_SCRAPER_CONFIG)
@@ -49,19 +52,26 @@ def load_scraper_config():
         )
         return deepcopy(DEFAULT_SCRAPER_CONFIG)
 
-def update_scraper_status(is_scraping: bool):
+def update_scraper_status(is_scraping: bool, **run):
     """
     Updates the scraper status in a JSON file.
+    Keyword arguments describe the current or last run (``started_at``,
+    ``finished_at``, ``succeeded``, ``products_found``, ``error``); the API
+    turns changes to them into /api/events notifications.
     """
     os.makedirs(DATA_DIR, exist_ok=True)
-    status = {"is_scraping": is_scraping}
+    status = {"is_scraping": is_scraping, **run}
     try:
-        with open(SCRAPER_STATUS_FILE, "w", encoding="utf-8") as f:
-            json.dump(status, f)
+        # Atomic, so the API never reads a half-written status.
+        write_json_atomic(SCRAPER_STATUS_FILE, status)
         logging.info(f"Scraper status updated to: {is_scraping}")
     except Exception as e:
         logging.error(f"Failed to update scraper status file: {e}")
 
+def _published_count(counts: dict) -> int:
+    """Deals live after an ingest, from ``insert_deals``'s counts."""
+    return counts["inserted"] + counts["updated"] + counts["unchanged"] + counts["unkeyed"]
+
 # --- Scraper Logic ---
 def scrape_and_save(allowed_merchants: Optional[List[str]] = None):
     """
@@ -69,7 +79,9 @@ def scrape_and_save(allowed_merchants: Optional[List[str]] = None):
     This function is designed to be called by the scheduler.
     It uses a try/finally block to ensure the Selenium driver is closed.
     """
-    update_scraper_status(True) # Set status to true at the beginning of scrape
+    started_at = datetime.now(ZoneInfo("Asia/Bangkok")).isoformat()
+    started = time.monotonic()
+    update_scraper_status(True, started_at=started_at) # Set status to true at the beginning of scrape
     logging.info(
         f"Starting scheduled scrape. Allowed merchants: {allowed_merchants or 'All'}"
     )
@@ -100,23 +112,48 @@ def scrape_and_save(allowed_merchants: Optional[List[str]] = None):
 
     config = load_scraper_config() # Load config here
     scraper = PriceZAScraper(config=config, allowed_merchants=allowed_merchants)
+    # A run succeeds only once its deals are committed to the database.
+    succeeded = False
+    products_found = 0
+    rejected = False
+    error = None
     try:
         # Scrape deals
         hot_deals = scraper.scrape_hot_deals()
 
-        # Save the results to the fixed file
+        # Save the results to the fixed file and the database
         if hot_deals:
-            scraper.save_to_json(LATEST_DEALS_FILE)
-            logging.info(f"Scrape successful. {len(hot_deals)} deals saved.")
+            counts = scraper.save_to_json(LATEST_DEALS_FILE)
+            if counts is None:
+                error = "Could not write the scraped deals"
+            else:
+                succeeded = True
+                products_found = _published_count(counts)
+                logging.info(f"Scrape successful. {products_found} deals published.")
         else:
+            error = "No deals were found"
             logging.warning("Scrape completed, but no deals were found.")
 
+    except SnapshotRejected as e:
+        rejected = True
+        error = str(e)
+        logging.warning(f"Scrape kept the previously published deals: {e}")
     except Exception as e:
+        error = str(e)
         logging.error(f"An error occurred during the scrape_and_save job: {e}")
     finally:
         # Ensure the driver is always closed to prevent resource leaks
         scraper.close_driver()
-        update_scraper_status(False) # Reset status to false after scrape
+        # Reset status to false after scrape
+        update_scraper_status(
+            False,
+            started_at=started_at,
+            finished_at=datetime.now(ZoneInfo("Asia/Bangkok")).isoformat(),
+            succeeded=succeeded,
+            products_found=products_found,
+            error=error,
+        )
+        record_scrape(time.monotonic() - started, products_found, succeeded, rejected)
 
 # --- Scheduler Setup ---
 scheduler = BackgroundScheduler(daemon=True)
@@ -125,6 +162,7 @@ scheduler.add_job(scrape_and_save, "interval", minutes=SCHEDULE_MINUTES)
 if __name__ == "__main__":
     logging.info("Starting PriceZA Scraper Runner...")
     update_scraper_status(False) # Initialize status to false on startup
+    migrate() # Apply pending schema migrations once, before any ingestion
     # Run an initial scrape immediately so we have data
     logging.info("Performing initial data scrape...")
     scrape_and_save()
@@ -137,7 +175,6 @@ if __name__ == "__main__":
     try:
         # Keep the main thread alive
         while True:
-            import time
             time.sleep(2)
     except (KeyboardInterrupt, SystemExit):
         logging.info("Scraper Runner shutting down.")
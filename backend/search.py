@@ -0,0 +1,114 @@
+"""Thai-aware tokenization for indexed deal title search.
+
+Titles are indexed as a ``tsvector`` that is built here instead of by
+PostgreSQL's text parser, which splits Thai words at vowel and tone marks.
+Each title contributes two kinds of lexemes:
+
+* words (weight A): Latin/digit words and Thai words segmented with
+  PyThaiNLP when it is installed (whole Thai runs otherwise);
+* character bigrams of every run, Thai or Latin/digit (weight B), at
+  consecutive positions.
+
+A query run becomes a phrase of its bigrams (``'ab' <-> 'bc'``), which
+matches exactly the titles containing it as a substring, regardless of how
+either side was segmented -- so "phone" and "15" both find "iPhone15", as
+the old ``ILIKE`` search did. Segmented words only contribute to ranking.
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+try:
+    from pythainlp.tokenize import word_tokenize
+except ImportError:  # pragma: no cover - optional dependency
+    word_tokenize = None
+
+# tsvector positions are capped at 16383.
+_MAX_POSITION = 16383
+
+_TOKEN_RE = re.compile(r"[\u0E00-\u0E7F]+|[^\W_\u0E00-\u0E7F]+")
+_THAI_RE = re.compile(r"[\u0E00-\u0E7F]+")
+
+
+class SearchQuery(NamedTuple):
+    """``tsquery`` texts for filtering (``match``) and ordering (``rank``)."""
+
+    match: str
+    rank: str
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _is_thai(token: str) -> bool:
+    return bool(_THAI_RE.fullmatch(token))
+
+
+def _bigrams(run: str) -> List[str]:
+    if len(run) < 2:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _segment_thai(run: str) -> List[str]:
+    if word_tokenize is None:
+        return [run]
+    words = word_tokenize(run, engine="newmm", keep_whitespace=False)
+    return [word for word in words if word.strip()]
+
+
+def segment_words(text: str) -> List[str]:
+    """Split *text* into lowercase words, segmenting Thai runs into words."""
+    words = []
+    for token in _tokens(text):
+        words.extend(_segment_thai(token) if _is_thai(token) else [token])
+    return words
+
+
+def _quote(lexeme: str) -> str:
+    return "'" + lexeme.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def build_search_vector(title: Optional[str]) -> Optional[str]:
+    """Return the ``tsvector`` literal indexed for *title*, or ``None``."""
+    tokens = _tokens(title)
+    if not tokens:
+        return None
+
+    entries = []
+    position = 1
+    for word in segment_words(title):
+        entries.append(f"{_quote(word)}:{min(position, _MAX_POSITION)}A")
+        position += 1
+    for token in tokens:
+        position += 1  # keep bigrams of separate runs from forming a phrase
+        for gram in _bigrams(token):
+            entries.append(f"{_quote(gram)}:{min(position, _MAX_POSITION)}B")
+            position += 1
+    return " ".join(entries)
+
+
+def build_search_query(text: Optional[str]) -> Optional[SearchQuery]:
+    """Translate user search *text* into ``tsquery`` literals.
+
+    Every token matches as a substring; a single character matches as the
+    start of a bigram. Returns ``None`` when *text* has nothing searchable.
+    """
+    tokens = _tokens(text)
+    if not tokens:
+        return None
+
+    clauses = []
+    for token in tokens:
+        if len(token) == 1:
+            clauses.append(f"{_quote(token)}:*")
+        else:
+            clauses.append("(" + " <-> ".join(_quote(g) for g in _bigrams(token)) + ")")
+    match = " & ".join(clauses)
+
+    words = [word for word in segment_words(text) if _is_thai(word)]
+    rank = match
+    if words:
+        rank = f"({match}) | " + " | ".join(_quote(word) for word in words)
+    return SearchQuery(match=match, rank=rank)
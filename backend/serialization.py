@@ -0,0 +1,150 @@
+"""Fast JSON encoding and negotiated compression of list responses.
+
+List endpoints encode their result once with ``orjson`` (``json`` if it is
+missing) into an ``EncodedBody``, which also keeps the gzip and brotli
+variants it has produced, so a cached body is never compressed twice.
+Brotli needs the ``brotli`` package.
+"""
+
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    """Encode *value* as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class EncodedBody:
+    """A JSON body and its compressed variants, produced on first use."""
+
+    __slots__ = ("raw", "_variants")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._variants = {}
+
+    def __len__(self):
+        return len(self.raw)
+
+    @property
+    def size(self) -> int:
+        """Bytes held: the raw body plus every compressed variant made so far."""
+        return len(self.raw) + sum(len(variant) for variant in self._variants.values())
+
+    def encoded(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            if encoding == "br":
+                variant = brotli.compress(self.raw, quality=BROTLI_QUALITY)
+            else:
+                variant = gzip.compress(self.raw, compresslevel=GZIP_LEVEL, mtime=0)
+            self._variants[encoding] = variant
+        return variant
+
+
+def encode(value) -> EncodedBody:
+    return EncodedBody(dumps(value))
+
+
+def _accepted(accept_encoding: str) -> dict:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int, min_size: int) -> Optional[str]:
+    """Return ``"br"``, ``"gzip"`` or ``None`` for a body of *size* bytes.
+
+    Bodies under *min_size* are sent as is: compressing them saves less than
+    it costs.
+    """
+    if not accept_encoding or size < min_size:
+        return None
+    accepted = _accepted(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def json_response(
+    body: EncodedBody,
+    accept_encoding: Optional[str],
+    min_size: int,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Build the response for *body*, compressed if the client accepts it.
+
+    A strong ``ETag`` in *headers* gets the encoding appended (``"...-gzip"``),
+    as each encoding is a different representation.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(accept_encoding, len(body), min_size)
+    content = body.raw
+    if encoding is not None:
+        content = body.encoded(encoding)
+        headers["Content-Encoding"] = encoding
+        etag = headers.get("ETag")
+        if etag:
+            headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def strip_encoding(etag: str) -> str:
+    """Undo the encoding suffix ``json_response`` adds to an ETag."""
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
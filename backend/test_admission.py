@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.admission import AdmissionLimiter, Overloaded
+
+
+def test_full_queue_is_shed_and_slots_pass_in_order():
+    limiter = AdmissionLimiter(limit=1, queue_size=1, queue_timeout=1)
+
+    async def run():
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release()
+        await queued
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["active"] == 1
+    assert stats["waiting"] == 0
+    assert stats["admitted"] == 2
+    assert stats["shed"] == {"queue_full": 1, "timeout": 0}
+
+
+def test_wait_past_deadline_is_shed():
+    limiter = AdmissionLimiter(limit=1, queue_size=5, queue_timeout=0.01)
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["active"] == 0
+    assert stats["waiting"] == 0
+    assert stats["shed"] == {"queue_full": 0, "timeout": 1}
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    limiter = AdmissionLimiter(limit=1, queue_size=5, queue_timeout=1)
+
+    async def run():
+        await limiter.acquire()
+        gone = asyncio.ensure_future(limiter.acquire())
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.sleep(0)
+        limiter.release()
+        await waiting
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["active"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_overloaded_group_answers_503_with_retry_after(monkeypatch):
+    monkeypatch.setitem(main.admission_limiters, "reads", AdmissionLimiter(0, 0, 0))
+    client = TestClient(main.app)
+
+    shed = client.get("/api/merchants")
+    stats = client.get("/api/admission_stats")
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == str(main.ADMISSION_RETRY_AFTER)
+    assert stats.status_code == 200
+    assert stats.json()["reads"]["shed"]["queue_full"] == 1
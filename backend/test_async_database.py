@@ -0,0 +1,156 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.async_database as adb
+import backend.database as db
+from backend import main
+
+
+def make_pool(fetchone=(), fetchall=()):
+    cur = MagicMock()
+    cur.execute = AsyncMock()
+    cur.fetchone = AsyncMock(side_effect=list(fetchone))
+    cur.fetchall = AsyncMock(side_effect=list(fetchall))
+    conn = MagicMock()
+    conn.cursor.return_value.__aenter__.return_value = cur
+    pool = MagicMock()
+    pool.getconn = AsyncMock(return_value=conn)
+    pool.putconn = AsyncMock()
+    return pool, cur
+
+
+@pytest.fixture
+def async_pool(monkeypatch):
+    def install(**results):
+        pool, cur = make_pool(**results)
+        monkeypatch.setattr(adb, "get_pool", AsyncMock(return_value=pool))
+        return cur
+
+    monkeypatch.setattr(db, "_count_cache", db.OrderedDict())
+    monkeypatch.setattr(db, "_count_cache_generation", None)
+    return install
+
+
+def test_async_get_deals_matches_sync_queries(async_pool):
+    row = (1, "Phone", "100", "", "", "", "", None, "", "", "", None, None, "Shop")
+    cur = async_pool(fetchone=[(3,), (1,)], fetchall=[[row, row]])
+
+    result = asyncio.run(adb.get_deals_from_db(page_size=1, merchant="Shop"))
+
+    plan = db._plan_deals_page(page_size=1, merchant="Shop")
+    executed = [call.args for call in cur.execute.await_args_list]
+    assert executed[1] == (plan.count_query, plan.count_params)
+    assert executed[2] == (plan.select_query, plan.select_params)
+    assert result["total_products"] == 1
+    assert result["products"][0]["merchant"] == "Shop"
+    assert db._decode_cursor(result["next_cursor"]) == {"id": 1}
+
+
+def test_async_get_deals_rejects_bad_cursor_before_connecting(async_pool):
+    async_pool()
+    with pytest.raises(ValueError):
+        asyncio.run(adb.get_deals_from_db(cursor="not-a-cursor"))
+    adb.get_pool.assert_not_awaited()
+
+
+def test_async_reads_report_generation_from_their_own_snapshot(async_pool):
+    cur = async_pool(fetchone=[(9, None)], fetchall=[[("Shop",)]])
+    generations = {}
+
+    assert asyncio.run(adb.get_all_merchants(generations=generations)) == ["Shop"]
+
+    statements = [call.args[0] for call in cur.execute.await_args_list]
+    assert statements[0] == "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;"
+    assert "data_generation" in statements[1]
+    assert generations == {"deals": db.DataGeneration(9, None)}
+
+def test_async_update_deal_bumps_generation(async_pool):
+    cur = async_pool()
+
+    asyncio.run(adb.update_deal(7, {"price": "฿1,299"}))
+
+    update_args = cur.execute.await_args_list[0].args
+    assert update_args[1][-1] == 7
+    assert "data_generation" in cur.execute.await_args_list[1].args[0]
+
+
+def test_async_price_history_returns_none_for_missing_deal(async_pool):
+    async_pool(fetchone=[None])
+    assert asyncio.run(adb.get_deal_price_history(99)) is None
+
+
+def test_async_owner_reads_use_primary_after_owner_write(async_pool, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_READ_URLS", ["postgres://replica"])
+    monkeypatch.setattr(db, "_read_router", None)
+    row = (1, "Mine", "10", "", "", "", "", None, "", "", "", None, None, "")
+    async_pool(fetchone=[(5,), (1,), (1,)], fetchall=[[row], [row]])
+
+    asyncio.run(adb.get_owner_deals())
+    asyncio.run(adb.insert_owner_deal({"title": "Mine", "price": "10"}))
+    asyncio.run(adb.get_owner_deals())
+
+    dsns = [call.args[0] if call.args else None for call in adb.get_pool.await_args_list]
+    assert dsns == ["postgres://replica", None, None]
+
+
+def test_async_down_replica_waits_briefly_then_is_skipped(monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_READ_URLS", ["postgres://replica"])
+    monkeypatch.setattr(db, "_read_router", None)
+    primary, _ = make_pool(fetchall=[[("Shop",)], [("Shop",)]])
+    replica = MagicMock()
+    replica.getconn = AsyncMock(side_effect=TimeoutError("replica down"))
+
+    async def fake_get_pool(dsn=None):
+        return replica if dsn else primary
+
+    monkeypatch.setattr(adb, "get_pool", fake_get_pool)
+
+    asyncio.run(adb.get_all_merchants())
+    asyncio.run(adb.get_all_merchants())
+
+    replica.getconn.assert_awaited_once_with(timeout=db.REPLICA_CONNECT_TIMEOUT)
+    assert primary.getconn.await_count == 2
+    stats = db.get_read_router().stats()
+    assert stats["fallbacks"] == 1
+    assert stats["replicas"][0]["down"] is True
+
+def test_async_update_deals_batch_groups_by_fields(async_pool):
+    cur = async_pool(fetchall=[[(1,), (2,)], [(3,)]])
+
+    result = asyncio.run(
+        adb.update_deals_batch(
+            [
+                {"id": 1, "price": "฿10"},
+                {"id": 2, "price": "฿20"},
+                {"id": 3, "title": "New"},
+                {"id": 4, "title": "Gone"},
+            ]
+        )
+    )
+
+    assert [item["status"] for item in result] == ["updated", "updated", "updated", "not_found"]
+    # Two grouped UPDATEs and one generation bump.
+    assert cur.execute.await_count == 3
+    price_params = cur.execute.await_args_list[0].args[1]
+    assert price_params[:2] == ([1, 2], ["฿10", "฿20"])
+
+
+def test_feed_endpoint_returns_rows_read_at_both_generations(async_pool):
+    rows = [
+        ("scraped", 3, "A", "10", "", "", "", "", "", "", "", None, "Shop", None),
+        ("owner", 9, "B", "12", "", "", "", "", "", "", "", None, None, None),
+    ]
+    cur = async_pool(fetchall=[[("deals", 4, None)], rows])
+
+    response = TestClient(main.app).get("/api/feed?page_size=5")
+
+    assert response.status_code == 200
+    assert [(p["source"], p["id"]) for p in response.json()["products"]] == [
+        ("scraped", 3), ("owner", 9),
+    ]
+    statements = [call.args[0] for call in cur.execute.await_args_list]
+    assert statements[0] == "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;"
+    assert cur.execute.await_args_list[1].args[1] == (["deals", "owner_deals"],)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.database import DataGeneration
+from backend.response_cache import ResponseCache
+
+
+def setup_dashboard(monkeypatch, tmp_path, fail_owner=False):
+    calls = []
+    running = set()
+    peak = []
+
+    current = {"deals": DataGeneration(1, None), "owner_deals": DataGeneration(1, None)}
+
+    async def load_generations():
+        return current
+
+    async def loader(name, result, generations, source=None):
+        source = source or name
+        generations[source] = current[source]
+        calls.append(name)
+        running.add(name)
+        await asyncio.sleep(0.01)
+        peak.append(len(running))
+        running.discard(name)
+        if fail_owner and name == "owner_deals":
+            raise RuntimeError("database down")
+        return result
+
+    async def fake_get_deals(page, page_size, merchant, title, cursor, generations, **filters):
+        return await loader(
+            "deals",
+            {"total_products": 1, "products": [{"id": 1, "title": title}], "page": page, "page_size": page_size},
+            generations,
+        )
+
+    async def fake_get_merchants(generations):
+        return await loader("merchants", ["Shop A", "Shop B"], generations, "deals")
+
+    async def fake_get_owner_deals(page, page_size, cursor, generations):
+        return await loader(
+            "owner_deals",
+            {"total_products": 0, "products": [], "page": page, "page_size": page_size},
+            generations,
+        )
+
+    status_file = tmp_path / "scraper_status.json"
+    status_file.write_text(json.dumps({"is_scraping": True}), encoding="utf-8")
+    monkeypatch.setattr(main, "SCRAPER_STATUS_FILE", str(status_file))
+    monkeypatch.setattr(
+        main, "response_cache", ResponseCache(load_generations, generation_ttl=0, sizeof=len)
+    )
+    monkeypatch.setattr(main, "get_deals_from_db", fake_get_deals)
+    monkeypatch.setattr(main, "get_all_merchants", fake_get_merchants)
+    monkeypatch.setattr(main, "get_owner_deals", fake_get_owner_deals)
+    return calls, peak
+
+
+def test_dashboard_loads_sections_concurrently(monkeypatch, tmp_path):
+    calls, peak = setup_dashboard(monkeypatch, tmp_path)
+    client = TestClient(main.app)
+
+    response = client.get(
+        "/api/dashboard?deals_page=2&deals_page_size=20&title=tv&owner_page_size=10"
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data) == ["deals", "merchants", "owner_deals", "scraper_status"]
+    assert data["deals"]["page"] == 2
+    assert data["deals"]["page_size"] == 20
+    assert data["deals"]["products"][0]["title"] == "tv"
+    assert data["merchants"] == ["Shop A", "Shop B"]
+    assert data["owner_deals"]["page_size"] == 10
+    assert data["scraper_status"] == {"is_scraping": True}
+    assert sorted(calls) == ["deals", "merchants", "owner_deals"]
+    assert max(peak) == 3
+
+
+def test_dashboard_failed_section_falls_back(monkeypatch, tmp_path):
+    setup_dashboard(monkeypatch, tmp_path, fail_owner=True)
+    client = TestClient(main.app)
+
+    data = client.get("/api/dashboard?owner_page=3").json()
+
+    assert data["owner_deals"] == {"total_products": 0, "products": [], "page": 3, "page_size": 50}
+    assert data["merchants"] == ["Shop A", "Shop B"]
+
+
+def test_dashboard_returns_only_requested_sections(monkeypatch, tmp_path):
+    calls, _ = setup_dashboard(monkeypatch, tmp_path)
+    client = TestClient(main.app)
+
+    data = client.get("/api/dashboard?sections=scraper_status&sections=merchants").json()
+
+    assert list(data) == ["scraper_status", "merchants"]
+    assert calls == ["merchants"]
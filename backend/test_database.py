@@ -1,5 +1,16 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
 import backend.database as db
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_count_cache(monkeypatch):
+    monkeypatch.setattr(db, "_count_cache", db.OrderedDict())
+    monkeypatch.setattr(db, "_count_cache_generation", None)
 
 
 def test_insert_deals_commits_once_and_closes_connection():
@@ -24,6 +35,7 @@ def test_insert_deals_commits_once_and_closes_connection():
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_cursor.fetchone.side_effect = [
+        (1,),
         (1,),
         (
             "Item",
@@ -51,13 +63,13 @@ def test_insert_deals_commits_once_and_closes_connection():
          patch("backend.database._ensure_database_exists"):
         db.insert_deals(deals_data)
 
-    mock_create_tables.assert_called_once()
-    mock_cursor.execute.assert_any_call(
-        "TRUNCATE TABLE merchants RESTART IDENTITY;"
-    )
-    mock_cursor.execute.assert_any_call(
-        "TRUNCATE TABLE deals RESTART IDENTITY CASCADE;"
-    )
+    mock_create_tables.assert_not_called()
+    executed = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    truncate = executed.index("TRUNCATE TABLE deals RESTART IDENTITY CASCADE;")
+    staged = [i for i, query in enumerate(executed) if "INSERT INTO deals_staged" in query]
+    assert staged and max(staged) < truncate
+    assert "RELEASE SAVEPOINT deal_row;" in executed
+    assert not any("TRUNCATE TABLE merchants" in query for query in executed)
     mock_conn.commit.assert_called_once()
     mock_conn.__exit__.assert_called_once()
     mock_conn.cursor.return_value.__exit__.assert_called_once()
@@ -166,6 +178,7 @@ def test_merchants_sequence_reset():
     mock_conn_insert = MagicMock()
     mock_cursor_insert = MagicMock()
     mock_cursor_insert.fetchone.side_effect = [
+        (1,),
         (1,),
         (
             "Item",
@@ -244,3 +257,490 @@ def test_get_deals_from_db_joins_merchants():
         for query in executed_queries
     )
     assert result["products"][0]["merchant"] == "Shop"
+
+
+def test_insert_deals_bulk_resolves_merchants_once_and_copies():
+    db.DATABASE_URL = "postgres://example"
+    deals_data = {
+        "products": [
+            {"merchant": "Shop", "title": "Item1", "price": "10", "product_url": "url1"},
+            {"merchant": "shop", "title": "Tab\tItem", "price": "12", "product_url": "url2"},
+            {"merchant": None, "title": "Item3", "price": "15", "product_url": None},
+        ]
+    }
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (0,)
+    mock_cursor.fetchall.return_value = [(7, "shop")]
+    mock_cursor.rowcount = 3
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    copied = {}
+
+    def capture_copy(statement, buffer):
+        copied["statement"] = statement
+        copied["lines"] = buffer.read().splitlines()
+
+    mock_cursor.copy_expert.side_effect = capture_copy
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database.create_tables"
+    ), patch("backend.database._ensure_database_exists"):
+        loaded = db.insert_deals(deals_data, bulk=True)
+
+    assert loaded == {"inserted": 3, "updated": 0, "deleted": 0, "unchanged": 0, "unkeyed": 0}
+    merchant_calls = [
+        c for c in mock_cursor.execute.call_args_list if "INSERT INTO merchants" in c.args[0]
+    ]
+    assert len(merchant_calls) == 1
+    assert merchant_calls[0].args[1] == (["Shop"],)
+    assert not any(
+        "SELECT id FROM merchants" in c.args[0] for c in mock_cursor.execute.call_args_list
+    )
+    assert copied["statement"].startswith("COPY deals_staged (title, price,")
+    assert copied["lines"][0].split("\t")[:2] == ["Item1", "10"]
+    assert copied["lines"][1].startswith("Tab\\tItem\t12\t")
+    assert copied["lines"][0].split("\t")[6] == "7"
+    assert copied["lines"][2].split("\t")[6] == "\\N"
+
+
+def test_insert_deals_sync_reports_counts_without_truncating():
+    db.DATABASE_URL = "postgres://example"
+    deals_data = {
+        "products": [
+            {"merchant": "Shop", "title": "Old", "price": "10", "product_url": "url1"},
+            {"merchant": "Shop", "title": "New", "price": "11", "product_url": "url1"},
+            {"merchant": "Shop", "title": "Other", "price": "12", "product_url": "url2"},
+            {"merchant": "Shop", "title": "Unkeyed", "price": "13", "product_url": None},
+        ]
+    }
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (2,)
+    mock_cursor.fetchall.return_value = [(1, "shop")]
+    # DELETE missing deals, UPDATE deals, INSERT new deals, INSERT unkeyed
+    # deals, DELETE orphan merchants
+    type(mock_cursor).rowcount = PropertyMock(side_effect=[4, 1, 1, 1, 0])
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    copied = []
+    mock_cursor.copy_expert.side_effect = (
+        lambda statement, buffer: copied.extend(buffer.read().splitlines())
+    )
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database.create_tables"
+    ), patch("backend.database._ensure_database_exists"):
+        counts = db.insert_deals(deals_data, sync=True)
+
+    assert counts == {"inserted": 1, "updated": 1, "deleted": 4, "unchanged": 0, "unkeyed": 1}
+    executed = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert not any("TRUNCATE" in query for query in executed)
+    assert any("UPDATE deals d" in query and "IS DISTINCT FROM" in query for query in executed)
+    mock_cursor.copy_expert.assert_called_once()
+    assert "COPY deals_incoming" in mock_cursor.copy_expert.call_args.args[0]
+    assert [line.split("\t")[0] for line in copied] == ["New", "Other", "Unkeyed"]
+
+
+def test_get_deals_from_db_cursor_seeks_past_last_id():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    def row(deal_id):
+        return (deal_id, "Item", "10", "20", "50%", "img", "url", 1, "mi", "4",
+                "100", None, None, "Shop")
+
+    mock_cursor.fetchone.return_value = (5,)
+    mock_cursor.fetchall.return_value = [row(3), row(4), row(5)]
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ):
+        first = db.get_deals_from_db(page_size=2)
+        second = db.get_deals_from_db(page_size=2, cursor=first["next_cursor"])
+
+    assert [d["id"] for d in first["products"]] == [3, 4]
+    select_call = mock_cursor.execute.call_args_list[-1]
+    assert "d.id > %s" in select_call.args[0]
+    assert "OFFSET" in select_call.args[0]
+    assert select_call.args[1] == (4, 3, 0)
+    assert second["next_cursor"] is not None
+
+
+def test_get_deals_from_db_rejects_malformed_cursor():
+    with pytest.raises(ValueError):
+        db.get_deals_from_db(cursor="not-a-cursor")
+
+
+def test_get_deals_from_db_title_search_uses_index_and_rank_cursor():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    def row(deal_id, rank):
+        return (deal_id, "ไอโฟน", "10", "20", "50%", "img", "url", 1, "mi", "4",
+                "100", None, None, "Shop", rank)
+
+    mock_cursor.fetchone.return_value = (2,)
+    mock_cursor.fetchall.return_value = [row(9, 0.5), row(3, 0.25)]
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ):
+        result = db.get_deals_from_db(page_size=1, title="ไอโฟน")
+
+    count_query = mock_cursor.execute.call_args_list[1].args[0]
+    select_query = mock_cursor.execute.call_args_list[2].args[0]
+    assert "search_vector @@ %s::tsquery" in count_query
+    assert "LIKE" not in count_query
+    assert "ORDER BY rank DESC, d.id ASC" in select_query
+    assert [d["id"] for d in result["products"]] == [9]
+    assert db._decode_cursor(result["next_cursor"]) == {"id": 9, "rank": 0.5}
+
+
+def test_get_deals_from_db_caches_total_per_generation():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+    mock_cursor.fetchall.return_value = []
+    # generation, count | generation (cached) | generation bumped, count
+    mock_cursor.fetchone.side_effect = [(1,), (42,), (1,), (2,), (40,)]
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ):
+        totals = [db.get_deals_from_db(merchant="Shop")["total_products"] for _ in range(3)]
+
+    assert totals == [42, 42, 40]
+    count_calls = [
+        c for c in mock_cursor.execute.call_args_list if "SELECT COUNT(*)" in c.args[0]
+    ]
+    assert len(count_calls) == 2
+
+
+def test_get_deals_from_db_total_estimate_and_none():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+    mock_cursor.fetchall.return_value = []
+    mock_cursor.fetchone.return_value = ([{"Plan": {"Plan Rows": 1234}}],)
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ):
+        estimated = db.get_deals_from_db(total="estimate")
+        mock_cursor.execute.reset_mock()
+        skipped = db.get_deals_from_db(total="none")
+
+    assert estimated["total_products"] == 1234
+    assert skipped["total_products"] is None
+    assert len(mock_cursor.execute.call_args_list) == 1
+
+
+def test_get_deals_from_db_sort_seeks_on_indexed_column():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    def row(deal_id, price):
+        return (deal_id, "Item", "1,290", "20", "50%", "img", "url", 1, "mi", "4",
+                "100", None, None, "Shop", price)
+
+    mock_cursor.fetchone.return_value = (1,)
+    mock_cursor.fetchall.return_value = [row(8, Decimal("1290.00")), row(2, Decimal("990.00"))]
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ):
+        first = db.get_deals_from_db(page_size=1, sort="price", order="desc", min_discount=10)
+        db.get_deals_from_db(page_size=1, sort="price", order="desc", cursor=first["next_cursor"])
+
+    first_select = mock_cursor.execute.call_args_list[2].args[0]
+    assert "d.discount_value >= %s::numeric" in first_select
+    assert "d.price_value IS NOT NULL" in first_select
+    assert "ORDER BY d.price_value DESC, d.id DESC" in first_select
+    assert db._decode_cursor(first["next_cursor"]) == {"id": 8, "key": "1290.00"}
+
+    seek_select = mock_cursor.execute.call_args_list[-1]
+    assert "(d.price_value, d.id) < (%s::numeric, %s)" in seek_select.args[0]
+    assert seek_select.args[1][-4:] == ("1290.00", 8, 2, 0)
+
+
+def test_get_deals_from_db_rejects_unknown_sort():
+    with pytest.raises(ValueError):
+        db.get_deals_from_db(sort="title")
+
+
+def test_drop_expired_price_history_only_drops_old_partitions(monkeypatch):
+    monkeypatch.setattr(db, "PRICE_HISTORY_RETENTION_MONTHS", 12)
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [
+        ("deal_price_history_p2025_09",),
+        ("deal_price_history_p2025_10",),
+        ("deal_price_history_p2025_11",),
+        ("unrelated",),
+    ]
+
+    dropped = db._drop_expired_price_history(
+        mock_cursor, db.datetime(2026, 10, 18, tzinfo=db.timezone.utc)
+    )
+
+    assert dropped == ["deal_price_history_p2025_09"]
+
+
+def test_get_deal_price_history_downsamples_by_product_url():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+    mock_cursor.fetchone.return_value = ("url1",)
+    mock_cursor.fetchall.return_value = [
+        ("t1", Decimal("10.00"), Decimal("9.00"), Decimal("11.00"), None, None, 4)
+    ]
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ):
+        history = db.get_deal_price_history(5, points=50)
+
+    query, params = mock_cursor.execute.call_args_list[-1].args
+    assert "FROM deal_price_history" in query
+    assert params == ("url1", None, None, None, None, 50, 50)
+    assert history["points"][0]["min_price"] == Decimal("9.00")
+    assert history["points"][0]["samples"] == 4
+
+
+def test_migrate_runs_once_per_process(monkeypatch):
+    db.DATABASE_URL = "postgres://example"
+    monkeypatch.setattr(db, "_schema_version", None)
+    mock_conn = MagicMock()
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn), patch(
+        "backend.database._ensure_database_exists"
+    ) as ensure_exists, patch(
+        "backend.database.apply_migrations", return_value=7
+    ) as apply:
+        assert db.migrate() == 7
+        assert db.migrate() == 7
+        db.create_tables()
+
+    apply.assert_called_once()
+    ensure_exists.assert_called_once()
+
+
+def test_insert_deals_keeps_snapshot_when_scrape_is_too_small():
+    db.DATABASE_URL = "postgres://example"
+    deals_data = {"products": [{"merchant": "Shop", "title": "Only", "product_url": "u1"}]}
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (100,)
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn):
+        for mode in ({}, {"bulk": True}, {"sync": True}):
+            with pytest.raises(db.SnapshotRejected):
+                db.insert_deals(deals_data, **mode)
+        with pytest.raises(db.SnapshotRejected):
+            db.insert_deals({"products": []}, sync=True)
+
+    executed = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert set(executed) == {"SELECT COUNT(*) FROM deals;"}
+
+
+def test_insert_deals_rolls_back_only_the_failed_row():
+    db.DATABASE_URL = "postgres://example"
+    deals_data = {
+        "products": [
+            {"title": "Bad", "price": "10", "product_url": "u1"},
+            {"title": "Good", "price": "12", "product_url": "u2"},
+        ]
+    }
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [(0,), RuntimeError("bad row"), None]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn):
+        db.insert_deals(deals_data)
+
+    executed = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert executed.count("ROLLBACK TO SAVEPOINT deal_row;") == 1
+    assert executed.count("RELEASE SAVEPOINT deal_row;") == 1
+    assert "TRUNCATE TABLE deals RESTART IDENTITY CASCADE;" in executed
+    mock_conn.rollback.assert_not_called()
+
+
+def test_apply_owner_deal_batch_uses_multi_row_statements():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [
+        [(3, "shop")],  # merchant resolution
+        [(11,), (10,)],  # batch insert, ids in input order
+        [(1,)],  # update of price
+        [(5,)],  # delete
+    ]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn):
+        result = db.apply_owner_deal_batch(
+            create=[
+                {"title": "A", "price": "1", "merchant": "Shop"},
+                {"title": "B", "price": "2", "merchant": "shop"},
+            ],
+            update=[{"id": 1, "price": "3"}, {"id": 2, "price": "4"}],
+            delete=[5, 6],
+        )
+
+    assert result == {
+        "created": [{"id": 11, "status": "created"}, {"id": 10, "status": "created"}],
+        "updated": [{"id": 1, "status": "updated"}, {"id": 2, "status": "not_found"}],
+        "deleted": [{"id": 5, "status": "deleted"}, {"id": 6, "status": "not_found"}],
+    }
+    calls = mock_cursor.execute.call_args_list
+    assert len(calls) == 5
+    assert "INSERT INTO owner_merchants" in calls[0].args[0]
+    assert calls[0].args[1] == (["Shop"],)
+    insert_params = dict(zip(db.INGEST_COLUMNS, calls[1].args[1]))
+    assert insert_params["title"] == ["A", "B"]
+    assert insert_params["merchant_id"] == [3, 3]
+    assert insert_params["price_value"] == [Decimal("1"), Decimal("2")]
+    assert calls[2].args[1] == ([1, 2], ["3", "4"], [Decimal("3"), Decimal("4")])
+    assert calls[3].args == (db._OWNER_DEAL_BATCH_DELETE, ([5, 6],))
+    assert calls[4].args[1] == ("owner_deals",)
+
+
+def test_apply_owner_deal_batch_without_changes_keeps_generation():
+    db.DATABASE_URL = "postgres://example"
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [[]]  # delete matched nothing
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn):
+        result = db.apply_owner_deal_batch(delete=[5])
+
+    assert result["deleted"] == [{"id": 5, "status": "not_found"}]
+    assert not any(
+        "data_generation" in c.args[0] for c in mock_cursor.execute.call_args_list
+    )
+
+
+def test_update_deals_batch_rejects_duplicate_ids():
+    with patch("backend.database.psycopg2.connect") as connect:
+        with pytest.raises(ValueError):
+            db.update_deals_batch([{"id": 1, "price": "1"}, {"id": 1, "price": "2"}])
+    connect.assert_not_called()
+
+
+def test_stream_deals_reads_full_result_set_from_named_cursor():
+    db.DATABASE_URL = "postgres://example"
+    row = (1, "Item", "10", "", "", "", "url", 2, "", "", "", None, None, "Shop")
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchmany.side_effect = [[row, row], [row], []]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn):
+        batches = list(db.stream_deals(merchant="Shop", batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][0]["merchant"] == "Shop"
+    mock_conn.cursor.assert_called_once_with(name="deals_export")
+    query, params = mock_cursor.execute.call_args.args
+    assert "LIMIT" not in query and "OFFSET" not in query
+    assert params == ("Shop",)
+    mock_cursor.fetchmany.assert_called_with(2)
+
+
+def test_feed_query_merges_both_sources_and_seeks_past_cursor():
+    cursor = db._encode_cursor({
+        "id": 7, "source": "owner", "key": "2026-01-02 00:00:00+00:00",
+        "sort": None, "order": "desc",
+    })
+
+    plan = db._plan_feed_page(page_size=2, merchant="Shop", cursor=cursor)
+
+    assert "FROM owner_deals d" in plan.select_query
+    assert "FROM deals d" in plan.select_query
+    assert "UNION ALL" in plan.select_query
+    assert "ORDER BY sort_key DESC, source DESC, id DESC" in plan.select_query
+    # Newest first, ties by source descending: scraped rows listed at the
+    # cursor's time came before it, so only strictly older ones follow.
+    assert "(d.created_at, d.id) < (%s::timestamptz, %s)" in plan.select_query
+    assert "d.scraped_at < %s::timestamptz" in plan.select_query
+    assert plan.select_params == (
+        "Shop", "2026-01-02 00:00:00+00:00", 7, 3,
+        "Shop", "2026-01-02 00:00:00+00:00", 3,
+        3,
+    )
+
+
+def test_feed_rejects_cursor_without_source():
+    with pytest.raises(ValueError):
+        db._plan_feed_page(cursor=db._encode_cursor({"id": 7}))
+    with pytest.raises(ValueError):
+        db._plan_feed_page(source="imported")
+
+
+def test_feed_rejects_cursor_issued_for_another_ordering():
+    cursor = db._encode_cursor(
+        {"id": 7, "source": "owner", "key": "12", "sort": "price", "order": "asc"}
+    )
+
+    assert db._plan_feed_page(cursor=cursor, sort="price").position == "key"
+    with pytest.raises(ValueError):
+        db._plan_feed_page(cursor=cursor, sort="price", order="desc")
+    with pytest.raises(ValueError):
+        db._plan_feed_page(cursor=cursor, sort="discount", order="asc")
+    with pytest.raises(ValueError):
+        db._plan_feed_page(cursor=cursor)
+
+
+def test_get_feed_returns_tagged_entries_and_next_cursor():
+    db.DATABASE_URL = "postgres://example"
+    listed = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    rows = [
+        ("scraped", 3, "A", "10", "", "", "", "", "", "", "", listed, "Shop", Decimal("10")),
+        ("owner", 9, "B", "12", "", "", "", "", "", "", "", listed, None, Decimal("12")),
+        ("scraped", 1, "C", "15", "", "", "", "", "", "", "", listed, "Shop", Decimal("15")),
+    ]
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = rows
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.__enter__.return_value = mock_conn
+
+    with patch("backend.database.psycopg2.connect", return_value=mock_conn):
+        result = db.get_feed(page_size=2, sort="price")
+
+    assert [(e["source"], e["id"]) for e in result["products"]] == [("scraped", 3), ("owner", 9)]
+    assert result["products"][1]["merchant"] == ""
+    assert db._decode_cursor(result["next_cursor"]) == {
+        "id": 9, "source": "owner", "key": "12", "sort": "price", "order": "asc",
+    }
+
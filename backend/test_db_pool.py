@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import backend.database as database
+import backend.db_pool as db_pool
+from backend.db_pool import ConnectionPool, PoolTimeout
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = (
+        db_pool.extensions.TRANSACTION_STATUS_IDLE
+    )
+    return conn
+
+
+def test_pool_reuses_returned_connection():
+    conn = make_conn()
+    with patch("backend.db_pool.psycopg2.connect", return_value=conn) as connect:
+        pool = ConnectionPool("postgres://example", min_size=0, max_size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+    assert first is second
+    connect.assert_called_once_with("postgres://example")
+    stats = pool.stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 1
+    assert stats["requests"] == 2
+
+
+def test_pool_times_out_when_exhausted():
+    with patch("backend.db_pool.psycopg2.connect", side_effect=lambda dsn: make_conn()):
+        pool = ConnectionPool("postgres://example", max_size=1, timeout=0.01)
+        held = pool.getconn()
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+        pool.putconn(held)
+
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["wait_count"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_pool_discards_closed_connections():
+    broken = make_conn()
+    fresh = make_conn()
+    with patch("backend.db_pool.psycopg2.connect", side_effect=[broken, fresh]):
+        pool = ConnectionPool("postgres://example", max_size=1)
+        with pool.connection():
+            broken.closed = 2
+        with pool.connection() as conn:
+            assert conn is fresh
+
+    broken.close.assert_called_once()
+    assert pool.stats()["connections_closed"] == 1
+
+
+def test_pool_recycles_idle_connections_above_min_size(monkeypatch):
+    conns = [make_conn(), make_conn()]
+    with patch("backend.db_pool.psycopg2.connect", side_effect=conns + [make_conn()]):
+        pool = ConnectionPool("postgres://example", min_size=1, max_size=2, max_idle=10)
+        first = pool.getconn()
+        second = pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+
+        now = db_pool.time.monotonic()
+        monkeypatch.setattr(db_pool.time, "monotonic", lambda: now + 20)
+        pool.check_interval = 60
+        pool.getconn()
+
+    assert sum(c.close.call_count for c in conns) == 1
+
+
+def test_pool_passes_connect_timeout_in_whole_seconds():
+    with patch("backend.db_pool.psycopg2.connect", return_value=make_conn()) as connect:
+        ConnectionPool("postgres://example", max_size=1, connect_timeout=0.5).getconn()
+
+    connect.assert_called_once_with("postgres://example", connect_timeout=2)
+
+
+def test_replica_pools_use_replica_connect_timeout(monkeypatch):
+    monkeypatch.setattr(database, "_replica_pools", {})
+    pool = database._get_replica_pool("postgres://replica")
+
+    assert pool.connect_timeout == database.REPLICA_CONNECT_TIMEOUT
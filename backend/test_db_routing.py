@@ -0,0 +1,67 @@
+import pytest
+
+import backend.db_routing as db_routing
+from backend.db_routing import ReadRouter
+
+
+def test_round_robin_cycles_replicas():
+    router = ReadRouter(["a", "b"])
+    picked = []
+    for _ in range(4):
+        with router.route("deals") as dsn:
+            picked.append(dsn)
+    assert picked == ["a", "b", "a", "b"]
+
+
+def test_least_connections_prefers_idle_replica():
+    router = ReadRouter(["a", "b"], strategy="least_connections")
+    busy = router.acquire("deals")
+    assert router.acquire("deals") != busy
+    router.release(busy)
+
+
+def test_no_replicas_routes_to_primary():
+    router = ReadRouter([])
+    assert router.acquire("deals") is None
+    assert router.stats()["primary_reads"] == 1
+
+
+def test_reads_after_write_go_to_primary_until_window_passes(monkeypatch):
+    router = ReadRouter(["a"], read_your_writes=5)
+    now = db_routing.time.monotonic()
+    monkeypatch.setattr(db_routing.time, "monotonic", lambda: now)
+    router.mark_written("owner_deals")
+
+    assert router.acquire("owner_deals") is None
+    assert router.acquire("deals") == "a"
+
+    monkeypatch.setattr(db_routing.time, "monotonic", lambda: now + 6)
+    assert router.acquire("owner_deals") == "a"
+
+
+def test_read_of_several_names_uses_primary_if_any_was_written():
+    router = ReadRouter(["a"], read_your_writes=5)
+    router.mark_written("owner_deals")
+
+    assert router.acquire(("deals", "owner_deals")) is None
+    assert router.acquire(("deals",)) == "a"
+
+
+def test_failed_replica_is_skipped_until_retry(monkeypatch):
+    router = ReadRouter(["a", "b"], retry_after=30)
+    now = db_routing.time.monotonic()
+    monkeypatch.setattr(db_routing.time, "monotonic", lambda: now)
+    router.record_fallback("a")
+
+    assert [router.acquire("deals") for _ in range(3)] == ["b", "b", "b"]
+    router.record_fallback("b")
+    assert router.acquire("deals") is None
+
+    monkeypatch.setattr(db_routing.time, "monotonic", lambda: now + 31)
+    assert router.acquire("deals") in ("a", "b")
+    assert router.stats()["replicas"][0]["down"] is False
+
+
+def test_rejects_unknown_strategy():
+    with pytest.raises(ValueError):
+        ReadRouter(["a"], strategy="random")
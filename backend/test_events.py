@@ -0,0 +1,133 @@
+import asyncio
+
+from backend.database import DataGeneration
+from backend.events import KEEPALIVE, ChangeWatcher, EventHub
+
+
+async def _subscribe(hub, last_event_id=None):
+    stream = hub.stream(last_event_id)
+    assert (await stream.__anext__()).startswith(b"retry:")
+    return stream
+
+
+def test_publish_reaches_every_subscriber():
+    hub = EventHub()
+
+    async def run():
+        streams = [await _subscribe(hub) for _ in range(3)]
+        assert hub.stats()["subscribers"] == 3
+        hub.publish("scrape_started", {"started_at": "2026-03-01T10:00:00+07:00"})
+        return [await stream.__anext__() for stream in streams]
+
+    frames = asyncio.run(run())
+
+    assert len(set(frames)) == 1
+    assert frames[0] == (
+        b'id: 1\nevent: scrape_started\ndata: {"started_at": "2026-03-01T10:00:00+07:00"}\n\n'
+    )
+
+
+def test_stalled_subscriber_is_disconnected():
+    hub = EventHub(queue_size=2)
+
+    async def run():
+        stream = await _subscribe(hub)
+        for _ in range(3):
+            hub.keepalive()
+        return [frame async for frame in stream]
+
+    assert asyncio.run(run()) == []
+    assert hub.stats() == {"subscribers": 0, "published": 0, "dropped": 1, "last_event_id": 0}
+
+
+def test_reconnect_replays_missed_events():
+    hub = EventHub()
+    for generation in (1, 2, 3):
+        hub.publish("owner_deals_changed", {"generation": generation})
+
+    async def run():
+        stream = await _subscribe(hub, last_event_id="1")
+        return [await stream.__anext__(), await stream.__anext__()]
+
+    first, second = asyncio.run(run())
+
+    assert first.startswith(b"id: 2\n")
+    assert second.startswith(b"id: 3\n")
+
+
+def test_watcher_reports_scrapes_and_owner_changes():
+    hub = EventHub()
+    status = {"is_scraping": False}
+    generations = {"deals": DataGeneration(1, None), "owner_deals": DataGeneration(1, None)}
+    fresh_reads = []
+
+    async def load_generations(fresh):
+        fresh_reads.append(fresh)
+        return dict(generations)
+
+    watcher = ChangeWatcher(hub, lambda: status, load_generations)
+
+    async def run():
+        stream = await _subscribe(hub)
+        await watcher.check()  # baseline, no events
+        # A whole run between two checks is still reported.
+        status.update(
+            started_at="2026-03-01T10:00:00+07:00",
+            finished_at="2026-03-01T10:00:30+07:00",
+            succeeded=True,
+            products_found=120,
+        )
+        generations["deals"] = DataGeneration(2, None)
+        await watcher.check()
+        generations["owner_deals"] = DataGeneration(7, None)
+        await watcher.check()
+        await watcher.check()
+        hub.keepalive()
+        frames = []
+        while True:
+            frame = await stream.__anext__()
+            if frame == KEEPALIVE:
+                return frames
+            frames.append(frame)
+
+    frames = asyncio.run(run())
+
+    assert [frame.split(b"\n")[1] for frame in frames] == [
+        b"event: scrape_started",
+        b"event: scrape_finished",
+        b"event: owner_deals_changed",
+    ]
+    assert b'"products_found": 120' in frames[1]
+    assert b'"generation": 2' in frames[1]
+    assert b'"generation": 7' in frames[2]
+    assert fresh_reads == [False, True, False, False]
+
+
+def test_failed_ingest_is_reported_as_failed_scrape():
+    hub = EventHub()
+    status = {"is_scraping": False}
+
+    async def load_generations(fresh):
+        return {"deals": DataGeneration(1, None), "owner_deals": DataGeneration(1, None)}
+
+    watcher = ChangeWatcher(hub, lambda: status, load_generations)
+
+    async def run():
+        stream = await _subscribe(hub)
+        await watcher.check()
+        status.update(
+            started_at="2026-03-01T10:00:00+07:00",
+            finished_at="2026-03-01T10:00:30+07:00",
+            succeeded=False,
+            products_found=0,
+            error="Snapshot of 3 deals is too small",
+        )
+        await watcher.check()
+        await stream.__anext__()  # scrape_started
+        return await stream.__anext__()
+
+    frame = asyncio.run(run())
+
+    assert frame.split(b"\n")[1] == b"event: scrape_finished"
+    assert b'"succeeded": false' in frame
+    assert b'"error": "Snapshot of 3 deals is too small"' in frame
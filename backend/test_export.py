@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.admission import AdmissionLimiter
+from backend.export import CSV_COLUMNS, get_encoder
+
+DEAL = {
+    "id": 1,
+    "title": "หูฟัง, ไร้สาย",
+    "price": "฿990",
+    "original_price": "฿1,290",
+    "discount": "23%",
+    "image_url": "img",
+    "product_url": "url",
+    "merchant_id": 4,
+    "merchant_image": "mi",
+    "rating": "4.5",
+    "reviews_count": "12",
+    "scraped_at": datetime(2026, 1, 2, tzinfo=timezone.utc),
+    "updated_at": None,
+    "merchant": "Shop",
+}
+
+
+def test_ndjson_encoder_writes_one_object_per_line():
+    encoder = get_encoder("ndjson")
+    data = encoder.start() + encoder.encode([DEAL, DEAL]) + encoder.finish()
+
+    lines = data.decode("utf-8").splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record["title"] == "หูฟัง, ไร้สาย"
+    assert record["scraped_at"] == "2026-01-02T00:00:00+00:00"
+    assert "merchant_id" not in record
+
+
+def test_csv_encoder_matches_scraper_field_order():
+    encoder = get_encoder("csv")
+    data = encoder.start() + encoder.encode([DEAL]) + encoder.finish()
+
+    text = data.decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == CSV_COLUMNS
+    assert rows[1][:2] == ["หูฟัง, ไร้สาย", "฿990"]
+    assert rows[1][4] == "Shop"
+
+
+def test_get_encoder_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        get_encoder("xml")
+
+
+def test_export_endpoint_streams_batches(monkeypatch):
+    requested = {}
+
+    def fake_stream_deals(merchant, title, **filters):
+        requested.update(filters, merchant=merchant)
+
+        async def batches():
+            yield [DEAL]
+            yield [dict(DEAL, id=2)]
+
+        return batches()
+
+    monkeypatch.setattr(main, "stream_deals", fake_stream_deals)
+    client = TestClient(main.app)
+
+    response = client.get("/api/deals/export?format=ndjson&merchant=Shop&sort=price")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2]
+    assert requested["merchant"] == "Shop"
+    assert requested["sort"] == "price"
+
+
+def test_export_runs_in_its_own_admission_group(monkeypatch):
+    def fake_stream_deals(merchant, title, **filters):
+        async def batches():
+            yield [DEAL]
+
+        return batches()
+
+    monkeypatch.setattr(main, "stream_deals", fake_stream_deals)
+    exports = AdmissionLimiter(1, 0, 0)
+    monkeypatch.setitem(main.admission_limiters, "reads", AdmissionLimiter(0, 0, 0))
+    monkeypatch.setitem(main.admission_limiters, "exports", exports)
+    client = TestClient(main.app)
+
+    assert client.get("/api/deals/export").status_code == 200
+    assert exports.stats()["admitted"] == 1
+    assert exports.stats()["active"] == 0
+
+
+def test_export_failing_mid_stream_is_logged_and_aborted(monkeypatch, caplog):
+    def fake_stream_deals(merchant, title, **filters):
+        async def batches():
+            yield [DEAL, DEAL]
+            raise RuntimeError("connection lost")
+
+        return batches()
+
+    monkeypatch.setattr(main, "stream_deals", fake_stream_deals)
+    client = TestClient(main.app)
+
+    with pytest.raises(RuntimeError):
+        client.get("/api/deals/export")
+    assert "Deal export failed after 2 deals: connection lost" in caplog.text
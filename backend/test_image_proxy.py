@@ -0,0 +1,255 @@
+import asyncio
+import io
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import image_proxy, main
+from backend.image_proxy import CachedImage, ImageCache, ImageProxy, _freshness
+
+PNG = b"\x89PNG" + b"\x00" * 1000
+
+
+def make_proxy(tmp_path, handler, **options):
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        return handler(request)
+
+    proxy = ImageProxy(
+        cache_dir=str(tmp_path / "images"), transport=httpx.MockTransport(record), **options
+    )
+    return proxy, requests
+
+
+def test_image_is_streamed_then_served_from_disk(tmp_path, monkeypatch):
+    proxy, requests = make_proxy(
+        tmp_path,
+        lambda request: httpx.Response(
+            200, content=PNG, headers={"content-type": "image/png", "cache-control": "max-age=600"}
+        ),
+    )
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    client = TestClient(main.app)
+
+    first = client.get("/api/proxy-image", params={"url": "https://img.example/a.png"})
+    second = client.get("/api/proxy-image", params={"url": "https://img.example/a.png"})
+
+    assert first.content == second.content == PNG
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["content-type"] == "image/png"
+    assert second.headers["cache-control"].startswith("public, max-age=")
+    assert len(requests) == 1
+    # The index is rebuilt from disk on restart.
+    assert ImageCache(str(tmp_path / "images"), 10**6).stats()["bytes"] == len(PNG)
+
+
+def test_disk_cache_work_runs_in_threads(tmp_path, monkeypatch):
+    proxy, _ = make_proxy(
+        tmp_path,
+        lambda request: httpx.Response(
+            200, content=PNG, headers={"content-type": "image/png", "cache-control": "max-age=600"}
+        ),
+    )
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    in_threads = []
+    to_thread = image_proxy.asyncio.to_thread
+
+    async def recording_to_thread(function, *args, **kwargs):
+        in_threads.append(getattr(function, "__name__", repr(function)))
+        return await to_thread(function, *args, **kwargs)
+
+    monkeypatch.setattr(image_proxy.asyncio, "to_thread", recording_to_thread)
+    client = TestClient(main.app)
+
+    assert proxy.stats()["cache"]["entries"] == 0  # stats do not scan the directory
+    client.get("/api/proxy-image", params={"url": "https://img.example/a.png"})
+    client.get("/api/proxy-image", params={"url": "https://img.example/a.png"})
+
+    assert in_threads[0] == "ImageCache"
+    assert {"open_temp", "write", "_finish_temp", "get"} <= set(in_threads)
+
+def test_host_slot_is_freed_before_the_client_reads_the_body(tmp_path):
+    proxy, _ = make_proxy(
+        tmp_path,
+        lambda request: httpx.Response(200, content=PNG, headers={"content-type": "image/png"}),
+        max_per_host=1,
+    )
+
+    async def run():
+        response = await proxy.fetch("https://img.example/a.png")
+        await asyncio.sleep(0.05)  # the client has not read anything yet
+        free = not proxy._host_slot("img.example").locked()
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        return free, body
+
+    assert asyncio.run(run()) == (True, PNG)
+
+
+def test_busy_host_is_answered_with_503(tmp_path, monkeypatch):
+    proxy, requests = make_proxy(tmp_path, lambda request: httpx.Response(200), host_wait=0.01)
+    proxy._hosts["img.example"] = asyncio.Semaphore(0)
+    monkeypatch.setattr(main, "image_proxy", proxy)
+
+    response = TestClient(main.app).get(
+        "/api/proxy-image", params={"url": "https://img.example/a.png"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert requests == []
+    assert proxy.stats()["host_wait_timeouts"] == 1
+
+def test_failing_url_is_negatively_cached(tmp_path, monkeypatch):
+    proxy, requests = make_proxy(tmp_path, lambda request: httpx.Response(404))
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    client = TestClient(main.app)
+
+    statuses = [
+        client.get("/api/proxy-image", params={"url": "https://img.example/gone.png"}).status_code
+        for _ in range(3)
+    ]
+
+    assert statuses == [502, 502, 502]
+    assert len(requests) == 1
+    assert proxy.stats()["negative_hits"] == 2
+
+
+def test_non_http_urls_are_rejected(tmp_path, monkeypatch):
+    proxy, requests = make_proxy(tmp_path, lambda request: httpx.Response(200))
+    monkeypatch.setattr(main, "image_proxy", proxy)
+
+    response = TestClient(main.app).get("/api/proxy-image", params={"url": "file:///etc/passwd"})
+
+    assert response.status_code == 400
+    assert requests == []
+
+
+def test_no_store_images_are_not_cached(tmp_path):
+    assert _freshness(httpx.Headers({"cache-control": "no-store"}), 0) is None
+    assert _freshness(httpx.Headers({"cache-control": "public, max-age=60"}), 100) == 160
+    assert _freshness(httpx.Headers({"cache-control": "no-cache"}), 0) is None
+
+
+def test_uncacheable_images_pass_the_origin_directives_on(tmp_path, monkeypatch):
+    proxy, requests = make_proxy(
+        tmp_path,
+        lambda request: httpx.Response(
+            200, content=PNG, headers={"content-type": "image/png", "cache-control": "private"}
+        ),
+    )
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    client = TestClient(main.app)
+
+    first = client.get("/api/proxy-image", params={"url": "https://img.example/a.png"})
+    second = client.get("/api/proxy-image", params={"url": "https://img.example/a.png"})
+
+    assert first.headers["cache-control"] == second.headers["cache-control"] == "private"
+    assert second.headers["x-cache"] == "MISS"
+    assert len(requests) == 2
+
+
+def test_images_over_the_body_cap_are_refused(tmp_path, monkeypatch):
+    async def chunked():
+        yield PNG
+
+    def handler(request):
+        headers = {"content-type": "image/png", "cache-control": "max-age=600"}
+        if request.url.path == "/declared.png":
+            return httpx.Response(200, content=PNG, headers=headers)
+        return httpx.Response(200, content=chunked(), headers=headers)
+
+    proxy, requests = make_proxy(tmp_path, handler, max_body=len(PNG) - 1)
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    client = TestClient(main.app)
+
+    declared = client.get("/api/proxy-image", params={"url": "https://img.example/declared.png"})
+    streamed = client.get("/api/proxy-image", params={"url": "https://img.example/streamed.png"})
+
+    assert declared.status_code == 502
+    assert streamed.content == b""
+    assert proxy.stats()["too_large"] == 2
+    assert proxy.stats()["cache"]["bytes"] == 0
+    # Both are remembered as failing rather than fetched again.
+    again = client.get("/api/proxy-image", params={"url": "https://img.example/streamed.png"})
+    assert again.status_code == 502
+    assert len(requests) == 2
+
+
+def test_resize_reads_at_most_the_body_cap(tmp_path, monkeypatch):
+    pytest.importorskip("PIL.Image")
+
+    async def chunked():
+        yield PNG
+
+    proxy, requests = make_proxy(
+        tmp_path,
+        lambda request: httpx.Response(200, content=chunked(), headers={"content-type": "image/png"}),
+        max_body=len(PNG) - 1,
+    )
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    client = TestClient(main.app)
+
+    response = client.get("/api/proxy-image", params={"url": "https://img.example/a.png", "w": 10})
+
+    assert response.status_code == 502
+    assert proxy.stats()["too_large"] == 1
+
+
+def test_cache_evicts_least_recently_used_files(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=2500)
+    for key in ("a", "b", "c"):
+        path, f = cache.open_temp()
+        with f:
+            f.write(PNG)
+        cache.commit(key, path, CachedImage(len(PNG), "image/png", 2**40))
+        if key == "b":
+            cache.get("a")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert not (tmp_path / "b").exists()
+
+
+def test_resize_without_pillow_is_not_implemented(tmp_path, monkeypatch):
+    proxy, requests = make_proxy(tmp_path, lambda request: httpx.Response(200, content=PNG))
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    monkeypatch.setattr(image_proxy, "Image", None)
+
+    response = TestClient(main.app).get(
+        "/api/proxy-image", params={"url": "https://img.example/a.png", "w": 200}
+    )
+
+    assert response.status_code == 501
+    assert requests == []
+
+
+def test_resized_variant_is_cached_by_size_and_format(tmp_path, monkeypatch):
+    pil = pytest.importorskip("PIL.Image")
+    source = io.BytesIO()
+    pil.new("RGB", (800, 600), "red").save(source, format="PNG")
+    proxy, requests = make_proxy(
+        tmp_path,
+        lambda request: httpx.Response(
+            200, content=source.getvalue(), headers={"content-type": "image/png"}
+        ),
+        transform_workers=1,
+    )
+    monkeypatch.setattr(main, "image_proxy", proxy)
+    client = TestClient(main.app)
+    params = {"url": "https://img.example/a.png", "w": 200, "format": "auto"}
+
+    first = client.get("/api/proxy-image", params=params, headers={"Accept": "image/webp"})
+    second = client.get("/api/proxy-image", params=params, headers={"Accept": "image/webp"})
+    png = client.get("/api/proxy-image", params=params, headers={"Accept": "image/png"})
+
+    assert first.headers["content-type"] == "image/webp"
+    assert first.headers["vary"] == "Accept"
+    assert second.headers["x-cache"] == "HIT"
+    assert pil.open(io.BytesIO(second.content)).size == (200, 150)
+    assert png.headers["content-type"] == "image/png"
+    # One origin fetch; the other variant is cut from the cached original.
+    assert len(requests) == 1
@@ -0,0 +1,52 @@
+import json
+import os
+
+from backend.utils.json_file import JsonFileCache, write_json_atomic
+
+
+def test_missing_file_returns_default(tmp_path):
+    cache = JsonFileCache(str(tmp_path / "status.json"), lambda: {"is_scraping": False})
+
+    assert cache.get() == {"is_scraping": False}
+
+
+def test_parses_once_until_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "status.json"
+    write_json_atomic(str(path), {"is_scraping": False})
+    cache = JsonFileCache(str(path), dict)
+    opened = []
+    real_open = open
+
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+
+    assert cache.get() == {"is_scraping": False}
+    assert cache.get() == {"is_scraping": False}
+    assert len(opened) == 1
+
+    write_json_atomic(str(path), {"is_scraping": True})
+
+    assert cache.get() == {"is_scraping": True}
+    assert len(opened) == 2
+
+
+def test_invalid_json_falls_back_to_default(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{not json", encoding="utf-8")
+    cache = JsonFileCache(str(path), lambda: {"default": True})
+
+    assert cache.get() == {"default": True}
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "data" / "config.json"
+    cache = JsonFileCache(str(path), dict)
+
+    cache.write({"ชื่อ": "ร้านค้า"}, ensure_ascii=False, indent=2)
+
+    assert os.listdir(path.parent) == ["config.json"]
+    assert json.loads(path.read_text(encoding="utf-8")) == {"ชื่อ": "ร้านค้า"}
+    assert cache.get() == {"ชื่อ": "ร้านค้า"}
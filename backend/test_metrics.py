@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from backend import main, metrics
+
+
+def test_metrics_endpoint_reports_routes_and_component_stats():
+    client = TestClient(main.app)
+    client.get("/api/admission_stats")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'priceza_http_request_duration_seconds_count{method="GET",route="/api/admission_stats",status="200"}'
+        in body
+    )
+    assert 'priceza_admission_shed_total{group="reads",reason="timeout"}' in body
+    assert 'priceza_image_proxy_requests_total{result="hit"}' in body
+    assert "priceza_image_proxy_origin_bytes_total" in body
+    assert 'priceza_response_cache_lookups_total{result="miss"}' in body
+    assert "priceza_event_subscribers" in body
+
+
+def test_timed_query_records_calls_and_errors():
+    @metrics.timed_query
+    def failing_query():
+        raise RuntimeError("connection lost")
+
+    @metrics.timed_query
+    async def async_query():
+        return 42
+
+    with pytest.raises(RuntimeError):
+        failing_query()
+    assert asyncio.run(async_query()) == 42
+
+    def sample(name, function):
+        return REGISTRY.get_sample_value(name, {"function": function})
+
+    assert sample("priceza_db_query_duration_seconds_count", "failing_query") == 1
+    assert sample("priceza_db_query_errors_total", "failing_query") == 1
+    assert sample("priceza_db_query_duration_seconds_count", "async_query") == 1
+    assert async_query.__name__ == "async_query"
+
+
+def test_scrape_run_is_written_to_textfile_and_served(tmp_path, monkeypatch):
+    textfile = tmp_path / "scraper_metrics.prom"
+    monkeypatch.setattr(metrics, "SCRAPER_METRICS_FILE", str(textfile))
+
+    metrics.record_scrape(12.5, 40, True)
+
+    body = metrics.metrics_body(str(textfile)).decode("utf-8")
+    assert "priceza_scrape_duration_seconds 12.5" in body
+    assert "priceza_scrape_products_found 40.0" in body
+    assert 'priceza_scrape_runs_total{result="success"}' in body
+    assert "priceza_scrape_last_success_timestamp_seconds" in body
+
+
+def test_rejected_scrape_does_not_count_as_success(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "SCRAPER_METRICS_FILE", str(tmp_path / "scraper_metrics.prom"))
+
+    def runs(result):
+        return metrics.SCRAPER_REGISTRY.get_sample_value(
+            "priceza_scrape_runs_total", {"result": result}
+        ) or 0
+
+    before = {result: runs(result) for result in ("success", "rejected", "failure")}
+    metrics.record_scrape(3.0, 0, False, rejected=True)
+
+    assert runs("rejected") == before["rejected"] + 1
+    assert runs("success") == before["success"]
+    assert runs("failure") == before["failure"]
+    assert metrics.SCRAPER_REGISTRY.get_sample_value("priceza_scrape_products_found") == 0
@@ -0,0 +1,67 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from backend import migrations
+
+
+def recorded_versions(cursor):
+    return [
+        c.args[1][0]
+        for c in cursor.execute.call_args_list
+        if c.args[0].startswith("INSERT INTO schema_migrations")
+    ]
+
+
+def test_apply_migrations_runs_all_steps_on_empty_database():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (0,)
+
+    version = migrations.apply_migrations(cursor)
+
+    assert version == migrations.SCHEMA_VERSION
+    assert recorded_versions(cursor) == [v for v, _, _ in migrations.MIGRATIONS]
+    assert "pg_advisory_xact_lock" in cursor.execute.call_args_list[0].args[0]
+
+
+def test_apply_migrations_only_runs_pending_steps():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (migrations.SCHEMA_VERSION - 1,)
+
+    version = migrations.apply_migrations(cursor)
+
+    assert version == migrations.SCHEMA_VERSION
+    assert recorded_versions(cursor) == [migrations.SCHEMA_VERSION]
+    assert not any(
+        "CREATE TABLE IF NOT EXISTS deals (" in c.args[0]
+        for c in cursor.execute.call_args_list
+    )
+
+
+def test_backfill_rewrites_existing_rows_in_batches(monkeypatch):
+    monkeypatch.setattr(migrations, "_BACKFILL_BATCH", 2)
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = [
+        [(1, "iPhone15", "฿1,000", None, "10%", "4.5", "(12)"), (3, None, None, None, None, None, None)],
+        [(7, "Pad", "฿50", "฿80", None, None, None)],
+    ]
+
+    migrations._backfill_derived_columns(cursor, "deals")
+
+    selects = [c.args[1] for c in cursor.execute.call_args_list if c.args[0].startswith("SELECT")]
+    updates = [c.args[1] for c in cursor.execute.call_args_list if "UPDATE deals" in c.args[0]]
+    assert selects == [(0, 2), (3, 2)]
+    assert updates[0][0] == [1, 3]
+    assert "'ph':" in updates[0][1][0]
+    assert updates[0][1][1] is None
+    assert updates[0][2] == [Decimal("1000"), None]
+    assert updates[1][0] == [7]
+
+
+def test_data_generation_timestamps_use_the_current_instant():
+    cursor = MagicMock()
+
+    migrations._fix_data_generation_timestamps(cursor)
+
+    statements = [c.args[0] for c in cursor.execute.call_args_list]
+    assert "SET DEFAULT now()" in statements[0]
+    assert not any("AT TIME ZONE" in s for s in statements)
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from backend.utils.parsing import (
+    parse_discount,
+    parse_price,
+    parse_rating,
+    parse_reviews_count,
+)
+
+
+def test_parse_price_handles_separators_and_currency():
+    assert parse_price("1,290") == Decimal("1290")
+    assert parse_price("฿12,345.50") == Decimal("12345.50")
+    assert parse_price("") is None
+    assert parse_price(None) is None
+
+
+def test_parse_discount_returns_positive_percentage():
+    assert parse_discount("-35%") == Decimal("35")
+    assert parse_discount("ลด 12%") == Decimal("12")
+    assert parse_discount("250%") is None
+
+
+def test_parse_rating_ignores_review_count():
+    assert parse_rating("4.5(120)") == Decimal("4.5")
+    assert parse_rating("(120)") is None
+
+
+def test_parse_reviews_count():
+    assert parse_reviews_count("120") == 120
+    assert parse_reviews_count("(1,200)") == 1200
+    assert parse_reviews_count(None) is None
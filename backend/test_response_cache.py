@@ -0,0 +1,223 @@
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.database import DataGeneration
+from backend.response_cache import ResponseCache
+from backend.serialization import encode
+
+
+def make_cache(generations, **options):
+    async def load_generations():
+        return dict(generations)
+
+    options.setdefault("generation_ttl", 0)
+    return ResponseCache(load_generations, **options)
+
+
+def test_hit_until_generation_changes():
+    generations = {"deals": 1, "owner_deals": 1}
+    cache = make_cache(generations)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return generations["deals"], {"n": len(loads)}
+
+    async def run():
+        first = await cache.get("k", load)
+        second = await cache.get("k", load)
+        generations["owner_deals"] = 2
+        third = await cache.get("k", load)
+        generations["deals"] = 2
+        fourth = await cache.get("k", load)
+        return first, second, third, fourth
+
+    assert asyncio.run(run()) == ((1, {"n": 1}), (1, {"n": 1}), (1, {"n": 1}), (2, {"n": 2}))
+    assert cache.stats()["hits"] == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = make_cache({"deals": 1})
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 1, [1, 2, 3]
+
+    async def run():
+        return await asyncio.gather(*(cache.get("k", load) for _ in range(20)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(result == (1, [1, 2, 3]) for result in results)
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_failed_load_is_not_cached():
+    cache = make_cache({"deals": 1})
+    attempts = []
+
+    async def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database down")
+        return 1, "ok"
+
+    async def run():
+        try:
+            await cache.get("k", load)
+        except RuntimeError:
+            pass
+        return await cache.get("k", load)
+
+    assert asyncio.run(run()) == (1, "ok")
+    assert len(attempts) == 2
+
+
+def test_evicts_least_recently_used_past_byte_bound():
+    cache = make_cache({"deals": 1}, max_bytes=10, sizeof=lambda value: 4)
+
+    async def run():
+        for key in ("a", "b"):
+            await cache.get(key, lambda key=key: asyncio.sleep(0, (1, key)))
+        await cache.get("a", None)  # hit, so "b" is now the oldest
+        await cache.get("c", lambda: asyncio.sleep(0, (1, "c")))
+
+    asyncio.run(run())
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 8
+    assert stats["evictions"] == 1
+    assert "b" not in cache._entries
+
+
+def test_generations_are_reused_within_ttl():
+    reads = []
+
+    async def load_generations():
+        reads.append(1)
+        return {"deals": 1}
+
+    cache = ResponseCache(load_generations, generation_ttl=60)
+
+    async def run():
+        await cache.get("k", lambda: asyncio.sleep(0, (1, 1)))
+        await cache.get("k", None)
+        cache.expire_generations()
+        await cache.get("k", None)
+
+    asyncio.run(run())
+    assert len(reads) == 2
+
+
+def test_entry_is_stored_under_the_generation_its_loader_read():
+    generations = {"deals": 2}
+    cache = make_cache(generations)
+    loads = []
+
+    async def load():
+        # The data was read from a replica still at generation 1.
+        loads.append(1)
+        return 1, "stale"
+
+    async def run():
+        first = await cache.get("k", load)
+        second = await cache.get("k", load)
+        return first, second
+
+    assert asyncio.run(run()) == ((1, "stale"), (1, "stale"))
+    assert len(loads) == 2
+
+
+def test_compressed_variants_count_toward_the_byte_bound():
+    cache = make_cache({"deals": 1}, max_bytes=10_000, sizeof=lambda body: body.size)
+    body = encode(list(range(1000)))
+
+    async def run():
+        await cache.get("k", lambda: asyncio.sleep(0, (1, body)))
+        body.encoded("gzip")
+        await cache.get("k", None)
+
+    asyncio.run(run())
+
+    assert cache.stats()["bytes"] == len(body.raw) + len(body.encoded("gzip"))
+
+def test_deals_endpoint_answers_matching_etag_with_304(monkeypatch):
+    updated_at = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    generations = {"deals": DataGeneration(4, updated_at), "owner_deals": DataGeneration(1, None)}
+    loads = []
+
+    async def fake_get_deals(*args, **kwargs):
+        loads.append(args)
+        kwargs["generations"]["deals"] = generations["deals"]
+        return {"total_products": 0, "products": [], "page": 1, "page_size": 50}
+
+    monkeypatch.setattr(main, "response_cache", make_cache(generations))
+    monkeypatch.setattr(main, "get_deals_from_db", fake_get_deals)
+    client = TestClient(main.app)
+
+    first = client.get("/api/deals?merchant=Shop")
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"] == "Sun, 01 Mar 2026 12:30:00 GMT"
+
+    cached = client.get("/api/deals?merchant=Shop", headers={"If-None-Match": etag})
+    other_query = client.get("/api/deals?merchant=Other", headers={"If-None-Match": etag})
+    generations["deals"] = DataGeneration(5, updated_at)
+    after_scrape = client.get("/api/deals?merchant=Shop", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert other_query.status_code == 200
+    assert after_scrape.status_code == 200
+    assert after_scrape.headers["etag"] != etag
+    assert len(loads) == 3
+
+
+def test_matching_etag_is_answered_without_loading_the_body(monkeypatch):
+    generations = {"deals": DataGeneration(4, None), "owner_deals": DataGeneration(1, None)}
+    loads = []
+
+    async def fake_get_owner_deals(*args, generations):
+        loads.append(args)
+        generations["owner_deals"] = DataGeneration(1, None)
+        return {"total_products": 0, "products": [], "page": 1, "page_size": 50}
+
+    monkeypatch.setattr(main, "response_cache", make_cache(generations))
+    monkeypatch.setattr(main, "get_owner_deals", fake_get_owner_deals)
+    client = TestClient(main.app)
+
+    etag = client.get("/api/owner_deals").headers["etag"]
+    # Another worker, or this one after an eviction, has no cached body.
+    main.response_cache.clear()
+    revalidated = client.get("/api/owner_deals", headers={"If-None-Match": etag})
+
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert len(loads) == 1
+
+
+def test_etag_comes_from_the_generation_the_body_was_read_at(monkeypatch):
+    read_at = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    latest = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    # The generation check sees the new scrape; the page comes from a
+    # replica that has not replayed it yet.
+    generations = {"deals": DataGeneration(5, latest), "owner_deals": DataGeneration(1, None)}
+
+    async def fake_get_merchants(generations):
+        generations["deals"] = DataGeneration(4, read_at)
+        return ["Shop"]
+
+    monkeypatch.setattr(main, "response_cache", make_cache(generations))
+    monkeypatch.setattr(main, "get_all_merchants", fake_get_merchants)
+    client = TestClient(main.app)
+
+    response = client.get("/api/merchants")
+
+    assert response.json() == ["Shop"]
+    assert response.headers["last-modified"] == "Sun, 01 Mar 2026 12:00:00 GMT"
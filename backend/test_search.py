@@ -0,0 +1,36 @@
+from backend.search import build_search_query, build_search_vector
+
+
+def test_search_vector_indexes_thai_bigrams_at_consecutive_positions():
+    vector = build_search_vector("iPhone ไอโฟน")
+
+    assert "'iphone':1A" in vector
+    assert "'ip':4B 'ph':5B 'ho':6B 'on':7B 'ne':8B" in vector
+    assert "'ไอ':10B 'อโ':11B 'โฟ':12B 'ฟน':13B" in vector
+
+
+def test_search_vector_is_none_for_blank_titles():
+    assert build_search_vector("") is None
+    assert build_search_vector(None) is None
+    assert build_search_vector(" - ") is None
+
+
+def test_search_query_matches_thai_and_latin_as_substrings():
+    query = build_search_query("โฟน IPH")
+
+    assert query.match == "('โฟ' <-> 'ฟน') & ('ip' <-> 'ph')"
+    assert query.rank.startswith(f"({query.match})")
+
+
+def test_latin_and_digit_queries_match_inside_words():
+    vector = build_search_vector("iPhone15 Pro")
+
+    # "phone" and "15" are phrases of bigrams indexed for "iphone15".
+    assert build_search_query("phone").match == "('ph' <-> 'ho' <-> 'on' <-> 'ne')"
+    assert build_search_query("15").match == "('15')"
+    assert "'ph':5B 'ho':6B 'on':7B 'ne':8B 'e1':9B '15':10B" in vector
+
+
+def test_search_query_quotes_lexemes():
+    assert build_search_query("it's").match == "('it') & 's':*"
+    assert build_search_query("!!!") is None
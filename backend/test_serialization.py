@@ -0,0 +1,71 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.database import DataGeneration
+from backend.response_cache import ResponseCache
+from backend.serialization import choose_encoding, encode, json_response, strip_encoding
+
+
+def test_dumps_handles_thai_text_decimals_and_datetimes():
+    body = encode({"title": "หูฟัง", "price": Decimal("9.5"), "at": datetime(2026, 1, 2)})
+    assert json.loads(body.raw) == {"title": "หูฟัง", "price": 9.5, "at": "2026-01-02T00:00:00"}
+    assert "หูฟัง".encode("utf-8") in body.raw
+
+
+def test_choose_encoding_respects_threshold_and_quality():
+    assert choose_encoding("gzip, deflate", 2000, 1024) == "gzip"
+    assert choose_encoding("gzip", 100, 1024) is None
+    assert choose_encoding("gzip;q=0, identity", 2000, 1024) is None
+    assert choose_encoding(None, 2000, 1024) is None
+
+
+def test_json_response_compresses_and_tags_etag_with_encoding():
+    body = encode({"products": ["x" * 50] * 100})
+    response = json_response(body, "gzip", 1024, {"ETag": '"abc"'})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"abc-gzip"'
+    assert gzip.decompress(response.body) == body.raw
+    assert strip_encoding(response.headers["etag"]) == '"abc"'
+    # The compressed variant is kept for the next response.
+    assert body.encoded("gzip") is body.encoded("gzip")
+
+
+def test_deals_endpoint_returns_only_model_fields_compressed(monkeypatch):
+    generations = {"deals": DataGeneration(1, None), "owner_deals": DataGeneration(1, None)}
+
+    async def load_generations():
+        return generations
+
+    deal = {
+        "id": 1, "title": "หูฟัง", "price": "฿990", "original_price": None, "discount": "",
+        "image_url": "", "product_url": "", "merchant_id": 3, "merchant_image": "",
+        "rating": "", "reviews_count": "", "scraped_at": datetime(2026, 1, 2, tzinfo=timezone.utc),
+        "updated_at": None, "merchant": "Shop",
+    }
+
+    async def fake_get_deals(*args, generations, **kwargs):
+        generations["deals"] = DataGeneration(1, None)
+        return {"total_products": 60, "products": [deal] * 60, "page": 1, "page_size": 60,
+                "next_cursor": None}
+
+    monkeypatch.setattr(main, "response_cache", ResponseCache(load_generations, generation_ttl=0))
+    monkeypatch.setattr(main, "get_deals_from_db", fake_get_deals)
+    client = TestClient(main.app)
+
+    response = client.get("/api/deals?page_size=60", headers={"Accept-Encoding": "gzip"})
+    revalidated = client.get(
+        "/api/deals?page_size=60",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    product = response.json()["products"][0]
+    assert set(product) == set(main.DEAL_FIELDS)
+    assert product["original_price"] is None
+    assert revalidated.status_code == 304
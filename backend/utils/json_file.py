@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Optional
+
+
+def write_json_atomic(path: str, data: Any, **dump_kwargs) -> None:
+    """Write *data* as JSON to *path* so readers never see a partial file.
+
+    The JSON goes to a temporary file in the same directory, which is then
+    renamed over *path*.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class JsonFileCache:
+    """Parsed contents of a JSON file, re-read only when the file changes.
+
+    Each ``get`` costs one ``stat``; the file is parsed again only when its
+    inode, size or mtime differ from the last read, which also catches a
+    file replaced by ``write_json_atomic``. Returned values are shared, so
+    callers must not modify them.
+
+    Parameters
+    ----------
+    path: str
+        The JSON file.
+    default: Callable[[], Any]
+        Returns the value to use while the file is missing or invalid.
+    """
+
+    def __init__(self, path: str, default: Callable[[], Any]):
+        self.path = path
+        self.default = default
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self._value: Any = None
+
+    def get(self) -> Any:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return self.default()
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if signature != self._signature:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._value = json.load(f)
+                except (OSError, ValueError) as e:
+                    logging.error(f"Could not read or parse {self.path}: {e}")
+                    self._value = self.default()
+                self._signature = signature
+            return self._value
+
+    def write(self, data: Any, **dump_kwargs) -> None:
+        """Atomically replace the file with *data* and cache it."""
+        with self._lock:
+            write_json_atomic(self.path, data, **dump_kwargs)
+            st = os.stat(self.path)
+            self._signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            self._value = data
@@ -0,0 +1,40 @@
+"""Parse numeric values out of the text fields produced by the scraper."""
+
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def _first_number(text: Optional[str]) -> Optional[Decimal]:
+    match = _NUMBER_RE.search(text or "")
+    if not match:
+        return None
+    try:
+        return Decimal(match.group(0).replace(",", ""))
+    except InvalidOperation:
+        return None
+
+
+def parse_price(text: Optional[str]) -> Optional[Decimal]:
+    """Parse a price such as ``"฿1,290"`` or ``"1,290.50"``."""
+    return _first_number(text)
+
+
+def parse_discount(text: Optional[str]) -> Optional[Decimal]:
+    """Parse a discount such as ``"-35%"`` into a percentage (``35``)."""
+    value = _first_number(text)
+    return value if value is not None and value <= 100 else None
+
+
+def parse_rating(text: Optional[str]) -> Optional[Decimal]:
+    """Parse a rating such as ``"4.5(120)"`` into ``4.5``."""
+    value = _first_number((text or "").split("(", 1)[0])
+    return value if value is not None and value <= 5 else None
+
+
+def parse_reviews_count(text: Optional[str]) -> Optional[int]:
+    """Parse a review count such as ``"120"`` or ``"(1,200)"``."""
+    value = _first_number(text)
+    return int(value) if value is not None else None
@@ -23,7 +23,6 @@ import GridCard from './components/GridCard';
 import FacebookCard from './components/FacebookCard';
 import PaginationControls from './components/PaginationControls';
 import useDeals from './hooks/useDeals';
-import useMerchants from './hooks/useMerchants';
 import styles from './App.module.css';
 
 const { Content, Footer } = Layout;
@@ -44,11 +43,10 @@ const App = () => {
     currentPage,
     totalProducts,
     pageSize,
+    merchants,
     fetchDeals,
   } = useDeals(viewMode, selectedMerchant, searchTitle);
 
-  const { merchants } = useMerchants();
-
   const handlePageChange = (page) => {
     fetchDeals(page, selectedMerchant, searchTitle);
   };
@@ -74,7 +74,7 @@ const GridCard = ({ product, onDownload, calculateSavings }) => {
                 <LazyLoadImage
                   alt={product.title}
                   effect="blur"
-                  src={`/api/proxy-image?url=${encodeURIComponent(product.image_url)}`}
+                  src={`/api/proxy-image?url=${encodeURIComponent(product.image_url)}&w=480&format=auto`}
                   width="100%"
                   height="100%"
                   style={{ objectFit: 'cover' }}
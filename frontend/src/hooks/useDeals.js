@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 
 const useDeals = (viewMode, selectedMerchant, searchTitle) => {
   const [deals, setDeals] = useState([]);
@@ -9,6 +9,10 @@ const useDeals = (viewMode, selectedMerchant, searchTitle) => {
   const [currentPage, setCurrentPage] = useState(1);
   const [totalProducts, setTotalProducts] = useState(0);
   const [pageSize, setPageSize] = useState(50);
+  const [merchants, setMerchants] = useState([]);
+  // The first load, and the first after each scrape, also brings the
+  // merchants and scraper status in one /api/dashboard request.
+  const loadDashboard = useRef(true);
 
   const fetchDeals = async (
     page = 1,
@@ -20,7 +24,12 @@ const useDeals = (viewMode, selectedMerchant, searchTitle) => {
     const current_page_size = viewMode === 'grid' ? 50 : 20;
     setPageSize(current_page_size);
 
-    let url = `/api/deals?page=${page}&page_size=${current_page_size}`;
+    const dashboard = loadDashboard.current;
+    loadDashboard.current = false;
+    let url = dashboard
+      ? '/api/dashboard?sections=deals&sections=merchants&sections=scraper_status'
+        + `&deals_page=${page}&deals_page_size=${current_page_size}`
+      : `/api/deals?page=${page}&page_size=${current_page_size}`;
     if (merchant && merchant !== 'All') {
       url += `&merchant=${merchant}`;
     }
@@ -33,14 +42,13 @@ const useDeals = (viewMode, selectedMerchant, searchTitle) => {
       if (!response.ok) {
         throw new Error('Failed to fetch deals');
       }
-      const data = await response.json();
-      console.log('Deals API response', data);
-
-      const statusResponse = await fetch('/api/scraper_status');
-      if (statusResponse.ok) {
-        const statusData = await statusResponse.json();
-        setIsScraping(statusData.is_scraping);
+      let data = await response.json();
+      if (dashboard) {
+        setMerchants(['All', ...data.merchants]);
+        setIsScraping(data.scraper_status.is_scraping);
+        data = data.deals;
       }
+      console.log('Deals API response', data);
 
       const products = data.products || [];
       setDeals(products);
@@ -57,11 +65,31 @@ const useDeals = (viewMode, selectedMerchant, searchTitle) => {
     }
   };
 
+  // Always reloads the page currently shown, with the current filters.
+  const refreshRef = useRef(null);
+  refreshRef.current = () => fetchDeals(currentPage, selectedMerchant, searchTitle);
+
   useEffect(() => {
     fetchDeals(1, selectedMerchant, searchTitle);
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [viewMode, selectedMerchant, searchTitle]);
 
+  // After the first load, follow the scraper status through /api/events and
+  // reload the deals when a scrape lands.
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    const events = new EventSource('/api/events');
+    events.addEventListener('scrape_started', () => setIsScraping(true));
+    events.addEventListener('scrape_finished', () => {
+      setIsScraping(false);
+      loadDashboard.current = true;
+      refreshRef.current();
+    });
+    return () => events.close();
+  }, []);
+
   return {
     deals,
     loading,
@@ -71,6 +99,7 @@ const useDeals = (viewMode, selectedMerchant, searchTitle) => {
     currentPage,
     totalProducts,
     pageSize,
+    merchants,
     fetchDeals,
   };
 };